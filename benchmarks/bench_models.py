@@ -0,0 +1,71 @@
+"""Memory and unload cost of the Passenger and Elevator models.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_models -n 1000000 -c 100 1000 10000 -o models.json
+
+Bytes per passenger is what `tracemalloc` sees allocated for the Passenger objects
+alone (their ids are created beforehand). The unload cost is the time per
+`Elevator.unload_passenger` emptying a full car in random order.
+"""
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+from models.elevator import Elevator
+from models.passenger import Passenger
+
+
+def make_passengers(ids, num_floors=20):
+    return [Passenger(i, 1 + i % num_floors, 1 + (i + 7) % num_floors, i) for i in ids]
+
+
+def bytes_per_passenger(num_passengers):
+    ids = list(range(num_passengers))
+    tracemalloc.start()
+    passengers = make_passengers(ids)
+    allocated, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return (allocated - sys.getsizeof(passengers)) / num_passengers
+
+
+def unload_seconds(capacity, unloads=200000, seed=1004):
+    """Average seconds per unload, emptying a full elevator of `capacity` passengers."""
+    passengers = make_passengers(range(capacity))
+    order = passengers[:]
+    random.Random(seed).shuffle(order)
+    elevator = Elevator(1, capacity)
+    rounds = max(unloads // capacity, 1)
+    seconds = 0.0
+    for _ in range(rounds):
+        for passenger in passengers:
+            elevator.load_passenger(passenger)
+        start = time.perf_counter()
+        for passenger in order:
+            elevator.unload_passenger(passenger)
+        seconds += time.perf_counter() - start
+    return seconds / (rounds * capacity)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Passenger and Elevator model benchmarks.")
+    parser.add_argument('-n', '--passengers', type=int, default=1000000, help='Number of passengers to measure the memory of.')
+    parser.add_argument('-c', '--capacity', type=int, nargs='+', default=[100, 1000, 10000], help='Elevator capacities to measure the unload cost at.')
+    parser.add_argument('-o', '--output-file', default=None, help='Save the results as json.')
+    args = parser.parse_args(argv)
+
+    report = {"python": sys.version.split()[0], "passengers": args.passengers, "bytes_per_passenger": round(bytes_per_passenger(args.passengers), 1),
+              "unload_microseconds": {capacity: round(unload_seconds(capacity) * 1e6, 3) for capacity in args.capacity}}
+    print(f"{report['bytes_per_passenger']:>10} bytes per passenger ({args.passengers} passengers)")
+    for capacity, microseconds in report["unload_microseconds"].items():
+        print(f"{microseconds:>10} us per unload at capacity {capacity}")
+    if args.output_file:
+        with open(args.output_file, "w") as f:
+            json.dump(report, f, indent=4)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+"""Throughput and scaling benchmarks of the simulator.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_simulator -n 1000 10000 -ne 4 16 -o bench.json
+    python -m benchmarks.bench_simulator -n 1000 10000 -ne 4 16 --compare bench.json
+
+Each configuration runs in a fresh process, so the peak memory (max RSS) is its own.
+"""
+import argparse
+import itertools
+import json
+import multiprocessing
+import platform
+import queue as queues
+import resource
+import subprocess
+import sys
+import time
+import traceback
+from generate_data import generate_requests
+from models.profiler import Profiler
+from models.simulation import run_simulation
+
+
+def workload(num_passengers, num_floors, rate, profile, seed):
+    """Requests arriving at `rate` passengers per time unit on average."""
+    horizon = max(int(num_passengers / rate), 1)
+    return list(generate_requests(num_passengers, num_floors, horizon, profile, seed))
+
+
+def time_phases(case, requests):
+    """Runs the simulation again with a profiler, returns the seconds spent in each phase."""
+    profiler = Profiler()
+    run_simulation(case["num_elevators"], case["num_floors"], case["elevator_capacity"], requests, file_log=None,
+                   engine=case["engine"], backend=case["backend"], dispatcher=case["dispatcher"], profiler=profiler)
+    return {name: round(seconds, 6) for name, seconds in profiler.seconds.items() if profiler.calls[name]}
+
+
+def run_case(case):
+    """Benchmarks one configuration and returns its results."""
+    requests = workload(case["passengers"], case["num_floors"], case["rate"], case["profile"], case["seed"])
+    start = time.perf_counter()
+    elevator_system = run_simulation(case["num_elevators"], case["num_floors"], case["elevator_capacity"], requests,
+                                     file_log=None, engine=case["engine"], backend=case["backend"], dispatcher=case["dispatcher"])
+    seconds = time.perf_counter() - start
+    result = dict(case)
+    result.update({
+        "ticks": elevator_system.time,
+        "seconds": round(seconds, 6),
+        "ticks_per_second": round(elevator_system.time / seconds, 1),
+        "passengers_per_second": round(case["passengers"] / seconds, 1),
+        "peak_memory_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    })
+    if case["phases"]:
+        result["phase_seconds"] = time_phases(case, requests)
+    return result
+
+
+def _run_case_in_child(case, queue):
+    try:
+        queue.put((True, run_case(case)))
+    except Exception:
+        queue.put((False, traceback.format_exc()))
+
+
+def run_isolated(case):
+    """Runs `run_case` in a new process.
+
+    Raises RuntimeError with the child's traceback if the case fails, or with its
+    exit code if the process dies without a result (e.g. killed when out of memory).
+    """
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_run_case_in_child, args=(case, queue))
+    process.start()
+    try:
+        while True:
+            try:
+                ok, result = queue.get(timeout=1)
+                break
+            except queues.Empty:
+                if process.is_alive():
+                    continue
+            # Dead: what it sent before exiting is in the pipe by now
+            try:
+                ok, result = queue.get(timeout=1)
+                break
+            except queues.Empty:
+                raise RuntimeError(f"The benchmark process died with exit code {process.exitcode}.") from None
+    finally:
+        process.join()
+    if not ok:
+        raise RuntimeError(f"The benchmark failed:\n{result}")
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_file):
+    """Prints the speed of each configuration against the same one in a previous results file."""
+    with open(baseline_file) as f:
+        baseline = json.load(f)
+    key = lambda r: tuple(r[p] for p in ("passengers", "num_elevators", "num_floors", "elevator_capacity", "dispatcher", "engine", "backend"))
+    previous = {key(r): r for r in baseline["results"]}
+    print(f"Compared with {baseline_file} (commit {baseline.get('commit')}):")
+    for result in results:
+        old = previous.get(key(result))
+        if old is None:
+            continue
+        print(f"  {key(result)}: {old['seconds']:.3f}s -> {result['seconds']:.3f}s ({old['seconds'] / result['seconds']:.2f}x)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Elevator System Simulation benchmarks.")
+    parser.add_argument('-n', '--passengers', type=int, nargs='+', default=[1000, 10000], help='Numbers of passengers.')
+    parser.add_argument('-ne', '--num-elevators', type=int, nargs='+', default=[4], help='Numbers of elevators.')
+    parser.add_argument('-nf', '--num-floors', type=int, nargs='+', default=[20], help='Numbers of floors.')
+    parser.add_argument('-c', '--capacity', type=int, nargs='+', default=[10], help='Elevator capacities.')
+    parser.add_argument('-d', '--dispatcher', nargs='+', default=["nearest"], help='Dispatchers.')
+    parser.add_argument('-e', '--engine', nargs='+', default=["tick"], help='Simulation engines.')
+    parser.add_argument('-b', '--backend', nargs='+', default=["object"], help='Simulation backends.')
+    parser.add_argument('-p', '--profile', default="uniform", help='Traffic profile of the generated workloads.')
+    parser.add_argument('-r', '--rate', type=float, default=2.0, help='Passengers arriving per time unit.')
+    parser.add_argument('-s', '--seed', type=int, default=1004, help='Random seed of the workloads.')
+    parser.add_argument('--no-phases', action='store_true', help='Do not time the phases of move_time.')
+    parser.add_argument('-o', '--output-file', default=None, help='Save the results as json.')
+    parser.add_argument('--compare', default=None, help='A previous results file to compare with.')
+    args = parser.parse_args(argv)
+
+    results = []
+    for passengers, num_elevators, num_floors, capacity, dispatcher, engine, backend in itertools.product(
+            args.passengers, args.num_elevators, args.num_floors, args.capacity, args.dispatcher, args.engine, args.backend):
+        case = {"passengers": passengers, "num_elevators": num_elevators, "num_floors": num_floors, "elevator_capacity": capacity,
+                "dispatcher": dispatcher, "engine": engine, "backend": backend, "profile": args.profile, "rate": args.rate,
+                "seed": args.seed, "phases": not args.no_phases}
+        result = run_isolated(case)
+        results.append(result)
+        print(f"{passengers:>9} passengers {num_elevators:>3} elevators {num_floors:>3} floors capacity {capacity:>3} {dispatcher}/{engine}/{backend}: "
+              f"{result['seconds']:8.3f}s {result['ticks_per_second']:>10} ticks/s {result['passengers_per_second']:>10} passengers/s "
+              f"{result['peak_memory_mb']:>7} MB")
+        if "phase_seconds" in result:
+            print("    " + "  ".join(f"{name} {s:.3f}s" for name, s in result["phase_seconds"].items()))
+
+    report = {"commit": git_commit(), "python": sys.version.split()[0], "platform": platform.platform(),
+              "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "results": results}
+    if args.output_file:
+        with open(args.output_file, "w") as f:
+            json.dump(report, f, indent=4)
+    if args.compare:
+        compare(results, args.compare)
+    return report
+
+
+if __name__ == "__main__":
+    main()
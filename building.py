@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+
+import argparse
+import logging
+import sys
+from models.building import Bank, Building, BuildingSimulation
+from models.dispatchers import DISPATCHERS
+from models.requestStream import RequestStream
+
+########################################################
+# Zoned building: elevator banks with sky lobby transfers
+########################################################
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Elevator System Simulation of a building with several elevator banks, simulated in parallel.")
+    parser.add_argument('input_file', type=str, nargs='?', default="input.json", help='The input file path with passenger requests, - for standard input.')
+    parser.add_argument('output_file', type=str, nargs='?', default=None, help='The merged ndjson log. Each bank also writes its own next to it. No logs by default.')
+    parser.add_argument('-k', '--bank', nargs=5, action='append', metavar=('NAME', 'ELEVATORS', 'CAPACITY', 'LOW', 'HIGH'), default=None,
+                        help='A bank of elevators serving the floors LOW to HIGH, from the bottom up. Each bank starts at the sky lobby where the previous one ends.')
+    parser.add_argument('-nf', '--num-floors', type=int, default=100, help='Without --bank: number of floors of the tower.')
+    parser.add_argument('-ne', '--num-elevators', type=int, default=30, help='Without --bank: number of elevators, spread over the banks.')
+    parser.add_argument('-nb', '--num-banks', type=int, default=3, help='Without --bank: number of banks of the same height.')
+    parser.add_argument('-c', '--capacity', type=int, default=10, help='Without --bank: passenger capacity in each elevator.')
+    parser.add_argument('-t', '--transfer-time', type=int, default=5, help='Time units to change banks at a sky lobby. Also the time between synchronizations of the banks.')
+    parser.add_argument('-e', '--engine', choices=['tick', 'event'], default='tick', help='Simulation engine of each bank.')
+    parser.add_argument('-d', '--dispatcher', choices=list(DISPATCHERS), default="nearest", help='Algorithm that assigns the requests to the elevators.')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='Number of worker processes. One per bank, up to the number of cores, by default.')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Enable debug mode.')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(stream=sys.stdout, level=logging.DEBUG if args.verbose else logging.INFO, format='%(message)s')
+
+    if args.bank:
+        building = Building([Bank(name, int(elevators), int(capacity), int(low), int(high)) for name, elevators, capacity, low, high in args.bank],
+                            args.transfer_time)
+    else:
+        building = Building.tower(args.num_floors, args.num_elevators, args.num_banks, args.capacity, args.transfer_time)
+
+    simulation = BuildingSimulation(building, engine=args.engine, dispatcher=args.dispatcher, jobs=args.jobs, file_log=args.output_file)
+    simulation.run(RequestStream(args.input_file, building.num_floors))
+
+    for bank, stats in zip(building.banks, simulation.bank_stats):
+        print(f"{bank.name}: floors {bank.low}-{bank.high}, {bank.num_elevators} elevators, {stats.count} passengers")
+    print(f"Time {simulation.time}, {simulation.passengers} trips in {simulation.epochs} epochs on {simulation.jobs} processes")
+    print(simulation.time_summary())
+    return simulation
+
+
+if __name__ == "__main__":
+    main()
@@ -1,112 +1,140 @@
 #!/usr/bin/env python3
 
-import pandas as pd
-import json
-from collections import deque 
-import os
 import logging
 import sys
-from models.passenger import Passenger
-from models.elevatorSystem import ElevatorSystem
+from models.dispatchers import DISPATCHERS
+from models.profiler import Profiler
+from models.requestStream import RequestStream
+from models.resultCache import ResultCache
+from models.simulation import run_simulation
 import argparse
-from plot import create_plot
 
-########################################################
-# Parse parameters for simulation
-########################################################
-
-# Create the parser
-parser = argparse.ArgumentParser(description="Elevator System Simulation.")
-
-# input and output files
-parser.add_argument('input_file', type=str, nargs='?', default="input.json", help='The input file path with passenger requests.')
-parser.add_argument('output_file', type=str, nargs='?', default="elevator_time.log", help='The output file path.')
-
-# Assumed a fixed numer of elevators and all the elevators are equal.
-# Elevators in the future could have different capacities and restrictions on floors.
-# Toy parameters
-parser.add_argument('-ne', '--num-elevators', type=int, required=False, default=1, help='Number of elevators in the building.')
-parser.add_argument('-nf', '--num-floors', type=int, required=False, default=20, help='Number of floors in the building.')
-parser.add_argument('-c', '--capacity', type=int, required=False, default = 2, help='Passenger capacity in each elevator.')
-
-#Verbose
-parser.add_argument('-v', '--verbose', action='store_true', help='Enable debug mode.')
-
-#Animate
-parser.add_argument('-a', '--animate', action='store_true', help='Enable animation.')
-
-# Parse arguments
-args = parser.parse_args()
-
-# Access the input/output
-input_file = args.input_file
-output_file = args.output_file
-
-#Simulation parameters
-num_elevators= args.num_elevators
-num_floors = args.num_floors
-elevator_capacity = args.capacity
-
-#debug mode
-verbose_mode = args.verbose
-
-#animate mode
-animate = args.animate
+logger = logging.getLogger(__name__)
 
 ########################################################
-# Setup Logging 
+# Parse parameters for simulation
 ########################################################
 
-log_level = logging.DEBUG if verbose_mode else logging.INFO
-logger = logging.getLogger(__name__)
-fmt = '%(message)s'
-logging.basicConfig(stream=sys.stdout, level=log_level, format=fmt)
+def parse_args(argv=None):
+    """Parses the command line parameters of the simulation."""
+    # Create the parser
+    parser = argparse.ArgumentParser(description="Elevator System Simulation.")
+
+    # input and output files
+    parser.add_argument('input_file', type=str, nargs='?', default="input.json", help='The input file path with passenger requests, - for standard input. Read as the simulation goes.')
+    parser.add_argument('output_file', type=str, nargs='?', default="elevator_time.log", help='The output file path.')
+
+    # Assumed a fixed numer of elevators and all the elevators are equal.
+    # Elevators in the future could have different capacities and restrictions on floors.
+    # Toy parameters
+    parser.add_argument('-ne', '--num-elevators', type=int, required=False, default=1, help='Number of elevators in the building.')
+    parser.add_argument('-nf', '--num-floors', type=int, required=False, default=20, help='Number of floors in the building.')
+    parser.add_argument('-c', '--capacity', type=int, required=False, default = 2, help='Passenger capacity in each elevator.')
+
+    # Simulation engine
+    parser.add_argument('-e', '--engine', choices=['tick', 'event'], required=False, default='tick', help='tick: advance one time unit at a time. event: jump over time units where elevators only travel.')
+
+    # Scheduling algorithm
+    parser.add_argument('-d', '--dispatcher', choices=list(DISPATCHERS), required=False, default='nearest', help='Algorithm that assigns the requests to the elevators.')
+
+    # Simulation backend
+    parser.add_argument('-b', '--backend', choices=['object', 'array'], required=False, default='object', help='object: Passenger and Elevator objects. array: NumPy arrays, faster when many passengers wait at once.')
+
+    # Input order
+    parser.add_argument('-rw', '--reorder-window', type=int, required=False, default=1000, help='Number of requests buffered to put the input back in time order.')
+
+    # Log format
+    parser.add_argument('-lf', '--log-format', choices=['json', 'ndjson', 'delta', 'columnar'], required=False, default='json', help='json: write the whole log at the end. ndjson: stream one snapshot per line while simulating. delta: stream only the changes plus keyframes. The streams are gzipped if the output file ends with .gz. columnar: fixed width binary rows in the output directory, to read with numpy.memmap.')
+
+    # Checkpoints
+    parser.add_argument('-cp', '--checkpoint', type=str, default=None, metavar='FILE', help='Save the state of the simulation to this file, gzipped if it ends with .gz, to resume it after a crash.')
+    parser.add_argument('-ce', '--checkpoint-every', type=int, default=10000, metavar='TICKS', help='Time units between checkpoints.')
+    parser.add_argument('-rs', '--resume', type=str, default=None, metavar='FILE', help='Resume from a checkpoint, with the same input file. The elevators and dispatcher come from the checkpoint and the log starts at its time.')
+
+    # Result cache
+    parser.add_argument('--cache-log', action='store_true', help='Keep the result and the log in the result cache, so the same run copies the log instead of simulating again. Logs larger than the cache size are not cached.')
+    parser.add_argument('--cache-dir', type=str, default=None, help='Directory of the result cache. $ELEVATOR_CACHE_DIR or ~/.cache/elevator by default.')
+    parser.add_argument('--cache-size', type=int, default=1024, metavar='MB', help='Size of the result cache, the least recently used results are removed beyond it.')
+
+    # Live metrics
+    parser.add_argument('--metrics', type=str, default=None, metavar='FILE', help='Write metrics of the running simulation to this file in the Prometheus text format: time, time units per second, pending requests, passengers per elevator, wait time percentiles and memory.')
+    parser.add_argument('--metrics-port', type=int, default=None, metavar='PORT', help='Also serve the metrics at http://127.0.0.1:PORT/metrics.')
+    parser.add_argument('--metrics-interval', type=float, default=5.0, metavar='SECONDS', help='Seconds between two samples of the metrics.')
+
+    # Profiling
+    parser.add_argument('-p', '--profile', nargs='?', const='', default=None, metavar='FILE', help='Print the time spent in each phase and the event counts. Also save them as json if FILE is given.')
+
+    #Verbose
+    parser.add_argument('-v', '--verbose', action='store_true', help='Enable debug mode.')
+
+    #Animate
+    parser.add_argument('-a', '--animate', action='store_true', help='Enable animation.')
+    parser.add_argument('-ao', '--animation-output', type=str, default="elevator_animation.gif", help='The animation file, or a directory for lossless PNG frames if it does not end with .gif.')
+    parser.add_argument('-as', '--animation-stride', type=int, default=1, help='Draw only every k-th snapshot.')
+    parser.add_argument('-aw', '--animation-window', type=int, nargs=2, default=None, metavar=('START', 'END'), help='Draw only the snapshots between these times.')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='Number of processes rendering the animation. All the cores by default.')
+
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    """Runs the simulation of the command line.
+
+    Returns the ElevatorSystem, or a `models.resultCache.SimulationResult` with the
+    same `time`, `summary_stats()` and `time_summary()` when the result comes from the cache.
+    """
+    args = parse_args(argv)
+
+    ########################################################
+    # Setup Logging
+    ########################################################
+
+    log_level = logging.DEBUG if args.verbose else logging.INFO
+    fmt = '%(message)s'
+    logging.basicConfig(stream=sys.stdout, level=log_level, format=fmt)
+
+    ########################################################
+    # Simulation Run
+    ########################################################
+
+    profiler = Profiler() if args.profile is not None else None
+    metrics = None
+    if args.metrics is not None or args.metrics_port is not None:
+        # The reporter and its threads are only loaded for live metrics
+        from models.metricsReporter import MetricsReporter
+        metrics = MetricsReporter(args.metrics, args.metrics_port, args.metrics_interval)
+
+    # Run simulation. With --cache-log the result and the log of the same input and parameters come from the cache,
+    # except for standard input and for runs that profile, report metrics, checkpoint or print debug output.
+    # The command line always writes a log, so the cache is only used when the log is cached too.
+    if not args.cache_log or args.input_file == "-" or profiler is not None or metrics is not None or args.checkpoint or args.resume or args.verbose:
+        elevator_system = run_simulation(args.num_elevators, args.num_floors, args.capacity, RequestStream(args.input_file, args.num_floors), file_log=args.output_file,
+                                         engine=args.engine, log_format=args.log_format, backend=args.backend, dispatcher=args.dispatcher, profiler=profiler,
+                                         reorder_window=args.reorder_window, checkpoint=args.checkpoint, checkpoint_every=args.checkpoint_every, resume=args.resume,
+                                         metrics=metrics)
+    else:
+        # Has the summary of the ElevatorSystem, not its elevators and passengers
+        elevator_system = ResultCache(args.cache_dir, args.cache_size << 20, cache_logs=True).run(
+            args.input_file, args.num_elevators, args.num_floors, args.capacity, file_log=args.output_file, log_format=args.log_format,
+            engine=args.engine, backend=args.backend, dispatcher=args.dispatcher, reorder_window=args.reorder_window)
+
+    if args.animate:
+        # matplotlib is only loaded to animate
+        from plot import create_plot
+        create_plot(num_floors=args.num_floors, num_elevators=args.num_elevators, log_file=args.output_file, output_file=args.animation_output,
+                    stride=args.animation_stride, window=args.animation_window, jobs=args.jobs)
+        logger.debug("Animation created. See: %s", args.animation_output)
 
+    # Time summary
+    print(elevator_system.time_summary())
 
-########################################################
-# Simulation function
-########################################################
-def run_simulation(num_elevators, num_floors, elevator_capacity, input_requests, file_log = output_file):
-    elevator_system = ElevatorSystem(num_elevators, num_floors, elevator_capacity)
-    # Will stop until all passangers have been proccessed and reached destination.
-    input_requests = deque(input_requests)
-    total_requests = len(input_requests)
-    while input_requests or not len(elevator_system.processed_requests) == total_requests:
-        # Add request up to the current system time.
-        while input_requests and input_requests[0]["time"]==elevator_system.time:
-            request = input_requests.popleft()
-            # Creating a Passenger object per request to store metrics
-            passenger = Passenger(request['id'], request['source'], request['dest'], request['time'])
-            elevator_system.add_passenger_request(passenger)
-        elevator_system.move_time()
-
-    # Adding Extra time to show the empty elevators at the end of the log
-    elevator_system.move_time()
-
-    # Write log to file 
-    with open(file_log, "w") as f:
-        json.dump(elevator_system.log, f, indent=4)
+    # Profile
+    if profiler is not None:
+        print(profiler.report())
+        if args.profile:
+            profiler.write(args.profile)
     return elevator_system
 
 
-########################################################
-# Simulation Run
-########################################################
-
 if __name__ == "__main__":
-    # Took the approach of reading json per line because would more closely simulate a json request. 
-    # In the future this could be a Stream of data
-    input_requests = []
-    with open(input_file, 'r') as file:
-        for line in file:
-            input_requests.append(json.loads(line))
-
-    # Run simulation
-    elevator_system = run_simulation(num_elevators, num_floors, elevator_capacity, input_requests)
-
-    if animate:
-        create_plot(num_floors= num_floors, num_elevators = num_elevators, log_file = output_file) 
-        logger.debug(f"Animation created. See: elevator_animation.gif")
-
-    # Time summary
-    print(elevator_system.time_summary())
+    main()
@@ -1,19 +1,149 @@
-import json
-import random
+#!/usr/bin/env python3
 
-n = 100
-floors = 20
+import argparse
+import sys
+import numpy as np
 
-random.seed(1004)
-requests = []
-for i in range(n):
-    source, destination = random.randint(1, floors), random.randint(1, floors)
-    while source == destination:
-        destination = random.randint(1, floors)
-    requests.append({"time": random.randint(0, 10), "id": i, "source": source, "dest": destination})
+########################################################
+# Traffic profiles
+########################################################
+# A profile gives, for the fraction x of the time horizon elapsed (0 to 1):
+#  - the relative intensity of the arrivals at that time
+#  - the probabilities of incoming (lobby -> floor), outgoing (floor -> lobby)
+#    and interfloor (floor -> floor) trips
+# and whether interfloor trips can start or end at the lobby.
 
-requests.sort(key= lambda x: x["time"])
+LOBBY = 1
 
-with open("long_sample.json", "w") as f:
-    for r in requests:
-        f.write(json.dumps(r) + "\n")  
+
+def peak(x, center, width=0.2):
+    return np.exp(-((x - center) / width) ** 2)
+
+
+PROFILES = {
+    # Random source and destination, evenly spread in time
+    "uniform": (lambda x: 1.0, lambda x: (0.0, 0.0, 1.0), True),
+    # Morning: people arrive at the lobby and go up
+    "up-peak": (lambda x: peak(x, 0.5), lambda x: (0.85, 0.05, 0.10), False),
+    # Evening: people go down to the lobby and leave
+    "down-peak": (lambda x: peak(x, 0.5), lambda x: (0.05, 0.85, 0.10), False),
+    # Lunch: people go out first and come back later
+    "lunch": (lambda x: peak(x, 0.3) + peak(x, 0.7), lambda x: (0.1 + 0.8 * x, 0.9 - 0.8 * x, 0.1), False),
+    # Trips between the upper floors only, evenly spread in time
+    "interfloor": (lambda x: 1.0, lambda x: (0.0, 0.0, 1.0), False),
+    # Random source and destination, Poisson arrivals with a constant rate
+    "poisson": (lambda x: 1.0, lambda x: (0.0, 0.0, 1.0), True),
+}
+
+
+# Time units whose intensities are computed at once
+CHUNK = 65536
+
+
+def min_floors(profile):
+    """Fewest floors the profile can generate trips for: interfloor trips above the lobby need two floors."""
+    return 2 if PROFILES[profile][2] else 3
+
+
+def intensities(profile, start, stop, times):
+    """Intensity of the profile at the time units `start` to `stop` (excluded) of `times`."""
+    x = np.arange(start, stop) / times
+    return np.broadcast_to(np.asarray(PROFILES[profile][0](x), dtype=float), x.shape)
+
+
+def request_batches(num_passengers, num_floors, horizon, profile="uniform", seed=None, rate=None, batch_size=100_000):
+    """Yields (times, sources, destinations) arrays, in time order, at most `batch_size` requests at a time.
+
+    Exactly `num_passengers` arrive within times 0 to `horizon`, following the intensity
+    of the profile. With `rate` (or the poisson profile) the arrivals per time unit are
+    Poisson with mean `rate` times the intensity instead, `rate` defaults to the
+    number of passengers over the horizon. The time units are drawn `CHUNK` at a
+    time, so memory does not grow with the horizon.
+    """
+    if num_floors < min_floors(profile):
+        raise ValueError(f"The {profile} profile needs at least {min_floors(profile)} floors.")
+    _, mix, lobby_trips = PROFILES[profile]
+    first_floor = LOBBY if lobby_trips else LOBBY + 1
+    rng = np.random.default_rng(seed)
+    times = horizon + 1
+    chunks = [(start, min(start + CHUNK, times)) for start in range(0, times, CHUNK)]
+    if rate is None and profile == "poisson":
+        rate = num_passengers / times
+    remaining_weight = sum(intensities(profile, start, stop, times).sum() for start, stop in chunks)
+    remaining, mean_weight = num_passengers, remaining_weight / times
+    for start, stop in chunks:
+        weights = intensities(profile, start, stop, times)
+        if rate is not None:
+            counts = rng.poisson(rate * weights / mean_weight)
+        else:
+            # The passengers of the chunk, then their time units: the same as one draw per time unit
+            chunk_weight = weights.sum()
+            count = remaining if stop == times else rng.binomial(remaining, min(chunk_weight / remaining_weight, 1.0))
+            remaining -= count
+            remaining_weight -= chunk_weight
+            counts = rng.multinomial(count, weights / chunk_weight)
+        ends = np.cumsum(counts)
+        for first in range(0, int(ends[-1]), batch_size):
+            size = min(batch_size, int(ends[-1]) - first)
+            arrival_times = start + np.searchsorted(ends, np.arange(first, first + size), side="right")
+            # Incoming, outgoing or interfloor trip, with the mix at the arrival time
+            probabilities = np.array([np.broadcast_to(p, (size,)) for p in mix(arrival_times / times)], dtype=float)
+            cumulative = np.cumsum(probabilities / probabilities.sum(axis=0), axis=0)
+            draws = rng.random(size)
+            trips = (draws >= cumulative[0]).astype(np.int64) + (draws >= cumulative[1])
+            # Interfloor trips: a destination different from the source
+            sources = rng.integers(first_floor, num_floors + 1, size=size)
+            destinations = rng.integers(first_floor, num_floors, size=size)
+            destinations += destinations >= sources
+            # Incoming and outgoing trips from and to the lobby
+            floors = rng.integers(LOBBY + 1, num_floors + 1, size=size)
+            incoming, outgoing = trips == 0, trips == 1
+            sources[incoming], destinations[incoming] = LOBBY, floors[incoming]
+            sources[outgoing], destinations[outgoing] = floors[outgoing], LOBBY
+            yield arrival_times, sources, destinations
+
+
+def generate_requests(num_passengers, num_floors, horizon, profile="uniform", seed=None, rate=None):
+    """Yields the requests as dicts (time, id, source, dest), in time order."""
+    next_id = 0
+    for arrival_times, sources, destinations in request_batches(num_passengers, num_floors, horizon, profile, seed, rate):
+        for t, source, destination in zip(arrival_times.tolist(), sources.tolist(), destinations.tolist()):
+            yield {"time": t, "id": next_id, "source": source, "dest": destination}
+            next_id += 1
+
+
+def write_requests(file, num_passengers, num_floors, horizon, profile="uniform", seed=None, rate=None):
+    """Streams the requests to a file, one json object per line. Returns the number of requests."""
+    next_id = 0
+    for arrival_times, sources, destinations in request_batches(num_passengers, num_floors, horizon, profile, seed, rate):
+        file.write("".join(f'{{"time": {t}, "id": {next_id + i}, "source": {s}, "dest": {d}}}\n'
+                           for i, (t, s, d) in enumerate(zip(arrival_times.tolist(), sources.tolist(), destinations.tolist()))))
+        next_id += len(sources)
+    return next_id
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generates passenger requests for the Elevator System Simulation.")
+    parser.add_argument('output_file', type=str, nargs='?', default="-", help='Where to write the requests, one json object per line. Standard output by default.')
+    parser.add_argument('-n', '--num-passengers', type=int, default=100, help='Number of passengers.')
+    parser.add_argument('-nf', '--num-floors', type=int, default=20, help='Number of floors in the building.')
+    parser.add_argument('-t', '--horizon', type=int, default=10, help='Last time unit where passengers arrive.')
+    parser.add_argument('-p', '--profile', choices=list(PROFILES), default="uniform", help='Traffic profile.')
+    parser.add_argument('-r', '--rate', type=float, default=None, help='Poisson arrivals with this mean number of passengers per time unit, instead of exactly NUM_PASSENGERS.')
+    parser.add_argument('-s', '--seed', type=int, default=1004, help='Random seed, the same seed gives the same requests.')
+    args = parser.parse_args(argv)
+    if args.num_floors < min_floors(args.profile):
+        parser.error(f"the {args.profile} profile needs at least {min_floors(args.profile)} floors")
+    if args.horizon < 0 or args.num_passengers < 0:
+        parser.error("the number of passengers and the horizon cannot be negative")
+
+    parameters = (args.num_passengers, args.num_floors, args.horizon, args.profile, args.seed, args.rate)
+    if args.output_file == "-":
+        write_requests(sys.stdout, *parameters)
+    else:
+        with open(args.output_file, "w") as f:
+            write_requests(f, *parameters)
+
+
+if __name__ == "__main__":
+    main()
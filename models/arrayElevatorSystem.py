@@ -0,0 +1,332 @@
+import logging
+import numpy as np
+from .passenger import Passenger
+from .tripStatistics import TripStatistics
+from .simulationLog import MemoryLog, NullLog
+
+# Elevator and passenger directions
+UP, DOWN, IDLE = 1, -1, 0
+# Larger than any sort key
+NO_KEY = np.iinfo(np.int64).max
+# Added to the sort keys of the pickups, so that they come after the drop-offs
+PICKUP_KEY = 1 << 48
+
+
+class ArrayElevatorSystem:
+    """ElevatorSystem backed by NumPy arrays instead of Passenger and Elevator objects.
+
+    Each phase of `move_time` runs as vectorized operations over the passengers that
+    are still in the system, and it gives the same results as `ElevatorSystem`:
+    the same assignments, pickup and drop-off times and log snapshots.
+    Logs that record changes (DeltaLog) and event subscribers are not supported.
+    """
+    logger = logging.getLogger(__name__)
+
+    def __init__(self, num_elevators, num_floors, elevator_capacity, log=None, profiler=None, stats=None):
+        self.num_floors = num_floors
+        self.capacity = elevator_capacity
+        self.elevator_ids = ["E" + str(i+1) for i in range(num_elevators)]
+        # Elevators
+        self.floor = np.ones(num_elevators, dtype=np.int64)
+        self.direction = np.zeros(num_elevators, dtype=np.int64)
+        self.load = np.zeros(num_elevators, dtype=np.int64)
+        # Passengers, indexed by arrival order. -1 means not set yet.
+        self.ids = []
+        self.source = np.empty(0, dtype=np.int64)
+        self.target = np.empty(0, dtype=np.int64)
+        self.request_time = np.empty(0, dtype=np.int64)
+        self.passenger_direction = np.empty(0, dtype=np.int64)
+        self.pickup = np.empty(0, dtype=np.int64)
+        self.dropoff = np.empty(0, dtype=np.int64)
+        self.elevator = np.empty(0, dtype=np.int64)
+        self.assignation_wait_time = np.empty(0, dtype=np.int64)
+        # Passenger indexes: waiting for an elevator (arrival order), assigned to an
+        # elevator (assignment order) and done (drop-off order). The waiting and assigned
+        # ones are slices of buffers that grow geometrically, see `pending` and `assigned`.
+        self._pending = np.empty(1024, dtype=np.int64)
+        self._pending_start = self._pending_end = 0
+        self._assigned = np.empty(1024, dtype=np.int64)
+        self._num_assigned = 0
+        self.processed = []
+        self.time = 0
+        self.log = log if log is not None else MemoryLog()
+        if hasattr(self.log, "observe"):
+            raise ValueError("The array backend does not support logs that record changes.")
+        self._passengers = []
+        # Wait and total times, updated at each drop-off
+        self.stats = stats if stats is not None else TripStatistics()
+        # Phase timings and event counters, see `models.profiler`
+        self.profiler = profiler
+        if profiler is not None:
+            profiler.attach(self)
+
+    def _grow(self, size):
+        """Makes room for `size` passengers."""
+        capacity = len(self.source)
+        if size <= capacity:
+            return
+        capacity = max(size, 2 * capacity, 1024)
+        for name in ("source", "target", "request_time", "passenger_direction", "pickup", "dropoff", "elevator", "assignation_wait_time"):
+            array = np.full(capacity, -1, dtype=np.int64)
+            array[:len(self.ids)] = getattr(self, name)[:len(self.ids)]
+            setattr(self, name, array)
+
+    @property
+    def pending(self):
+        """Indexes of the passengers waiting for an elevator, in arrival order."""
+        return self._pending[self._pending_start:self._pending_end]
+
+    @property
+    def assigned(self):
+        """Indexes of the passengers assigned to an elevator, in assignment order."""
+        return self._assigned[:self._num_assigned]
+
+    @staticmethod
+    def _buffer(buffer, live, size):
+        """`buffer`, or a buffer twice as large, with the `live` values at its start and room for `size` values."""
+        if size > len(buffer):
+            buffer = np.empty(max(2 * len(buffer), size), dtype=np.int64)
+        buffer[:len(live)] = live
+        return buffer
+
+    def _queue(self, indexes):
+        """Adds passengers at the end of the waiting ones."""
+        if self._pending_end + len(indexes) > len(self._pending):
+            # Moves the waiting passengers to the start of the buffer, growing it if they fill half of it
+            live = self.pending.copy()
+            self._pending = self._buffer(self._pending, live, 2 * (len(live) + len(indexes)))
+            self._pending_start, self._pending_end = 0, len(live)
+        self._pending[self._pending_end:self._pending_end + len(indexes)] = indexes
+        self._pending_end += len(indexes)
+
+    def _assign(self, indexes):
+        """Adds passengers at the end of the assigned ones."""
+        size = self._num_assigned + len(indexes)
+        if size > len(self._assigned):
+            self._assigned = self._buffer(self._assigned, self.assigned, size)
+        self._assigned[self._num_assigned:size] = indexes
+        self._num_assigned = size
+
+    def add_requests(self, requests):
+        """Adds the passenger requests (dicts with id, source, dest and time) that arrive at the current time."""
+        if not requests:
+            return
+        start, end = len(self.ids), len(self.ids) + len(requests)
+        self._grow(end)
+        self.ids.extend(r["id"] for r in requests)
+        # One conversion for the three columns
+        self.source[start:end], self.target[start:end], self.request_time[start:end] = np.array([(r["source"], r["dest"], r["time"]) for r in requests], dtype=np.int64).T
+        self.passenger_direction[start:end] = np.where(self.source[start:end] < self.target[start:end], UP, DOWN)
+        self.assignation_wait_time[start:end] = 0
+        self._queue(np.arange(start, end))
+
+    def add_passenger_request(self, passenger):
+        """Adds a new passenger request to the system."""
+        if isinstance(passenger, Passenger):
+            self.add_requests([{"id": passenger.id, "source": passenger.source_floor, "dest": passenger.target_floor, "time": passenger.request_time}])
+        else:
+            raise TypeError("Needs to be a Passenger object.")
+
+    def schedule_elevators(self):
+        """Assigns each waiting request, in arrival order, to the closest elevator that is not full.
+
+        The closest elevators are computed for all the requests at once. The requests are
+        accepted up to the first one that finds its elevator already full, and the rest
+        are assigned again against the remaining elevators.
+        """
+        pending = self.pending
+        while len(pending):
+            free = self.capacity - self.load
+            full = free <= 0
+            if full.all():
+                self.assignation_wait_time[pending] += 1
+                if self.profiler is not None:
+                    self.profiler.count("full_car_rejections", len(pending))
+                break
+            # With S free places some elevator is already full for one of the first S + 1 requests
+            window = pending[:free[~full].sum() + 1]
+            distance = np.abs(self.source[window][:, None] - self.floor[None, :])
+            distance[:, full] = NO_KEY
+            choice = distance.argmin(axis=1)
+            # Position of each request in the queue of its elevator
+            rank = np.cumsum(choice[:, None] == np.arange(len(free)), axis=0)[np.arange(len(choice)), choice] - 1
+            overflow = rank >= free[choice]
+            cut = overflow.argmax() if overflow.any() else len(window)
+            accepted = pending[:cut]
+            self.elevator[accepted] = choice[:cut]
+            self.load += np.bincount(choice[:cut], minlength=len(free))
+            self._assign(accepted)
+            if self.profiler is not None:
+                self.profiler.count("assignments", int(cut))
+            pending = pending[cut:]
+        self._pending_start = self._pending_end - len(pending)
+
+    def move_passengers(self):
+        """Drops off the passengers at their target floor and picks up the ones at their source floor."""
+        assigned = self.assigned
+        if not len(assigned):
+            return
+        elevator = self.elevator[assigned]
+        floor = self.floor[elevator]
+        at_target = self.target[assigned] == floor
+        at_source = self.source[assigned] == floor
+        if not (at_target | at_source).any():
+            # Every elevator is between stops
+            return
+        direction = self.direction[elevator]
+        drop = (self.pickup[assigned] >= 0) & at_target
+        pick = at_source & ~drop & ((direction == self.passenger_direction[assigned]) | (direction == IDLE))
+        if self.profiler is not None:
+            self.profiler.count("dropoffs", int(drop.sum()))
+        if drop.any():
+            dropped = assigned[drop]
+            # Done passengers are recorded elevator by elevator, in assignment order
+            done = dropped[np.lexsort((np.flatnonzero(drop), elevator[drop]))].tolist()
+            self.processed.extend(done)
+            for elevator_position, request_time, pickup in zip(self.elevator[done].tolist(), self.request_time[done].tolist(), self.pickup[done].tolist()):
+                self.stats.record(self.elevator_ids[elevator_position], request_time, pickup, self.time)
+            self.dropoff[dropped] = self.time
+            load = self.load - np.bincount(elevator[drop], minlength=len(self.load))
+            emptied = (load == 0) & (self.load > 0)
+            # A passenger going to its own source floor is checked for pickup after being dropped off,
+            # when the last drop-off empties the elevator its direction is already reset.
+            if (drop & at_source).any():
+                position = np.arange(len(assigned))
+                last = np.full(len(self.load), -1)
+                np.maximum.at(last, elevator, position)
+                direction = np.where(emptied[elevator] & (position == last[elevator]), IDLE, direction)
+                pick |= drop & at_source & ((direction == self.passenger_direction[assigned]) | (direction == IDLE))
+            self.load = load
+            self.direction[emptied] = IDLE
+        if self.profiler is not None:
+            self.profiler.count("pickups", int((pick & (self.pickup[assigned] < 0)).sum()))
+        self.pickup[assigned[pick]] = self.time
+        if drop.any():
+            # `assigned` is a slice of the buffer: only overwritten once it is no longer read
+            kept = assigned[~drop]
+            self._assigned[:len(kept)] = kept
+            self._num_assigned = len(kept)
+
+    def next_stops(self):
+        """Returns, per elevator, whether it has passengers, the floor it is heading to,
+        whether that floor is a drop-off and the passenger that sets it."""
+        assigned = self.assigned
+        count = len(assigned)
+        elevator = self.elevator[assigned]
+        on_board = self.pickup[assigned] >= 0
+        stops = np.where(on_board, self.target[assigned], self.source[assigned])
+        # Nearest stop, drop-offs before pickups and ties to the passenger assigned first
+        key = np.abs(self.floor[elevator] - stops) * count + np.arange(count)
+        key[~on_board] += PICKUP_KEY
+        nearest_key = np.full(len(self.floor), NO_KEY)
+        np.minimum.at(nearest_key, elevator, key)
+        active = nearest_key != NO_KEY
+        dropping = nearest_key < PICKUP_KEY
+        position = nearest_key[active] % PICKUP_KEY % count
+        nearest = np.full(len(self.floor), -1)
+        nearest[active] = assigned[position]
+        stop = self.floor.copy()
+        stop[active] = stops[position]
+        return active, stop, dropping, nearest
+
+    def _head_to(self, ticks, active, stop, dropping, nearest):
+        """Moves the active elevators `ticks` floors towards their next stop."""
+        step = np.sign(stop - self.floor)
+        moving = dropping & (step != 0)
+        self.direction[moving] = step[moving]
+        picking = active & ~dropping
+        self.direction[picking] = self.passenger_direction[nearest[picking]]
+        self.floor += step * ticks
+
+    def move_elevators(self):
+        """Moves elevators according to scheduling."""
+        if len(self.assigned):
+            self._head_to(1, *self.next_stops())
+
+    def idle_ticks(self, horizon=None):
+        """Number of upcoming time units in which the elevators only travel, see `ElevatorSystem.idle_ticks`."""
+        if len(self.pending) and (self.load < self.capacity).any():
+            return 0
+        if not len(self.assigned):
+            return horizon
+        active, stop, _, _ = self.next_stops()
+        step = np.sign(stop - self.floor)
+        if (active & (step == 0)).any():
+            return 0
+        # Floors to go until any floor where one of its passengers gets in or out
+        assigned = self.assigned
+        elevator = self.elevator[assigned]
+        reach = np.full(len(self.floor), NO_KEY)
+        for floors in (self.source[assigned], self.target[assigned]):
+            distance = (floors - self.floor[elevator]) * step[elevator]
+            np.minimum.at(reach, elevator, np.where(distance >= 0, distance, NO_KEY))
+        ticks = int(reach[active].min())
+        return ticks if horizon is None else min(ticks, horizon)
+
+    def skip_time(self, ticks):
+        """Advances the system by `ticks` time units in which the elevators only travel."""
+        self.assignation_wait_time[self.pending] += ticks
+        if self.profiler is not None:
+            self.profiler.count("full_car_rejections", len(self.pending) * ticks)
+        if len(self.assigned):
+            self._head_to(ticks, *self.next_stops())
+        self.time += ticks
+
+    def all_requests_processed(self):
+        """Checks if all requests have been processed."""
+        return len(self.pending) == 0 and len(self.assigned) == 0
+
+    def log_positions(self):
+        """Log the positions of the elevators and passengers"""
+        if isinstance(self.log, NullLog):
+            return
+        ids = self.ids
+        source, target, elevator = self.source.tolist(), self.target.tolist(), self.elevator.tolist()
+        passenger_positions = {ids[i]: {"floor": source[i], "status": "W"} for i in self.pending.tolist()}
+        pickup = self.pickup.tolist()
+        passengers_assigned = {e: [] for e in self.elevator_ids}
+        # Passengers grouped by elevator, in assignment order
+        for i in self.assigned[np.argsort(self.elevator[self.assigned], kind="stable")].tolist():
+            elevator_id = self.elevator_ids[elevator[i]]
+            passengers_assigned[elevator_id].append(ids[i])
+            if pickup[i] < 0:
+                passenger_positions[ids[i]] = {"floor": source[i], "status": "W", "elevator": elevator_id}
+            else:
+                sign = 1 if source[i] < target[i] else -1
+                passenger_positions[ids[i]] = {"floor": source[i] + sign*abs(self.time - pickup[i]), "status": "T", "elevator": elevator_id}
+        for i in self.processed:
+            passenger_positions[ids[i]] = {"floor": target[i], "status": "D", "elevator": self.elevator_ids[elevator[i]]}
+        self.log.write({
+            'time': self.time,
+            'positions': dict(zip(self.elevator_ids, self.floor.tolist())),
+            'passengers_assigned': passengers_assigned,
+            'passengers_positions': passenger_positions,
+        })
+
+    def move_time(self):
+        """Advances the system by one time unit."""
+        self.schedule_elevators()
+        self.log_positions()
+        self.move_passengers()
+        self.move_elevators()
+        self.time += 1
+
+    @property
+    def processed_requests(self):
+        """The done passengers as Passenger objects, in drop-off order."""
+        for i in self.processed[len(self._passengers):]:
+            passenger = Passenger(self.ids[i], int(self.source[i]), int(self.target[i]), int(self.request_time[i]))
+            passenger.pickup_time = int(self.pickup[i])
+            passenger.dropoff_time = int(self.dropoff[i])
+            passenger.assignation_wait_time = int(self.assignation_wait_time[i])
+            passenger.assigned_elevator = self.elevator_ids[self.elevator[i]]
+            self._passengers.append(passenger)
+        return self._passengers
+
+    def summary_stats(self):
+        """Min, max, mean and percentiles of the wait and total times of the processed requests."""
+        return self.stats.summary()
+
+    def time_summary(self):
+        """Summary of the requests"""
+        return self.stats.report()
@@ -0,0 +1,93 @@
+import numpy as np
+
+
+def pickup_costs(floors, moving, turns, sources, directions):
+    """Collective control cost of every elevator for every (source floor, direction) group.
+
+    `floors`, `moving` (1 up, -1 down, 0 idle) and `turns` (farthest stop in the moving
+    direction) have one value per elevator, `sources` and `directions` (1 or -1) one
+    per group. Returns a groups x elevators matrix: the distance for an idle elevator
+    or one coming this way in the passenger's direction, otherwise the way to its
+    turn and back.
+    """
+    floors, moving, turns = (np.asarray(a, dtype=np.float64)[None, :] for a in (floors, moving, turns))
+    sources, directions = (np.asarray(a, dtype=np.float64)[:, None] for a in (sources, directions))
+    distance = np.abs(floors - sources)
+    on_the_way = (moving == 0) | (((sources - floors) * moving >= 0) & (directions == moving))
+    return np.where(on_the_way, distance, np.abs(turns - floors) + np.abs(turns - sources))
+
+
+def transportation(cost, supply, capacity):
+    """Minimum cost flow of `supply` units per row to the columns, at most `capacity` per column.
+
+    Successive shortest paths: each step sends as much as possible along the cheapest
+    path from a row with supply left to a column with room, possibly moving units
+    already sent between columns. The capacities must cover the supply. Rows with the
+    same costs should be grouped beforehand: the number of steps grows with the rows
+    and columns, not with the units sent, and each step is a few NumPy operations on
+    rows x columns² values. The units that fit in the cheapest column of their row are
+    sent first, so only the rows competing for a column take steps. Returns the rows x
+    columns flow.
+    """
+    cost = np.asarray(cost, dtype=np.float64)
+    supply = np.array(supply, dtype=np.int64)
+    capacity = np.array(capacity, dtype=np.int64)
+    rows, columns = cost.shape
+    if supply.sum() > capacity.sum():
+        raise ValueError("The capacities do not cover the supply.")
+    flow = np.zeros((rows, columns), dtype=np.int64)
+    # Warm start: units sent to the cheapest column of their row while it has room. Every
+    # unit is as cheap as it can be, so the flow is optimal for what it sends and the
+    # paths below only handle the rows that compete for a column.
+    cheapest = cost.argmin(1)
+    for row in range(rows):
+        column = cheapest[row]
+        amount = min(supply[row], capacity[column])
+        flow[row, column] = amount
+        supply[row] -= amount
+        capacity[column] -= amount
+    everything = np.arange(columns)
+    # Cost of moving a unit of a row from column k to column j
+    difference = cost[:, None, :] - cost[:, :, None]
+    while supply.sum():
+        # Cheapest way into each column from a row with supply left
+        open_rows = np.where(supply[:, None] > 0, cost, np.inf)
+        first = open_rows.argmin(0)
+        distance = open_rows[first, everything]
+        # Cheapest way to move a unit from column k to column j through a row sending to k
+        sending = np.flatnonzero(flow.any(1))
+        if len(sending):
+            change = np.where(flow[sending, :, None] > 0, difference[sending], np.inf)
+            through = change.argmin(0)
+            move = np.take_along_axis(change, through[None], 0)[0]
+            through = sending[through]
+        else:
+            through, move = np.zeros((columns, columns), dtype=np.int64), np.full((columns, columns), np.inf)
+        np.fill_diagonal(move, np.inf)
+        # Bellman-Ford over the columns, there are no negative cycles while the flow is optimal
+        parent = np.full(columns, -1)
+        for _ in range(columns):
+            candidates = distance[:, None] + move
+            source = candidates.argmin(0)
+            shorter = candidates[source, everything] < distance
+            if not shorter.any():
+                break
+            distance[shorter] = candidates[source, everything][shorter]
+            parent[shorter] = source[shorter]
+        column = int(np.where(capacity > 0, distance, np.inf).argmin())
+        # Walk back the path and send as much as it takes
+        path, amount, step = [], capacity[column], column
+        while parent[step] >= 0:
+            row = through[parent[step], step]
+            path.append((row, parent[step], step))
+            amount = min(amount, flow[row, parent[step]])
+            step = parent[step]
+        row = first[step]
+        amount = min(amount, supply[row])
+        flow[row, step] += amount
+        supply[row] -= amount
+        capacity[column] -= amount
+        for row, origin, destination in path:
+            flow[row, origin] -= amount
+            flow[row, destination] += amount
+    return flow
@@ -0,0 +1,337 @@
+import heapq
+import logging
+import multiprocessing
+import os
+from collections import deque
+from itertools import count
+from .elevatorSystem import ElevatorSystem
+from .dispatchers import get_dispatcher
+from .requestStream import ArrivalQueue
+from .simulationLog import NdjsonLog, NullLog, read_log
+from .tripStatistics import TripStatistics
+
+logger = logging.getLogger(__name__)
+
+
+class Bank:
+    """A bank of identical elevators serving the floors `low` to `high`."""
+
+    def __init__(self, name, num_elevators, elevator_capacity, low, high):
+        if low >= high:
+            raise ValueError(f"Bank {name} must serve at least two floors.")
+        self.name = name
+        self.num_elevators = num_elevators
+        self.elevator_capacity = elevator_capacity
+        self.low = low
+        self.high = high
+
+    def __repr__(self):
+        return f"Bank({self.name!r}, {self.num_elevators}, {self.elevator_capacity}, {self.low}, {self.high})"
+
+
+class Building:
+    """Stacked elevator banks, each one starting at the sky lobby where the one below ends.
+
+    A trip between floors of different banks takes the banks in between, with a
+    transfer at each sky lobby that takes `transfer_time` time units.
+    """
+
+    def __init__(self, banks, transfer_time=5):
+        if not banks:
+            raise ValueError("A building needs at least one bank.")
+        for below, above in zip(banks, banks[1:]):
+            if above.low != below.high:
+                raise ValueError(f"Bank {above.name} starts at floor {above.low}, not at the sky lobby {below.high} of bank {below.name}.")
+        if transfer_time < 1:
+            raise ValueError("The transfer time must be at least one time unit.")
+        self.banks = banks
+        self.transfer_time = transfer_time
+
+    @classmethod
+    def tower(cls, num_floors, num_elevators, num_banks, elevator_capacity, transfer_time=5):
+        """`num_banks` banks of about the same number of floors and elevators."""
+        lobbies = [1 + round(i * (num_floors - 1) / num_banks) for i in range(num_banks + 1)]
+        banks = [Bank(f"B{i + 1}", num_elevators // num_banks + (i < num_elevators % num_banks), elevator_capacity, lobbies[i], lobbies[i + 1])
+                 for i in range(num_banks)]
+        return cls(banks, transfer_time)
+
+    @property
+    def num_floors(self):
+        return self.banks[-1].high
+
+    def bank_of(self, floor, upwards):
+        """The bank serving `floor`, the one above a sky lobby when going up."""
+        for i, bank in enumerate(self.banks):
+            if bank.low <= floor < bank.high or (floor == bank.high and (not upwards or i == len(self.banks) - 1)):
+                return i
+        raise ValueError(f"Floor {floor} is not served by any bank.")
+
+    def route(self, source, dest):
+        """The legs of a trip: (bank position, source, dest) one per bank it goes through."""
+        upwards = dest > source
+        first, last = self.bank_of(source, upwards), self.bank_of(dest, not upwards)
+        step = 1 if last >= first else -1
+        legs, floor = [], source
+        for i in range(first, last + step, step):
+            bank = self.banks[i]
+            to = dest if i == last else (bank.high if upwards else bank.low)
+            legs.append((i, floor, to))
+            floor = to
+        return legs
+
+
+class BankSimulation:
+    """The elevator system of one bank, advanced one epoch at a time."""
+
+    def __init__(self, bank, first_elevator, engine="tick", dispatcher="nearest", file_log=None):
+        log = NdjsonLog(file_log) if file_log is not None else NullLog()
+        self.elevator_system = ElevatorSystem(bank.num_elevators, bank.high, bank.elevator_capacity, log=log, dispatcher=get_dispatcher(dispatcher),
+                                              start_floor=bank.low, first_elevator=first_elevator)
+        self.engine = engine
+        self.arrivals = deque()
+        # Passengers already reported as done
+        self.reported = 0
+
+    def advance(self, requests, until):
+        """Adds the requests (in time order, none before the current time) and runs up to time `until`.
+
+        Returns the legs done meanwhile as (id, elevator, request_time, pickup_time, dropoff_time).
+        """
+        elevator_system = self.elevator_system
+        self.arrivals.extend(requests)
+        while elevator_system.time < until:
+            arrivals = []
+            while self.arrivals and self.arrivals[0]["time"] == elevator_system.time:
+                arrivals.append(self.arrivals.popleft())
+            elevator_system.add_requests(arrivals)
+            if self.engine == "event":
+                next_time = self.arrivals[0]["time"] if self.arrivals else until
+                ticks = elevator_system.idle_ticks(min(next_time, until) - elevator_system.time)
+                if ticks:
+                    elevator_system.skip_time(ticks)
+                    continue
+            elevator_system.move_time()
+        done = elevator_system.processed_requests[self.reported:]
+        self.reported += len(done)
+        return [(p.id, p.assigned_elevator, p.request_time, p.pickup_time, p.dropoff_time) for p in done]
+
+    def finish(self):
+        """One more time unit with the empty elevators, like `run_simulation`, and closes the log."""
+        self.elevator_system.move_time()
+        self.elevator_system.log.close()
+        return {"time": self.elevator_system.time, "stats": self.elevator_system.stats}
+
+
+class LocalWorker:
+    """Runs banks in this process."""
+
+    def __init__(self, simulations):
+        self.simulations = simulations
+        self.result = None
+
+    def request(self, command, *args):
+        if command == "advance":
+            batches, until = args
+            self.result = {i: simulation.advance(batches.get(i, ()), until) for i, simulation in self.simulations.items()}
+        else:
+            self.result = {i: simulation.finish() for i, simulation in self.simulations.items()}
+
+    def reply(self):
+        return self.result
+
+
+def _work(connection, simulations):
+    """Loop of a worker process: runs the requests of the coordinator on its banks."""
+    try:
+        worker = LocalWorker({i: BankSimulation(*args) for i, args in simulations.items()})
+    except Exception as error:
+        connection.send(error)
+        return
+    while True:
+        try:
+            command, *args = connection.recv()
+        except EOFError:
+            # The coordinator stopped
+            return
+        try:
+            worker.request(command, *args)
+            connection.send(worker.reply())
+        except Exception as error:
+            connection.send(error)
+            return
+        if command == "finish":
+            return
+
+
+class ProcessWorker:
+    """Runs banks in a worker process, requests and replies go through a pipe."""
+
+    def __init__(self, simulations):
+        self.connection, child = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=_work, args=(child, simulations), daemon=True)
+        self.process.start()
+        child.close()
+
+    def request(self, command, *args):
+        try:
+            self.connection.send((command, *args))
+        except (BrokenPipeError, ConnectionError):
+            # The worker stopped on an error, `reply` raises it
+            pass
+
+    def reply(self):
+        try:
+            reply = self.connection.recv()
+        except (EOFError, ConnectionError):
+            raise RuntimeError(f"Bank worker process {self.process.pid} exited with code {self.process.exitcode}.") from None
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+    def close(self):
+        self.connection.close()
+        self.process.join()
+
+
+class BuildingSimulation:
+    """Simulates the banks of a building in parallel worker processes.
+
+    Every bank has its own `ElevatorSystem`. The banks run independently for an
+    epoch of `transfer_time` time units and then synchronize: the legs done in the
+    epoch are collected and the next leg of each transfer is added to its bank, at
+    the drop-off time plus the transfer time. That is never before the next epoch,
+    so the results are the same whatever the number of processes.
+
+    `stats` has the trips: the wait time is the sum of the waits of the legs and the
+    total time goes from the request to the drop-off at the destination. The legs of
+    each bank are in `bank_stats`. A leg after a transfer has the id "<id>/<leg>".
+    """
+
+    def __init__(self, building, engine="tick", dispatcher="nearest", jobs=None, file_log=None, reorder_window=1000):
+        self.building = building
+        self.engine = engine
+        self.dispatcher = dispatcher
+        self.jobs = min(jobs or os.cpu_count() or 1, len(building.banks))
+        self.file_log = file_log
+        self.reorder_window = reorder_window
+        self.time = 0
+        self.epochs = 0
+        self.stats = TripStatistics()
+        self.bank_stats = []
+        self.bank_logs = [self.bank_log(bank) for bank in building.banks] if file_log is not None else None
+
+    def bank_log(self, bank):
+        root, extension = os.path.splitext(self.file_log[:-3] if self.file_log.endswith(".gz") else self.file_log)
+        return f"{root}.{bank.name}{extension or '.ndjson'}{'.gz' if self.file_log.endswith('.gz') else ''}"
+
+    def workers(self):
+        """The banks spread over `jobs` workers, in this process if there is only one."""
+        simulations = [{} for _ in range(self.jobs)]
+        first_elevator = 1
+        for i, bank in enumerate(self.building.banks):
+            file_log = self.bank_logs[i] if self.bank_logs is not None else None
+            simulations[i % self.jobs][i] = (bank, first_elevator, self.engine, self.dispatcher, file_log)
+            first_elevator += bank.num_elevators
+        if self.jobs == 1:
+            return [LocalWorker({i: BankSimulation(*args) for i, args in simulations[0].items()})]
+        return [ProcessWorker(s) for s in simulations]
+
+    def run(self, input_requests):
+        """Runs until every trip of `input_requests` (dicts with id, source, dest and time) is done."""
+        building = self.building
+        epoch = building.transfer_time
+        arrivals = ArrivalQueue(input_requests, self.reorder_window)
+        # Legs waiting for their epoch, per bank: (time, order, request)
+        pending = [[] for _ in building.banks]
+        order = count()
+        # Leg id -> trip: [id, request time, legs, next leg, wait time]
+        trips = {}
+        workers = self.workers()
+        try:
+            while arrivals or trips:
+                until = self.time + epoch
+                for time in range(self.time, until):
+                    for request in arrivals.pop_arrivals(time):
+                        floors = (request["source"], request["dest"])
+                        if min(floors) < building.banks[0].low or max(floors) > building.num_floors or floors[0] == floors[1]:
+                            logger.warning("Skipping passenger %s, %s to %s is not a trip in the building.", request["id"], request["source"], request["dest"])
+                            continue
+                        legs = building.route(request["source"], request["dest"])
+                        trip = [request["id"], request["time"], legs, 0, 0]
+                        self.add_leg(trip, request["time"], pending, order, trips)
+                batches = [{} for _ in workers]
+                for i, legs in enumerate(pending):
+                    batch = []
+                    while legs and legs[0][0] < until:
+                        batch.append(heapq.heappop(legs)[2])
+                    if batch:
+                        batches[i % len(workers)][i] = batch
+                for worker, batch in zip(workers, batches):
+                    worker.request("advance", batch, until)
+                for worker in workers:
+                    for done in worker.reply().values():
+                        for leg_id, elevator, request_time, pickup_time, dropoff_time in done:
+                            trip = trips.pop(leg_id)
+                            trip[4] += pickup_time - request_time
+                            trip[3] += 1
+                            if trip[3] < len(trip[2]):
+                                self.add_leg(trip, dropoff_time + building.transfer_time, pending, order, trips)
+                            else:
+                                self.stats.record(elevator, trip[1], trip[1] + trip[4], dropoff_time)
+                self.time = until
+                self.epochs += 1
+            for worker in workers:
+                worker.request("finish")
+            results = {}
+            for worker in workers:
+                results.update(worker.reply())
+        finally:
+            for worker in workers:
+                if isinstance(worker, ProcessWorker):
+                    worker.close()
+        self.time = max(result["time"] for result in results.values())
+        self.bank_stats = [results[i]["stats"] for i in range(len(building.banks))]
+        if arrivals.late:
+            logger.warning("%s requests were read after their time and arrived late.", arrivals.late)
+        if self.file_log is not None:
+            merge_logs(self.bank_logs, self.file_log)
+        return self
+
+    def add_leg(self, trip, time, pending, order, trips):
+        """Queues the next leg of a trip in its bank."""
+        bank, source, dest = trip[2][trip[3]]
+        leg_id = trip[0] if trip[3] == 0 else f"{trip[0]}/{trip[3] + 1}"
+        trips[leg_id] = trip
+        heapq.heappush(pending[bank], (time, next(order), {"id": leg_id, "source": source, "dest": dest, "time": time}))
+
+    @property
+    def passengers(self):
+        return self.stats.count
+
+    def summary_stats(self):
+        return self.stats.summary()
+
+    def time_summary(self):
+        return self.stats.report()
+
+
+def merge_logs(log_files, output_file):
+    """Writes one ndjson log with the snapshots of the banks merged by time.
+
+    A bank without a snapshot at some time (event engine) keeps its previous one.
+    """
+    streams = [read_log(log_file) for log_file in log_files]
+    upcoming = [next(stream, None) for stream in streams]
+    latest = [None] * len(streams)
+    with NdjsonLog(output_file) as log:
+        while any(snapshot is not None for snapshot in upcoming):
+            time = min(snapshot["time"] for snapshot in upcoming if snapshot is not None)
+            for i, stream in enumerate(streams):
+                if upcoming[i] is not None and upcoming[i]["time"] == time:
+                    latest[i], upcoming[i] = upcoming[i], next(stream, None)
+            merged = {"time": time, "positions": {}, "passengers_assigned": {}, "passengers_positions": {}}
+            for snapshot in latest:
+                if snapshot is not None:
+                    for key in ("positions", "passengers_assigned", "passengers_positions"):
+                        merged[key].update(snapshot[key])
+            log.write(merged)
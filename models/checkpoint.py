@@ -0,0 +1,66 @@
+import gzip
+import os
+import pickle
+
+# First line of a checkpoint file, followed by the format version and the time
+MAGIC = b"elevator-checkpoint"
+# Bumped when the pickled state changes, older checkpoints are refused
+VERSION = 1
+
+
+class Checkpoint:
+    """State of a simulation between two time units, to resume it or branch from it.
+
+    Holds the pickled `ElevatorSystem` (elevators, passengers, pending requests,
+    dispatcher and statistics) and `ArrivalQueue` (requests buffered and how many were
+    read from the input). The log and the profiler are not part of it, the restored
+    system gets new ones. Taking a checkpoint is one `pickle.dumps` and restoring it one
+    `pickle.loads`, so a checkpoint in memory is a cheap fork: every `restore` is an
+    independent copy that can go on with different requests.
+    """
+
+    def __init__(self, time, data):
+        self.time = time
+        self.data = data
+
+    @classmethod
+    def take(cls, elevator_system, arrivals):
+        """Checkpoint of a simulation at its current time, before the time unit is simulated."""
+        return cls(elevator_system.time, pickle.dumps((elevator_system, arrivals), pickle.HIGHEST_PROTOCOL))
+
+    def restore(self, input_requests, log=None, profiler=None):
+        """A new (ElevatorSystem, ArrivalQueue) at the checkpoint time.
+
+        `input_requests` is the input of the run that was checkpointed, the requests
+        it had already read are skipped. A branch can add its own requests after them.
+        """
+        elevator_system, arrivals = pickle.loads(self.data)
+        elevator_system.attach(log, profiler)
+        arrivals.resume(input_requests)
+        return elevator_system, arrivals
+
+    def save(self, path):
+        """Writes the checkpoint, gzipped if the path ends with .gz.
+
+        The file is written next to `path` and then renamed, so a crash while saving
+        leaves the previous checkpoint in place.
+        """
+        path = str(path)
+        temporary = path + ".tmp"
+        with (gzip.open(temporary, "wb", compresslevel=1) if path.endswith(".gz") else open(temporary, "wb")) as f:
+            f.write(b"%s %d %d\n" % (MAGIC, VERSION, self.time))
+            f.write(self.data)
+        os.replace(temporary, path)
+
+    @classmethod
+    def load(cls, path):
+        """Reads a checkpoint written by `save`."""
+        with open(path, "rb") as f:
+            compressed = f.read(2) == b"\x1f\x8b"
+        with gzip.open(path, "rb") if compressed else open(path, "rb") as f:
+            header = f.readline().split()
+            if len(header) != 3 or header[0] != MAGIC:
+                raise ValueError(f"{path} is not a checkpoint.")
+            if int(header[1]) != VERSION:
+                raise ValueError(f"{path} is a checkpoint of version {int(header[1])}, this version reads {VERSION}.")
+            return cls(int(header[2]), f.read())
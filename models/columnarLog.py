@@ -0,0 +1,147 @@
+import json
+import os
+import numpy as np
+
+# One row per passenger per snapshot, one row per elevator per snapshot, one row per snapshot.
+# The passenger column is the line of its id in passenger_ids.ndjson (from 0),
+# the elevator column is the position of the elevator in meta.json, -1 if none.
+PASSENGER_ROW = np.dtype([("time", "<i8"), ("passenger", "<i8"), ("floor", "<i4"), ("status", "S1"), ("elevator", "<i2")])
+ELEVATOR_ROW = np.dtype([("time", "<i8"), ("elevator", "<i2"), ("floor", "<i4")])
+INDEX_ROW = np.dtype([("time", "<i8"), ("passengers", "<i8"), ("elevators", "<i8")])
+FILES = {"passengers": ("passengers.bin", PASSENGER_ROW), "elevators": ("elevators.bin", ELEVATOR_ROW), "index": ("index.bin", INDEX_ROW)}
+
+
+class ColumnarLog:
+    """Writes the snapshots as fixed width binary rows in a directory.
+
+    passengers.bin has (time, passenger, floor, status, elevator) rows, elevators.bin
+    (time, elevator, floor) rows and index.bin, per snapshot, its time and the first
+    row of each file, so `ColumnarLogReader` can memory map them. The passenger ids
+    are written once, in passenger_ids.ndjson.
+    """
+
+    def __init__(self, log_dir):
+        if str(log_dir).endswith(".gz"):
+            raise ValueError("The columnar log can not be compressed, it is read with numpy.memmap.")
+        os.makedirs(log_dir, exist_ok=True)
+        self.log_dir = log_dir
+        self.files = {name: open(os.path.join(log_dir, file_name), "wb") for name, (file_name, _) in FILES.items()}
+        self.ids_file = open(os.path.join(log_dir, "passenger_ids.ndjson"), "w")
+        # passenger id -> passenger column
+        self.passenger_numbers = {}
+        self.elevators = None
+        self.rows = {"passengers": 0, "elevators": 0}
+        self.snapshots = 0
+
+    def write_meta(self):
+        meta = {"format": "columnar", "version": 1, "elevators": self.elevators, "snapshots": self.snapshots,
+                "files": {name: {"file": file_name, "dtype": dtype.descr} for name, (file_name, dtype) in FILES.items()}}
+        with open(os.path.join(self.log_dir, "meta.json"), "w") as f:
+            json.dump(meta, f, indent=4)
+
+    def write(self, snapshot):
+        """Appends the rows of a snapshot."""
+        time = snapshot["time"]
+        if self.elevators is None:
+            self.elevators = list(snapshot["positions"])
+            self.write_meta()
+        elevators = {elevator: i for i, elevator in enumerate(self.elevators)}
+        numbers = self.passenger_numbers
+        for passenger in snapshot["passengers_positions"]:
+            if passenger not in numbers:
+                numbers[passenger] = len(numbers)
+                self.ids_file.write(json.dumps(passenger) + "\n")
+        index = np.array([(time, self.rows["passengers"], self.rows["elevators"])], dtype=INDEX_ROW)
+        passengers = np.array([(time, numbers[passenger], position["floor"], position["status"], elevators.get(position.get("elevator"), -1))
+                               for passenger, position in snapshot["passengers_positions"].items()], dtype=PASSENGER_ROW)
+        floors = np.array([(time, elevators[elevator], floor) for elevator, floor in snapshot["positions"].items()], dtype=ELEVATOR_ROW)
+        index.tofile(self.files["index"])
+        passengers.tofile(self.files["passengers"])
+        floors.tofile(self.files["elevators"])
+        self.rows["passengers"] += len(passengers)
+        self.rows["elevators"] += len(floors)
+        self.snapshots += 1
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+        self.ids_file.close()
+        self.write_meta()
+
+    def __len__(self):
+        return self.snapshots
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ColumnarLogReader:
+    """Memory maps a `ColumnarLog` directory, nothing is read until it is used.
+
+    `passengers`, `elevators` and `index` are structured numpy arrays backed by the
+    files, and `window` slices them by time without copying.
+    """
+
+    def __init__(self, log_dir):
+        with open(os.path.join(log_dir, "meta.json")) as f:
+            self.meta = json.load(f)
+        if self.meta.get("format") != "columnar":
+            raise ValueError(f"{log_dir} is not a columnar log.")
+        self.elevator_ids = self.meta["elevators"] or []
+        with open(os.path.join(log_dir, "passenger_ids.ndjson")) as f:
+            self.passenger_ids = [json.loads(line) for line in f]
+        for name, (file_name, dtype) in FILES.items():
+            path = os.path.join(log_dir, file_name)
+            # numpy can not map empty files
+            rows = os.path.getsize(path) // dtype.itemsize
+            setattr(self, name, np.memmap(path, dtype=dtype, mode="r", shape=(rows,)) if rows else np.empty(0, dtype=dtype))
+
+    def __len__(self):
+        return len(self.index)
+
+    @property
+    def times(self):
+        return self.index["time"]
+
+    def _rows(self, first, last):
+        """Rows of the snapshots first to last - 1."""
+        passengers_end = self.index["passengers"][last] if last < len(self.index) else len(self.passengers)
+        elevators_end = self.index["elevators"][last] if last < len(self.index) else len(self.elevators)
+        if first >= last:
+            return self.passengers[:0], self.elevators[:0]
+        return (self.passengers[self.index["passengers"][first]:passengers_end],
+                self.elevators[self.index["elevators"][first]:elevators_end])
+
+    def window(self, start=None, end=None):
+        """The passenger and elevator rows of the snapshots with start <= time <= end, as views of the files."""
+        first = 0 if start is None else int(np.searchsorted(self.times, start, side="left"))
+        last = len(self.index) if end is None else int(np.searchsorted(self.times, end, side="right"))
+        return self._rows(first, last)
+
+    def snapshot(self, number):
+        """The snapshot in the json log format (as read back from json)."""
+        passengers, elevators = self._rows(number, number + 1)
+        elevator_ids, passenger_ids = self.elevator_ids, self.passenger_ids
+        passenger_positions = {}
+        passengers_assigned = {elevator: [] for elevator in elevator_ids}
+        for passenger, floor, status, elevator in zip(passengers["passenger"].tolist(), passengers["floor"].tolist(),
+                                                      passengers["status"].tolist(), passengers["elevator"].tolist()):
+            position = {"floor": floor, "status": status.decode()}
+            if elevator >= 0:
+                position["elevator"] = elevator_ids[elevator]
+                if status != b"D":
+                    passengers_assigned[elevator_ids[elevator]].append(passenger_ids[passenger])
+            passenger_positions[str(passenger_ids[passenger])] = position
+        return {
+            "time": int(self.times[number]),
+            "positions": {elevator_ids[e]: floor for e, floor in zip(elevators["elevator"].tolist(), elevators["floor"].tolist())},
+            "passengers_assigned": passengers_assigned,
+            "passengers_positions": passenger_positions,
+        }
+
+    def snapshots(self):
+        for number in range(len(self.index)):
+            yield self.snapshot(number)
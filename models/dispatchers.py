@@ -0,0 +1,239 @@
+from itertools import islice
+from .requestQueue import FloorIndex
+
+
+class Dispatcher:
+    """Decides which elevator serves each pending request.
+
+    Subclasses implement `schedule`, called once per time unit, and use
+    `ElevatorSystem.assign` and `ElevatorSystem.wait_for_elevators`. A dispatcher
+    that can move passengers not picked up yet to another elevator sets `reassigns`.
+    """
+    name = None
+    reassigns = False
+
+    def schedule(self, elevator_system):
+        """Assigns the pending requests of the system to elevators."""
+        raise NotImplementedError
+
+
+class NearestCar(Dispatcher):
+    """Each request, in arrival order, goes to the closest elevator that is not full.
+
+    The closest elevator is looked up once per source floor and direction. When an
+    elevator fills up, the requests that arrived after the one filling it are
+    looked up again against the remaining elevators.
+    """
+    name = "nearest"
+
+    def schedule(self, elevator_system):
+        requests = elevator_system.requests
+        while requests:
+            floor_index = FloorIndex(elevator_system.elevators)
+            if not floor_index:
+                elevator_system.wait_for_elevators()
+                break
+
+            # Find the closest available elevator
+            choices = {}
+            for key in requests.by_floor:
+                choices.setdefault(floor_index.closest(key[0]), []).append(key)
+
+            # The first request that finds its closest elevator full, if any
+            cutoff = None
+            for position, groups in choices.items():
+                elevator = elevator_system.elevators[position]
+                free = elevator.capacity - len(elevator.passengers)
+                first = requests.first_requests(groups, free + 1)
+                if len(first) > free:
+                    cutoff = first[free] if cutoff is None else min(cutoff, first[free])
+
+            accepted = []
+            for position, groups in choices.items():
+                for key in groups:
+                    for request, number in requests.by_floor[key].items():
+                        if cutoff is not None and number >= cutoff:
+                            break
+                        accepted.append((number, request, elevator_system.elevators[position]))
+            accepted.sort(key=lambda a: a[0])
+            for _, request, closest_elevator in accepted:
+                elevator_system.assign(request, closest_elevator)
+            if cutoff is None:
+                break
+
+
+class CostDispatcher(Dispatcher):
+    """Each request, in arrival order, goes to the elevator that is not full with the lowest `cost`."""
+
+    def cost(self, elevator, request):
+        """Cost of serving `request` with `elevator`."""
+        raise NotImplementedError
+
+    def schedule(self, elevator_system):
+        for request in list(elevator_system.requests):
+            available = [e for e in elevator_system.elevators if not e.is_full()]
+            if not available:
+                elevator_system.wait_for_elevators()
+                return
+            elevator_system.assign(request, min(available, key=lambda e: self.cost(e, request)))
+
+
+def stops(elevator):
+    """Floors where the elevator has to stop for its passengers."""
+    return [p.target_floor if p.pickup_time is not None else p.source_floor for p in elevator.passengers]
+
+
+class CollectiveControl(CostDispatcher):
+    """Direction aware nearest car.
+
+    An elevator that is idle, or already travelling towards the request floor in the
+    direction the passenger wants to go, costs its distance to the request. Any other
+    elevator has to finish its run first: it costs the distance to its farthest stop
+    in the current direction plus the way back to the request.
+    """
+    name = "collective"
+
+    def cost(self, elevator, request):
+        floor = elevator.current_floor
+        distance = abs(floor - request.source_floor)
+        if elevator.is_empty() or elevator.direction is None:
+            return distance
+        sign = 1 if elevator.direction == "up" else -1
+        if (request.source_floor - floor) * sign >= 0 and request.direction == elevator.direction:
+            return distance
+        turn = max(stops(elevator) + [floor], key=lambda f: (f - floor) * sign)
+        return abs(turn - floor) + abs(turn - request.source_floor)
+
+
+class DestinationDispatch(CollectiveControl):
+    """Groups passengers by destination, which is known when they call the elevator.
+
+    Starts from the collective control cost and adds `stop_penalty` for each new
+    floor the elevator would have to stop at (source and destination), plus
+    `load_penalty` per passenger already assigned, so passengers travelling
+    between the same floors share an elevator and the load is spread.
+    """
+    name = "destination"
+
+    def __init__(self, stop_penalty=1, load_penalty=5):
+        self.stop_penalty = stop_penalty
+        self.load_penalty = load_penalty
+
+    def cost(self, elevator, request):
+        planned = set(stops(elevator)) | {p.target_floor for p in elevator.passengers}
+        new_stops = (request.source_floor not in planned) + (request.target_floor not in planned)
+        return super().cost(elevator, request) + self.stop_penalty * new_stops + self.load_penalty * len(elevator.passengers)
+
+
+class BatchAssignment(Dispatcher):
+    """Assigns all the pending requests of a time unit at once, for the lowest total cost.
+
+    The requests are grouped by source floor and direction and a NumPy matrix has the
+    collective control cost of each group for each elevator. A minimum cost flow (see
+    `models.batchAssignment`) then sends the groups to the elevators, up to the room
+    they have left. Requests that do not fit wait, the groups waiting for longer first.
+    The solve grows with the number of groups, at most two per floor, not with the
+    number of passengers waiting.
+
+    With `reassign`, the passengers assigned but not picked up yet change elevator when
+    that saves more than `reassign_penalty`. They are matched again, one group per floor,
+    direction and elevator, only if an elevator with room left would save them that
+    much. The others stay and keep their room, so the solve does not grow with the
+    elevators they are spread over.
+    """
+    name = "batch"
+    # Cost of leaving a request of a group waiting, above any pickup cost
+    WAIT_COST = 1e6
+    # Cost of leaving an assigned passenger without an elevator, never chosen
+    UNASSIGN_COST = 1e12
+
+    def __init__(self, reassign=True, reassign_penalty=2):
+        self.reassign = self.reassigns = reassign
+        self.reassign_penalty = reassign_penalty
+        self.reassignments = 0
+
+    def schedule(self, elevator_system):
+        import numpy as np
+        from .batchAssignment import pickup_costs, transportation
+        elevators = elevator_system.elevators
+        # (source floor, direction, position of the elevator it is assigned to or None) -> passengers,
+        # the pending ones straight from the queue index, in arrival order
+        groups = {key + (None,): group for key, group in elevator_system.requests.by_floor.items()}
+        moving, turns, room = [], [], []
+        for position, elevator in enumerate(elevators):
+            committed = []
+            for passenger in elevator.passengers:
+                if self.reassign and passenger.pickup_time is None:
+                    groups.setdefault((passenger.source_floor, passenger.direction, position), []).append(passenger)
+                else:
+                    committed.append(passenger.target_floor if passenger.pickup_time is not None else passenger.source_floor)
+            sign = {"up": 1, "down": -1}.get(elevator.direction, 0) if committed else 0
+            moving.append(sign)
+            turns.append(max(committed + [elevator.current_floor], key=lambda f: (f - elevator.current_floor) * sign))
+            room.append(elevator.capacity - len(committed))
+        if not groups:
+            return
+
+        keys = list(groups)
+        cost = pickup_costs([e.current_floor for e in elevators], moving, turns, [k[0] for k in keys], [1 if k[1] == "up" else -1 for k in keys])
+        waiting = [self.UNASSIGN_COST if k[2] is not None else
+                   self.WAIT_COST + elevator_system.time - next(iter(groups[k])).request_time for k in keys]
+        for row, key in enumerate(keys):
+            if key[2] is not None:
+                cost[row] += self.reassign_penalty
+                cost[row, key[2]] -= self.reassign_penalty
+        cost = np.column_stack([cost, waiting])
+        supply = np.array([len(groups[k]) for k in keys])
+        new = np.array([k[2] is None for k in keys])
+        # Assigned passengers stay in their elevator and keep their room, unless an elevator
+        # with room for more than the passengers staying saves them more than the penalty
+        current = np.array([k[2] if k[2] is not None else 0 for k in keys])
+        own = cost[np.arange(len(keys)), current]
+        stay = ~new
+        room = np.array(room) - np.bincount(current[stay], weights=supply[stay], minlength=len(elevators)).astype(np.int64)
+        stay &= np.where(room > 0, cost[:, :-1], np.inf).min(1) >= own
+        room += np.bincount(current[~new & ~stay], weights=supply[~new & ~stay], minlength=len(elevators)).astype(np.int64)
+        # At most `free` new requests get an elevator. Some optimal solution only gives an elevator
+        # to the `free` best requests for it, compared with waiting, so the others are left out.
+        candidates = ~new & ~stay
+        free = room.sum() - supply[candidates].sum()
+        if free > 0:
+            supply = np.where(new, np.minimum(supply, free), supply)
+            rows = np.flatnonzero(new)
+            for position in range(len(elevators)):
+                order = rows[np.argsort(cost[rows, position] - cost[rows, -1], kind="stable")]
+                best = order[:np.searchsorted(np.cumsum(supply[order]), free) + 1]
+                candidates[best] = True
+        flow = np.zeros(cost.shape, dtype=np.int64)
+        flow[candidates] = transportation(cost[candidates], supply[candidates], np.append(room, supply[candidates & new].sum()))
+        cost = cost[:, :-1]
+
+        assignments = []
+        # Only the candidates can get an elevator or lose theirs, the others stay
+        for row in np.flatnonzero(candidates):
+            key = keys[row]
+            passengers = list(islice(groups[key], flow[row].sum()))
+            if key[2] is not None:
+                # The first ones stay where they are
+                passengers = passengers[flow[row, key[2]]:]
+                flow[row, key[2]] = 0
+                for passenger in passengers:
+                    elevator_system.unassign(passenger)
+                self.reassignments += len(passengers)
+            order = np.argsort(cost[row], kind="stable")
+            assignments.extend(zip(passengers, np.repeat(order, flow[row, order])))
+        for passenger, position in assignments:
+            elevator_system.assign(passenger, elevators[position])
+        if elevator_system.requests:
+            elevator_system.wait_for_elevators()
+
+
+DISPATCHERS = {dispatcher.name: dispatcher for dispatcher in (NearestCar, CollectiveControl, DestinationDispatch, BatchAssignment)}
+
+
+def get_dispatcher(name):
+    """Returns a new dispatcher from its name."""
+    try:
+        return DISPATCHERS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown dispatcher {name}. Options: {', '.join(DISPATCHERS)}") from None
@@ -1,11 +1,51 @@
+class PassengerSet:
+    """The passengers of an elevator in loading order.
+
+    Adding, removing and checking a passenger is O(1) whatever the capacity.
+    """
+    __slots__ = ("_passengers",)
+
+    def __init__(self, passengers=()):
+        # passenger -> None, dicts keep the insertion order
+        self._passengers = dict.fromkeys(passengers)
+
+    def append(self, passenger):
+        self._passengers[passenger] = None
+
+    def remove(self, passenger):
+        """Removes a passenger, KeyError if it is not in the elevator."""
+        del self._passengers[passenger]
+
+    def discard(self, passenger):
+        self._passengers.pop(passenger, None)
+
+    def __contains__(self, passenger):
+        return passenger in self._passengers
+
+    def __iter__(self):
+        return iter(self._passengers)
+
+    def __len__(self):
+        return len(self._passengers)
+
+    def __getitem__(self, index):
+        """The passenger at a position of the loading order, O(n)."""
+        return list(self._passengers)[index]
+
+    def __repr__(self):
+        return f"PassengerSet({list(self._passengers)!r})"
+
+
 class Elevator:
     """Represents an elevator in the system."""
-    def __init__(self, id, capacity):
+    __slots__ = ("id", "current_floor", "direction", "capacity", "passengers")
+
+    def __init__(self, id, capacity, floor=1):
         self.id = "E" + str(id)
-        self.current_floor = 1
+        self.current_floor = floor
         self.direction = None
         self.capacity = capacity
-        self.passengers = []
+        self.passengers = PassengerSet()
 
     def is_full(self):
         """Checks if the elevator is at full capacity."""
@@ -22,5 +62,4 @@ class Elevator:
 
     def unload_passenger(self, passenger):
         """Unloads a passenger from the elevator."""
-        if passenger in self.passengers[:]:
-            self.passengers.remove(passenger)
\ No newline at end of file
+        self.passengers.discard(passenger)
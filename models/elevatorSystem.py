@@ -1,95 +1,263 @@
 from .passenger import Passenger
 from .elevator import Elevator
+from .events import Arrival, Assignment, Pickup, Dropoff, ElevatorMove, Snapshot, TickEnd
+from .requestQueue import RequestQueue
+from .dispatchers import NearestCar
+from .simulationLog import MemoryLog, NullLog
+from .profiler import PHASES
+from .tripStatistics import TripStatistics
 import logging
-import pandas as pd
 
 class ElevatorSystem:
-    """Manages the elevators and passenger requests."""   
+    """Manages the elevators and passenger requests.
+
+    What happens is emitted as events (`models.events`) to the callbacks subscribed
+    to their class. The statistics and the log are subscribers, and an event without
+    subscribers is not even created.
+    """
     logger = logging.getLogger(__name__)
     
-    def __init__(self, num_elevators, num_floors, elevator_capacity):
-        self.elevators = [Elevator(i+1,elevator_capacity) for i in range(num_elevators)]
+    def __init__(self, num_elevators, num_floors, elevator_capacity, log=None, dispatcher=None, profiler=None, stats=None, start_floor=1, first_elevator=1):
+        # The elevators start at `start_floor` and are named E<first_elevator> onwards, e.g. for a bank of a building
+        self.elevators = [Elevator(first_elevator + i, elevator_capacity, start_floor) for i in range(num_elevators)]
         self.num_floors = num_floors
-        self.requests = []
+        self.requests = RequestQueue()
         self.processed_requests = []
         self.time = 0
-        self.log = []
+        # Decides which elevator serves each request
+        self.dispatcher = dispatcher if dispatcher is not None else NearestCar()
+        # Wait and total times, updated at each drop-off
+        self.stats = stats if stats is not None else TripStatistics()
+        self.attach(log, profiler)
+
+    def attach(self, log=None, profiler=None):
+        """Sets the log and the profiler, also to go on with a system restored from a checkpoint.
+
+        The subscribers start over with the statistics and the log.
+        """
+        # Event class -> callbacks, only the classes with subscribers
+        self.subscribers = {}
+        self.subscribe(Dropoff, self.stats.dropoff)
+        # Where the snapshots go, e.g. an NdjsonLog to stream them to disk
+        self.log = log if log is not None else MemoryLog()
+        if hasattr(self.log, "observe"):
+            # Logs of the passenger transitions (DeltaLog) subscribe to what they need
+            self.log.observe(self)
+        elif not isinstance(self.log, NullLog):
+            self.subscribe(Snapshot, self.write_snapshot)
+        # Phase timings and event counters, see `models.profiler`
+        self.profiler = profiler
+        if profiler is not None:
+            profiler.attach(self)
+
+    def __getstate__(self):
+        """What a checkpoint keeps (see `models.checkpoint`): everything but the log and the profiler."""
+        # The phases timed by a profiler are wrapped on the instance
+        state = {key: value for key, value in self.__dict__.items() if key not in PHASES}
+        state.update(log=None, subscribers=None, profiler=None)
+        return state
+
+    def subscribe(self, event, callback):
+        """Calls `callback(event)` for every event of the class `event`, e.g. `models.events.Pickup`.
+
+        The subscribers are not part of a checkpoint.
+        """
+        self.subscribers.setdefault(event, []).append(callback)
+
+    def unsubscribe(self, event, callback):
+        """Stops calling `callback`, e.g. `unsubscribe(Dropoff, system.stats.dropoff)` to skip the statistics."""
+        self.subscribers[event].remove(callback)
+        if not self.subscribers[event]:
+            del self.subscribers[event]
+
+    def emit(self, event):
+        """Calls the subscribers of the event. The callers check that the event class has subscribers first."""
+        for callback in self.subscribers[type(event)]:
+            callback(event)
 
     def add_passenger_request(self, passenger):
         """Adds a new passenger request to the system."""
         if isinstance(passenger, Passenger):
             self.requests.append(passenger)
+            if Arrival in self.subscribers:
+                self.emit(Arrival(self.time, passenger))
         else:
             raise TypeError("Needs to be a Passenger object.")
 
+    def add_requests(self, requests):
+        """Adds the passenger requests (dicts with id, source, dest and time) that arrive at the current time."""
+        for request in requests:
+            # Creating a Passenger object per request to store metrics
+            self.add_passenger_request(Passenger(request['id'], request['source'], request['dest'], request['time']))
+
+    def assign(self, request, elevator):
+        """Assigns a pending request to an elevator."""
+        request.assigned_elevator = elevator.id
+        ElevatorSystem.logger.debug("Passenger %s is assigned into elevator %s", request.id, elevator.id)
+        elevator.load_passenger(request)
+        if Assignment in self.subscribers:
+            self.emit(Assignment(self.time, request, elevator))
+        if self.profiler is not None:
+            self.profiler.count("assignments")
+        self.requests.remove(request)
+
+    def unassign(self, passenger):
+        """Takes a passenger that is not picked up yet out of its elevator, back to the pending requests."""
+        elevator = next(e for e in self.elevators if e.id == passenger.assigned_elevator)
+        elevator.unload_passenger(passenger)
+        if elevator.is_empty():
+            elevator.direction = None
+        passenger.assigned_elevator = None
+        ElevatorSystem.logger.debug("Passenger %s is taken out of elevator %s", passenger.id, elevator.id)
+        self.requests.append(passenger)
+
+    def wait_for_elevators(self):
+        """The pending requests wait one more time unit because every elevator is full."""
+        self.requests.wait()
+        if self.profiler is not None:
+            self.profiler.count("full_car_rejections", len(self.requests))
+        if ElevatorSystem.logger.isEnabledFor(logging.DEBUG):
+            for request in self.requests:
+                ElevatorSystem.logger.debug("Passenger %s is waiting. Elevator is full adding wait_time: %s", request.id, request.wait_time())
+
     def schedule_elevators(self):
-        """Schedules elevators to fulfill requests."""
-        for request in self.requests[:]:
-            # Find the closest available elevator
-            closest_elevator = min(
-                self.elevators, 
-                key=lambda e: abs(e.current_floor - request.source_floor) if not e.is_full() else float('inf')
-            )
-            if not closest_elevator.is_full():
-                request.assigned_elevator = closest_elevator.id
-                ElevatorSystem.logger.debug(f"Passenger {request.id} is assigned into elevator {closest_elevator.id}")
-                closest_elevator.load_passenger(request)
-                self.requests.remove(request)
-            else:
-                request.assignation_wait_time += 1
-                ElevatorSystem.logger.debug(f"Passenger {request.id} is waiting. Elevator is full adding wait_time: {request.wait_time()}")
+        """Schedules elevators to fulfill requests, see `models.dispatchers`."""
+        self.dispatcher.schedule(self)
 
     def move_passengers(self):
         for elevator in self.elevators:
-            if elevator.passengers[:]:
-                for passenger in elevator.passengers[:]:
+            if elevator.passengers:
+                # Unloaded once the loop is over, the passengers are not copied to iterate
+                dropped = []
+                remaining = len(elevator.passengers)
+                for passenger in elevator.passengers:
                     if passenger.target_floor == elevator.current_floor:
-                        if passenger.pickup_time is not None:  
+                        if passenger.pickup_time is not None:
                             passenger.dropoff_time = self.time
+                            if self.profiler is not None:
+                                self.profiler.count("dropoffs")
                             self.processed_requests.append(passenger)
-                            elevator.unload_passenger(passenger)
-                            if elevator.is_empty():
+                            if Dropoff in self.subscribers:
+                                self.emit(Dropoff(self.time, passenger, elevator))
+                            dropped.append(passenger)
+                            remaining -= 1
+                            if remaining == 0:
                                 elevator.direction = None
-                            ElevatorSystem.logger.debug(f"Elevator {elevator.id}.\n\tUnloading passenger: {passenger.id}")
-                            ElevatorSystem.logger.debug(f"\tRemaining passengers: {[p.id for p in self.requests]}")
+                            ElevatorSystem.logger.debug("Elevator %s.\n\tUnloading passenger: %s", elevator.id, passenger.id)
+                            if ElevatorSystem.logger.isEnabledFor(logging.DEBUG):
+                                ElevatorSystem.logger.debug("\tRemaining passengers: %s", [p.id for p in self.requests])
                     # Mark the pickup_time
                     if passenger.source_floor == elevator.current_floor and (elevator.direction == passenger.direction or elevator.direction is None):
-                        ElevatorSystem.logger.debug(f"Elevator {elevator.id} is at floor {elevator.current_floor} passenger {passenger.id} is picked up.")
+                        ElevatorSystem.logger.debug("Elevator %s is at floor %s passenger %s is picked up.", elevator.id, elevator.current_floor, passenger.id)
+                        if self.profiler is not None and passenger.pickup_time is None:
+                            self.profiler.count("pickups")
                         passenger.pickup_time = self.time
-    
+                        if Pickup in self.subscribers:
+                            self.emit(Pickup(self.time, passenger, elevator))
+                for passenger in dropped:
+                    elevator.unload_passenger(passenger)
+
+    def next_stop(self, elevator):
+        """Returns the passenger the elevator is heading to and the floor of that stop."""
+        # Move towards the nearest passenger's destination on board
+        on_board_passengers = [p for p in elevator.passengers if p.pickup_time is not None]
+        if on_board_passengers:
+            nearest_passenger = min(on_board_passengers, key=lambda p: abs(elevator.current_floor - p.target_floor))
+            return nearest_passenger, nearest_passenger.target_floor
+        # Move towards the nearest source
+        waiting_passengers = [p for p in elevator.passengers if p.pickup_time is None]
+        nearest_passenger = min(waiting_passengers, key=lambda p: abs(elevator.current_floor - p.source_floor))
+        return nearest_passenger, nearest_passenger.source_floor
+
     def move_elevators(self):
         """Moves elevators according to scheduling."""
+        moves = ElevatorMove in self.subscribers
         for elevator in self.elevators:
             if elevator.passengers:
-                # Move towards the nearest passenger's destination on board
-                on_board_passengers = [p for p in elevator.passengers if p.pickup_time is not None]
-                if on_board_passengers:
-                    nearest_passenger = min(on_board_passengers, key=lambda p: abs(elevator.current_floor - p.target_floor))
-                    ElevatorSystem.logger.debug(f"Elevator {elevator.id} is t floor {elevator.current_floor} going to drop {nearest_passenger.id} at {nearest_passenger.target_floor}")
-                    if elevator.current_floor < nearest_passenger.target_floor:
+                start = elevator.current_floor
+                nearest_passenger, floor = self.next_stop(elevator)
+                if nearest_passenger.pickup_time is not None:
+                    ElevatorSystem.logger.debug("Elevator %s is t floor %s going to drop %s at %s", elevator.id, elevator.current_floor, nearest_passenger.id, floor)
+                    if elevator.current_floor < floor:
                         elevator.direction = "up"
                         elevator.current_floor += 1
-                    elif elevator.current_floor > nearest_passenger.target_floor:
+                    elif elevator.current_floor > floor:
                         elevator.direction = "down"
                         elevator.current_floor -= 1
                 else:
-                    # Move towards the nearest source
-                    waiting_passengers = [p for p in elevator.passengers if p.pickup_time is None]
-                    nearest_passenger = min(waiting_passengers, key=lambda p: abs(elevator.current_floor - p.source_floor))
-                    ElevatorSystem.logger.debug(f"Elevator {elevator.id} is at floor {elevator.current_floor} going to pick {nearest_passenger.id} at {nearest_passenger.source_floor}")
+                    ElevatorSystem.logger.debug("Elevator %s is at floor %s going to pick %s at %s", elevator.id, elevator.current_floor, nearest_passenger.id, floor)
                     elevator.direction = nearest_passenger.direction
-                    if elevator.current_floor < nearest_passenger.source_floor:
+                    if elevator.current_floor < floor:
                         elevator.current_floor += 1
-                    elif elevator.current_floor > nearest_passenger.source_floor:
+                    elif elevator.current_floor > floor:
                         elevator.current_floor -= 1
+                if moves and elevator.current_floor != start:
+                    self.emit(ElevatorMove(self.time, elevator, elevator.current_floor - start))
+
+    def idle_ticks(self, horizon=None):
+        """Number of upcoming time units in which the elevators only travel.
+
+        During those ticks no request can be assigned, picked up or dropped off,
+        so the system can be advanced with `skip_time`. `horizon` caps the result
+        (e.g. ticks until the next arrival); None means nothing is pending at all.
+        """
+        if self.requests and not all(e.is_full() for e in self.elevators):
+            return 0
+        if self.dispatcher.reassigns and any(p.pickup_time is None for e in self.elevators for p in e.passengers):
+            # The passengers waiting for their elevator can be moved to another one at any time unit
+            return 0
+        ticks = horizon
+        for elevator in self.elevators:
+            if not elevator.passengers:
+                continue
+            # Ticks until the elevator reaches any floor where one of its passengers gets in or out
+            stops = {p.source_floor for p in elevator.passengers} | {p.target_floor for p in elevator.passengers}
+            if elevator.current_floor in stops:
+                # Also where the elevator stops now, without looking for its next stop
+                return 0
+            _, floor = self.next_stop(elevator)
+            step = floor - elevator.current_floor
+            reach = min(abs(f - elevator.current_floor) for f in stops if (f - elevator.current_floor) * step >= 0)
+            ticks = reach if ticks is None else min(ticks, reach)
+        return ticks
+
+    def skip_time(self, ticks):
+        """Advances the system by `ticks` time units in which the elevators only travel."""
+        ElevatorSystem.logger.debug('\nTime is %s, skipping %s idle time units', self.time, ticks)
+        self.requests.wait(ticks)
+        if self.profiler is not None:
+            self.profiler.count("full_car_rejections", len(self.requests) * ticks)
+        moves = ElevatorMove in self.subscribers
+        for elevator in self.elevators:
+            if elevator.passengers:
+                nearest_passenger, floor = self.next_stop(elevator)
+                step = 1 if elevator.current_floor < floor else -1
+                if nearest_passenger.pickup_time is not None:
+                    elevator.direction = "up" if step > 0 else "down"
+                else:
+                    elevator.direction = nearest_passenger.direction
+                elevator.current_floor += step * ticks
+                if moves:
+                    self.emit(ElevatorMove(self.time, elevator, step * ticks))
+        self.time += ticks
+        if TickEnd in self.subscribers:
+            self.emit(TickEnd(self.time, self))
 
     def all_requests_processed(self):
         """Checks if all requests have been processed."""
         return len(self.requests) == 0 and all(len(e.passengers) == 0 for e in self.elevators)
 
+    def all_passengers(self):
+        """All the passengers in the system: waiting, assigned and done."""
+        return list(self.requests) + [p for e in self.elevators for p in e.passengers] + self.processed_requests
+
     def log_positions(self):
-        """Log the positions of the elevators and passengers"""
-        
+        """Emits the Snapshot of the time unit, for the log."""
+        if Snapshot in self.subscribers:
+            self.emit(Snapshot(self.time, self))
+
+    def write_snapshot(self, event):
+        """Writes the positions of the elevators and passengers to the log."""
         # Passengers waiting
         passenger_positions = {passenger.id: 
             {"floor": passenger.current_floor(self.time),
@@ -116,40 +284,25 @@ class ElevatorSystem:
             'passengers_positions': passenger_positions,
         }
 
-        ElevatorSystem.logger.debug(f"Passenger positions: { " ".join( [ f"- {p}: {pos}" for p,pos in passenger_positions.items()]) }")
-        self.log.append(snapshot)
+        if ElevatorSystem.logger.isEnabledFor(logging.DEBUG):
+            ElevatorSystem.logger.debug("Passenger positions: %s", " ".join(f"- {p}: {pos}" for p, pos in passenger_positions.items()))
+        self.log.write(snapshot)
     
     def move_time(self):
         """Funny named function that advances the system by one time unit."""
-        ElevatorSystem.logger.debug(f'\nTime is {self.time}')
+        ElevatorSystem.logger.debug('\nTime is %s', self.time)
         self.schedule_elevators()
         self.log_positions()
         self.move_passengers()
         self.move_elevators()
         self.time += 1
+        if TickEnd in self.subscribers:
+            self.emit(TickEnd(self.time, self))
+
+    def summary_stats(self):
+        """Min, max, mean and percentiles of the wait and total times of the processed requests."""
+        return self.stats.summary()
 
     def time_summary(self):
         """Summary of the requests"""
-        passenger_stats = []
-        for passenger in self.processed_requests:
-            passenger_stats.append({
-                'Passenger ID': passenger.id,
-                'Wait Time': passenger.wait_time(),
-                'Total Time': passenger.total_time()
-            })
-
-        passenger_stats_df = pd.DataFrame(passenger_stats)
-        ElevatorSystem.logger.debug(passenger_stats_df)
-
-        stats_summary = passenger_stats_df.agg({
-            'Wait Time': ['min', 'max', 'mean'],
-            'Total Time': ['min', 'max', 'mean']
-        })
-        
-        stats_summary.reset_index(inplace=True)
-        long_format_data = stats_summary.melt(id_vars='index', var_name='var', value_name='Value')
-        long_format_data['Variable'] = long_format_data['index'].str.capitalize() + ' ' + long_format_data['var']
-
-        return(long_format_data[["Variable", "Value"]].to_string(index=False, header=False))
-        
-
+        return self.stats.report()
@@ -0,0 +1,74 @@
+class Event:
+    """Something that happens in an `ElevatorSystem` at `time`, see `ElevatorSystem.subscribe`."""
+    __slots__ = ("time",)
+
+    def __repr__(self):
+        fields = [name for cls in reversed(type(self).__mro__) for name in getattr(cls, "__slots__", ())]
+        return f"{type(self).__name__}({', '.join(f'{name}={getattr(self, name)!r}' for name in fields)})"
+
+
+class Arrival(Event):
+    """A passenger request is added to the system."""
+    __slots__ = ("passenger",)
+
+    def __init__(self, time, passenger):
+        self.time = time
+        self.passenger = passenger
+
+
+class Assignment(Event):
+    """A pending passenger is assigned to an elevator, again if it is reassigned."""
+    __slots__ = ("passenger", "elevator")
+
+    def __init__(self, time, passenger, elevator):
+        self.time = time
+        self.passenger = passenger
+        self.elevator = elevator
+
+
+class Pickup(Event):
+    """A passenger gets into its elevator."""
+    __slots__ = ("passenger", "elevator")
+
+    def __init__(self, time, passenger, elevator):
+        self.time = time
+        self.passenger = passenger
+        self.elevator = elevator
+
+
+class Dropoff(Event):
+    """A passenger gets out of its elevator at its destination."""
+    __slots__ = ("passenger", "elevator")
+
+    def __init__(self, time, passenger, elevator):
+        self.time = time
+        self.passenger = passenger
+        self.elevator = elevator
+
+
+class ElevatorMove(Event):
+    """An elevator moves `floors` floors (negative going down), more than one when time units are skipped."""
+    __slots__ = ("elevator", "floors")
+
+    def __init__(self, time, elevator, floors):
+        self.time = time
+        self.elevator = elevator
+        self.floors = floors
+
+
+class Snapshot(Event):
+    """The requests of the time unit are assigned and nobody has moved yet: what the logs record."""
+    __slots__ = ("system",)
+
+    def __init__(self, time, system):
+        self.time = time
+        self.system = system
+
+
+class TickEnd(Event):
+    """The system has advanced to `time`, one time unit or several skipped ones."""
+    __slots__ = ("system",)
+
+    def __init__(self, time, system):
+        self.time = time
+        self.system = system
@@ -0,0 +1,181 @@
+import logging
+import os
+import sys
+import threading
+from time import perf_counter
+from .tripStatistics import PERCENTILES, TimeHistogram
+
+logger = logging.getLogger(__name__)
+
+
+def rss_bytes():
+    """Resident memory of this process, the peak where /proc is missing, None on Windows."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes elsewhere
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def metric(lines, name, kind, description, samples):
+    """Appends a metric in the Prometheus text format.
+
+    `samples` are (name suffix, labels, value), e.g. ("_sum", {}, 10). None values are left out.
+    """
+    lines.append(f"# HELP {name} {description}")
+    lines.append(f"# TYPE {name} {kind}")
+    for suffix, labels, value in samples:
+        if value is None:
+            continue
+        labels = ",".join(f'{key}="{label}"' for key, label in labels.items())
+        lines.append(f"{name}{suffix}{{{labels}}} {value}" if labels else f"{name}{suffix} {value}")
+
+
+class MetricsReporter:
+    """Writes metrics of a running simulation in the Prometheus text format, every `interval` seconds.
+
+    A background thread samples the ElevatorSystem: the time, the time units simulated
+    per second since the previous sample, the pending requests, the passengers
+    waiting, riding and done, the riding passengers of each elevator, the wait time
+    percentiles of the last `window` drop-offs and the resident memory. It only reads
+    lengths and slices of the system, the simulation loop runs as without a reporter.
+
+    The metrics are written to `path` (through a temporary file, so a scraper never
+    reads half of it) and, with a `port`, served at http://`host`:`port`/metrics.
+    Port 0 picks a free port, see `port` once started.
+    """
+
+    def __init__(self, path=None, port=None, interval=5.0, window=1000, host="127.0.0.1"):
+        self.path = path
+        self.port = port
+        self.host = host
+        self.interval = interval
+        self.window = window
+        self.elevator_system = None
+        # Last metrics text, served over HTTP
+        self.text = ""
+        self._stopped = threading.Event()
+        self._thread = None
+        self._server = None
+        # Time and clock of the previous sample, for the time units per second
+        self._last = None
+
+    def start(self, elevator_system):
+        """Starts sampling `elevator_system`, and serving the metrics if there is a port."""
+        self.elevator_system = elevator_system
+        self._last = (elevator_system.time, perf_counter())
+        self._stopped.clear()
+        if self.port is not None:
+            # http.server is only loaded to serve the metrics
+            from http.server import ThreadingHTTPServer
+            self._server = ThreadingHTTPServer((self.host, self.port), self._handler())
+            self._server.daemon_threads = True
+            self.port = self._server.server_port
+            threading.Thread(target=self._server.serve_forever, name="metrics-server", daemon=True).start()
+            logger.info("Serving the metrics at http://%s:%s/metrics", self.host, self.port)
+        self.report()
+        self._thread = threading.Thread(target=self._run, name="metrics-reporter", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Writes the last sample and stops the thread and the server."""
+        if self._thread is None:
+            return
+        self._stopped.set()
+        self._thread.join()
+        self._thread = None
+        self.report()
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            try:
+                self.report()
+            except Exception:
+                # A failed sample must not stop the next ones
+                logger.exception("Could not report the metrics")
+
+    def _handler(self):
+        from http.server import BaseHTTPRequestHandler
+        reporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = reporter.text.encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                logger.debug("Metrics request: " + format, *args)
+
+        return Handler
+
+    def report(self):
+        """Takes a sample and writes it."""
+        self.text = self.sample()
+        if self.path is not None:
+            temporary = f"{self.path}.tmp"
+            with open(temporary, "w") as f:
+                f.write(self.text)
+            os.replace(temporary, self.path)
+
+    def sample(self):
+        """The current metrics of the system, as Prometheus text."""
+        elevator_system = self.elevator_system
+        # Read while the simulation goes on: every read is one length or one slice
+        time, now = elevator_system.time, perf_counter()
+        pending = len(elevator_system.requests)
+        riding = {elevator.id: self._riding(elevator) for elevator in elevator_system.elevators}
+        assigned = sum(len(elevator.passengers) for elevator in elevator_system.elevators)
+        done = elevator_system.processed_requests[-self.window:]
+        done_count = len(elevator_system.processed_requests)
+        last_time, last_now = self._last
+        self._last = (time, now)
+        rate = (time - last_time) / (now - last_now) if now > last_now else None
+        waits = TimeHistogram()
+        for passenger in done:
+            waits.add(passenger.pickup_time - passenger.request_time)
+        total_wait = sum(value * count for value, count in enumerate(waits.counts))
+
+        lines = []
+        metric(lines, "elevator_time", "gauge", "Current time unit of the simulation.", [("", {}, time)])
+        metric(lines, "elevator_ticks_per_second", "gauge", "Time units simulated per second since the previous sample.",
+               [("", {}, round(rate, 3) if rate is not None else None)])
+        metric(lines, "elevator_pending_requests", "gauge", "Requests waiting to be assigned to an elevator.", [("", {}, pending)])
+        metric(lines, "elevator_waiting_passengers", "gauge", "Passengers not picked up yet, assigned or not.",
+               [("", {}, pending + assigned - sum(riding.values()))])
+        metric(lines, "elevator_passengers_done_total", "counter", "Passengers dropped off at their destination.", [("", {}, done_count)])
+        metric(lines, "elevator_riding_passengers", "gauge", "Passengers inside each elevator.",
+               [("", {"elevator": elevator_id}, count) for elevator_id, count in riding.items()])
+        metric(lines, "elevator_capacity", "gauge", "Passenger capacity of each elevator.",
+               [("", {"elevator": elevator.id}, elevator.capacity) for elevator in elevator_system.elevators])
+        metric(lines, "elevator_wait_time", "summary", f"Time units from request to pickup of the last {self.window} passengers dropped off.",
+               [("", {"quantile": str(q / 100)}, round(waits.quantile(q / 100), 3) if waits.count else None) for q in PERCENTILES] + [("_sum", {}, total_wait), ("_count", {}, waits.count)])
+        metric(lines, "process_resident_memory_bytes", "gauge", "Resident memory size in bytes.", [("", {}, rss_bytes())])
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def _riding(elevator):
+        """Passengers of an elevator that are picked up."""
+        # The simulation can change the passengers while they are counted, then count again
+        while True:
+            try:
+                return sum(1 for passenger in elevator.passengers if passenger.pickup_time is not None)
+            except RuntimeError:
+                continue
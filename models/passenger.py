@@ -1,5 +1,9 @@
 class Passenger:
     """Represents a passenger in the elevator system."""
+    # No per instance __dict__, there can be millions of passengers
+    __slots__ = ("id", "source_floor", "target_floor", "request_time", "direction", "pickup_time", "dropoff_time",
+                 "assignation_wait_time", "assigned_elevator")
+
     def __init__(self, id, source_floor, target_floor, request_time):
         self.id = id
         self.source_floor = source_floor
@@ -11,6 +15,15 @@ class Passenger:
         self.assignation_wait_time = 0
         self.assigned_elevator = None
 
+    def __getstate__(self):
+        """Pickled without the attribute names, half the size in checkpoints."""
+        return (self.id, self.source_floor, self.target_floor, self.request_time, self.direction, self.pickup_time, self.dropoff_time,
+                self.assignation_wait_time, self.assigned_elevator)
+
+    def __setstate__(self, state):
+        (self.id, self.source_floor, self.target_floor, self.request_time, self.direction, self.pickup_time, self.dropoff_time,
+         self.assignation_wait_time, self.assigned_elevator) = state
+
     def wait_time(self):
         """Calculates the wait time for the passenger."""
         if not self.pickup_time is None:
@@ -0,0 +1,68 @@
+import json
+from functools import wraps
+from time import perf_counter
+
+# Methods of the elevator system that are timed
+PHASES = ["add_requests", "schedule_elevators", "log_positions", "move_passengers", "move_elevators", "skip_time"]
+# Events that are counted
+COUNTERS = ["assignments", "pickups", "dropoffs", "full_car_rejections"]
+
+
+class Profiler:
+    """Cumulative wall time and calls per phase of the simulation, and event counters.
+
+    `attach` wraps the phases of one elevator system, so a system without a profiler
+    runs its methods untouched. The system counts its events with `count` only when
+    it has a profiler. A full car rejection is a pending request waiting one time
+    unit because every elevator is full.
+    """
+
+    def __init__(self):
+        self.calls = dict.fromkeys(PHASES, 0)
+        self.seconds = dict.fromkeys(PHASES, 0.0)
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.ticks = 0
+        self.wall_time = 0.0
+
+    def attach(self, elevator_system):
+        """Times the phases of `elevator_system` from now on."""
+        for name in PHASES:
+            setattr(elevator_system, name, self.timed(name, getattr(elevator_system, name)))
+
+    def timed(self, name, phase):
+        @wraps(phase)
+        def timed_phase(*args):
+            start = perf_counter()
+            try:
+                return phase(*args)
+            finally:
+                self.seconds[name] += perf_counter() - start
+                self.calls[name] += 1
+        return timed_phase
+
+    def count(self, name, n=1):
+        self.counters[name] += n
+
+    def to_dict(self):
+        return {
+            "ticks": self.ticks,
+            "wall_time": round(self.wall_time, 6),
+            "phases": {name: {"calls": self.calls[name], "seconds": round(self.seconds[name], 6)} for name in PHASES},
+            "counters": dict(self.counters),
+        }
+
+    def write(self, file_name):
+        """Writes the measures as json."""
+        with open(file_name, "w") as f:
+            json.dump(self.to_dict(), f, indent=4)
+
+    def report(self):
+        """The measures as a table, like `ElevatorSystem.time_summary`."""
+        lines = [f"{'Phase':>19} {'Calls':>9} {'Seconds':>10} {'Share':>7}"]
+        total = sum(self.seconds.values()) or 1.0
+        for name in PHASES:
+            lines.append(f"{name:>19} {self.calls[name]:>9} {self.seconds[name]:>10.4f} {self.seconds[name] / total:>7.1%}")
+        lines.append(f"{'Ticks':>19} {self.ticks:>9}")
+        lines.append(f"{'Wall Time':>19} {'':>9} {self.wall_time:>10.4f}")
+        lines.extend(f"{name.replace('_', ' ').capitalize():>19} {value:>9}" for name, value in self.counters.items())
+        return "\n".join(lines)
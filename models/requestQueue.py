@@ -0,0 +1,82 @@
+from bisect import bisect_left
+from heapq import merge
+
+
+class RequestQueue:
+    """Pending passenger requests indexed by source floor and direction.
+
+    Requests keep their arrival order, and adding or removing one is O(1).
+    The time units a request waits because every elevator is full are counted
+    once for the whole queue (`wait`) and added to the passenger when it is
+    removed or iterated over, instead of updating every pending passenger.
+    """
+
+    def __init__(self):
+        # passenger -> (arrival number, full elevator time units when it arrived)
+        self.pending = {}
+        # (source floor, direction) -> {passenger: arrival number}, in arrival order
+        self.by_floor = {}
+        # Arrival number of the next request
+        self.arrivals = 0
+        self.full_ticks = 0
+
+    def append(self, passenger):
+        """Adds a request at the end of the queue."""
+        number = self.arrivals
+        self.arrivals += 1
+        self.pending[passenger] = (number, self.full_ticks)
+        self.by_floor.setdefault((passenger.source_floor, passenger.direction), {})[passenger] = number
+
+    def remove(self, passenger):
+        """Removes a request from the queue."""
+        _, full_ticks = self.pending.pop(passenger)
+        passenger.assignation_wait_time += self.full_ticks - full_ticks
+        key = (passenger.source_floor, passenger.direction)
+        group = self.by_floor[key]
+        del group[passenger]
+        if not group:
+            del self.by_floor[key]
+
+    def wait(self, ticks=1):
+        """Every pending request waits `ticks` time units for a free elevator."""
+        self.full_ticks += ticks
+
+    def __iter__(self):
+        """Iterates over the pending requests in arrival order, with their wait time up to date."""
+        for passenger, (number, full_ticks) in self.pending.items():
+            passenger.assignation_wait_time += self.full_ticks - full_ticks
+            self.pending[passenger] = (number, self.full_ticks)
+            yield passenger
+
+    def __len__(self):
+        return len(self.pending)
+
+    def __contains__(self, passenger):
+        return passenger in self.pending
+
+    def first_requests(self, groups, limit):
+        """Arrival numbers of the first `limit` requests of the given floor/direction groups."""
+        numbers = merge(*(iter(self.by_floor[key].values()) for key in groups))
+        return [number for number, _ in zip(numbers, range(limit))]
+
+
+class FloorIndex:
+    """Elevators that are not full, ordered by floor, to find the closest one to a floor."""
+
+    def __init__(self, elevators):
+        # Lowest elevator position per floor, the ties go to the first elevator as with `min`
+        first = {}
+        for position, elevator in enumerate(elevators):
+            if not elevator.is_full():
+                first.setdefault(elevator.current_floor, position)
+        self.floors = sorted(first)
+        self.first = first
+
+    def __bool__(self):
+        return bool(self.floors)
+
+    def closest(self, floor):
+        """Position of the closest elevator to `floor`."""
+        i = bisect_left(self.floors, floor)
+        candidates = self.floors[max(i - 1, 0):i + 1]
+        return min((abs(f - floor), self.first[f]) for f in candidates)[1]
@@ -0,0 +1,133 @@
+import heapq
+import json
+import logging
+import sys
+from itertools import islice
+
+logger = logging.getLogger(__name__)
+
+
+def validate_request(request, num_floors=None):
+    """Returns why a request (dict with id, source, dest and time) is malformed, or None.
+
+    Integral floats such as 3.0 are accepted, and replaced by ints in the request.
+    With `num_floors` the floors above the top floor are rejected too. A request from
+    a floor to the same floor has no trip to simulate and is rejected.
+    """
+    if not isinstance(request, dict):
+        return "not a json object"
+    for key in ("id", "source", "dest", "time"):
+        if key not in request:
+            return f"missing {key}"
+    if isinstance(request["id"], (dict, list)):
+        return "id is not a number or a string"
+    for key in ("source", "dest", "time"):
+        if isinstance(request[key], float) and request[key].is_integer():
+            request[key] = int(request[key])
+        if not isinstance(request[key], int) or isinstance(request[key], bool):
+            return f"{key} is not an integer"
+    if request["source"] < 1 or request["dest"] < 1:
+        return "floors start at 1"
+    if num_floors is not None and max(request["source"], request["dest"]) > num_floors:
+        return "floor above the top floor"
+    if request["source"] == request["dest"]:
+        return "source and dest are the same floor, there is no trip to simulate"
+    if request["time"] < 0:
+        return "negative time"
+    return None
+
+
+class RequestStream:
+    """Reads passenger requests, one json object per line, lazily from a file or standard input ("-").
+
+    Malformed lines are logged and skipped, `malformed` counts them. With `num_floors`
+    the requests above the top floor are malformed too.
+    """
+
+    def __init__(self, input_file, num_floors=None):
+        self.input_file = input_file
+        self.num_floors = num_floors
+        self.malformed = 0
+
+    def __iter__(self):
+        if self.input_file == "-":
+            yield from self.parse(sys.stdin)
+            return
+        with open(self.input_file, "r") as file:
+            yield from self.parse(file)
+
+    def parse(self, lines):
+        for number, line in enumerate(lines, 1):
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+            except json.JSONDecodeError as error:
+                reason = f"invalid json ({error.msg})"
+            else:
+                reason = validate_request(request, self.num_floors)
+                if reason is None:
+                    yield request
+                    continue
+            self.malformed += 1
+            logger.warning("Skipping line %s of %s: %s", number, self.input_file, reason)
+
+
+class ArrivalQueue:
+    """Requests in time order, pulled lazily from an iterable that is only roughly sorted.
+
+    Up to `window` requests are buffered in a heap, so a request that comes after
+    later ones in the input is still added at its time as long as it is less than
+    `window` requests away. A request whose time has already passed when it is read
+    arrives at the current time instead, `late` counts them. It keeps its own time, so
+    the delay counts in its wait and total times. Requests with the same time keep
+    their input order.
+
+    The queue can be pickled without its input, e.g. in a checkpoint, and `resume`
+    gives it back the same input to go on from where it was.
+    """
+
+    def __init__(self, requests, window=1000):
+        self.requests = iter(requests)
+        self.window = window
+        self.heap = []
+        # Requests read from the input, also the order of the ones with the same time
+        self.read = 0
+        self.late = 0
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["requests"]
+        return state
+
+    def resume(self, requests):
+        """Reads the rest of `requests`, the same input this queue was reading, skipping the requests already read."""
+        self.requests = islice(iter(requests), self.read, None)
+
+    def _fill(self):
+        while len(self.heap) < self.window:
+            request = next(self.requests, None)
+            if request is None:
+                self.requests = iter(())
+                return
+            heapq.heappush(self.heap, (request["time"], self.read, request))
+            self.read += 1
+
+    def next_time(self):
+        """Time of the next request, None when there are no more."""
+        self._fill()
+        return self.heap[0][0] if self.heap else None
+
+    def pop_arrivals(self, time):
+        """The requests that arrive at `time`, including the late ones."""
+        arrivals = []
+        while self.next_time() is not None and self.heap[0][0] <= time:
+            request_time, _, request = heapq.heappop(self.heap)
+            if request_time < time:
+                self.late += 1
+                logger.debug("Passenger %s requested at %s arrives late at %s", request["id"], request_time, time)
+            arrivals.append(request)
+        return arrivals
+
+    def __bool__(self):
+        return self.next_time() is not None
@@ -0,0 +1,216 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from .requestStream import RequestStream
+from .simulation import run_simulation
+
+logger = logging.getLogger(__name__)
+
+# Default size limit of the cache, in bytes
+MAX_BYTES = 1 << 30
+
+# Options of `run_simulation` that change the results, with their defaults
+OPTIONS = {"engine": "tick", "backend": "object", "dispatcher": "nearest", "reorder_window": 1000}
+
+# Hash of the simulation code, computed once per process
+_code_version = None
+
+
+def code_version():
+    """Hash of the source of the `models` package: results of other code are never reused."""
+    global _code_version
+    if _code_version is None:
+        digest = hashlib.sha256()
+        directory = os.path.dirname(os.path.abspath(__file__))
+        for name in sorted(os.listdir(directory)):
+            if name.endswith(".py"):
+                with open(os.path.join(directory, name), "rb") as f:
+                    digest.update(name.encode() + b"\0" + f.read() + b"\0")
+        _code_version = digest.hexdigest()
+    return _code_version
+
+
+def file_digest(path):
+    """sha256 of the content of a file."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def directory_size(path):
+    """Bytes of the files under `path`."""
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total
+
+
+def default_directory():
+    """$ELEVATOR_CACHE_DIR, or elevator in the user cache directory."""
+    if os.environ.get("ELEVATOR_CACHE_DIR"):
+        return os.environ["ELEVATOR_CACHE_DIR"]
+    return os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "elevator")
+
+
+class SimulationResult:
+    """What the cache keeps of a run: the last time, the passengers done and the statistics.
+
+    Has the `time`, `summary_stats` and `time_summary` of the ElevatorSystem it comes from.
+    """
+
+    def __init__(self, time, passengers, summary, report):
+        self.time = time
+        self.passengers = passengers
+        self.summary = summary
+        self.report = report
+
+    @classmethod
+    def from_system(cls, elevator_system):
+        return cls(elevator_system.time, len(elevator_system.processed_requests), elevator_system.summary_stats(), elevator_system.time_summary())
+
+    def summary_stats(self):
+        return self.summary
+
+    def time_summary(self):
+        return self.report
+
+
+class ResultCache:
+    """Results of `run_simulation` on disk, keyed by the content of the input file, the parameters and the code.
+
+    Each entry is a directory named after its key with `result.json` and, with
+    `cache_logs`, the log of the run. A log larger than `max_bytes` is never kept.
+    Using an entry marks it as recently used. When the entries
+    take more than `max_bytes`, the least recently used ones are removed. The size is
+    checked again after the writes of this process add up to the free space, so
+    several processes sharing the cache can overshoot it by a few entries.
+    """
+
+    def __init__(self, directory=None, max_bytes=MAX_BYTES, cache_logs=False):
+        self.directory = directory if directory is not None else default_directory()
+        self.max_bytes = max_bytes
+        self.cache_logs = cache_logs
+        # Bytes in the cache at the last check plus the entries written since, None before the first check
+        self.size = None
+        os.makedirs(self.directory, exist_ok=True)
+
+    def key(self, input_file, **parameters):
+        """Key of a run of `input_file` with the parameters of `run_simulation`."""
+        description = {"input": file_digest(input_file), "code": code_version(), "parameters": parameters}
+        return hashlib.sha256(json.dumps(description, sort_keys=True).encode()).hexdigest()
+
+    def get(self, key, log_name=None):
+        """The SimulationResult of a key, None if it is not cached (or without the log `log_name`)."""
+        entry = os.path.join(self.directory, key)
+        try:
+            with open(os.path.join(entry, "result.json")) as f:
+                result = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if log_name is not None and not os.path.exists(os.path.join(entry, log_name)):
+            return None
+        os.utime(os.path.join(entry, "result.json"))
+        return SimulationResult(**result)
+
+    def copy_log(self, key, log_name, file_log):
+        """Copies the cached log of a key to `file_log`."""
+        source = os.path.join(self.directory, key, log_name)
+        if os.path.isdir(source):
+            shutil.rmtree(file_log, ignore_errors=True)
+            shutil.copytree(source, file_log)
+        else:
+            shutil.copyfile(source, file_log)
+
+    def put(self, key, result, file_log=None, log_name=None):
+        """Stores a SimulationResult, and a copy of its log if `file_log` is given and fits in the cache."""
+        entry = os.path.join(self.directory, key)
+        if file_log is not None:
+            size = directory_size(file_log) if os.path.isdir(file_log) else os.path.getsize(file_log)
+            if size > self.max_bytes:
+                logger.info("Not caching the log %s, its %s bytes are more than the cache size", file_log, size)
+                file_log = None
+        if file_log is None and os.path.exists(os.path.join(entry, "result.json")):
+            # Already cached, keeps the logs of the entry
+            return
+        # Written aside and renamed, a reader never sees half an entry
+        temporary = tempfile.mkdtemp(prefix=".tmp-", dir=self.directory)
+        with open(os.path.join(temporary, "result.json"), "w") as f:
+            json.dump(vars(result), f)
+        if file_log is not None:
+            if os.path.isdir(file_log):
+                shutil.copytree(file_log, os.path.join(temporary, log_name))
+            else:
+                shutil.copyfile(file_log, os.path.join(temporary, log_name))
+        # Replaces the entry, and its logs of other formats
+        shutil.rmtree(entry, ignore_errors=True)
+        try:
+            os.rename(temporary, entry)
+        except OSError:
+            # Another process stored it meanwhile
+            shutil.rmtree(temporary, ignore_errors=True)
+            return
+        if self.size is not None:
+            self.size += directory_size(entry)
+        if self.size is None or self.size > self.max_bytes:
+            self.evict()
+
+    def entries(self):
+        """(last use, bytes, path) of every entry."""
+        entries = []
+        for item in os.scandir(self.directory):
+            if item.name.startswith("."):
+                continue
+            try:
+                entries.append((os.stat(os.path.join(item.path, "result.json")).st_mtime, directory_size(item.path), item.path))
+            except OSError:
+                continue
+        return entries
+
+    def evict(self):
+        """Removes the least recently used entries until the cache fits in `max_bytes`."""
+        entries = sorted(self.entries())
+        self.size = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if self.size <= self.max_bytes:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            self.size -= size
+            logger.debug("Evicted %s from the result cache", os.path.basename(path))
+
+    def run(self, input_file, num_elevators, num_floors, elevator_capacity, input_requests=None, file_log=None, log_format="json", **options):
+        """`run_simulation` through the cache, returns a SimulationResult.
+
+        `input_requests` are the requests of `input_file`, or a function returning them
+        that is only called if the simulation runs. By default the file is streamed.
+        The `OPTIONS` (engine, backend, dispatcher, reorder_window) are part of the key,
+        the log file name and format are not. With a `file_log` the result only comes
+        from the cache if its log does, copied to `file_log`. Otherwise the simulation
+        runs to write the log, which is cached only with `cache_logs`.
+        """
+        unknown = set(options) - set(OPTIONS)
+        if unknown:
+            raise ValueError(f"Runs with {', '.join(sorted(unknown))} are not cached.")
+        options = dict(OPTIONS, **options)
+        key = self.key(input_file, num_elevators=num_elevators, num_floors=num_floors, elevator_capacity=elevator_capacity, **options)
+        log_name = None
+        if file_log is not None:
+            log_name = f"log.{log_format}" + (".gz" if str(file_log).endswith(".gz") else "")
+        result = self.get(key, log_name)
+        if result is not None:
+            logger.debug("Cached result %s of %s", key, input_file)
+            if file_log is not None:
+                self.copy_log(key, log_name, file_log)
+            return result
+        if input_requests is None:
+            input_requests = RequestStream(input_file, num_floors)
+        elif callable(input_requests):
+            input_requests = input_requests()
+        elevator_system = run_simulation(num_elevators, num_floors, elevator_capacity, input_requests, file_log=file_log, log_format=log_format, **options)
+        result = SimulationResult.from_system(elevator_system)
+        self.put(key, result, file_log if self.cache_logs else None, log_name)
+        return result
@@ -0,0 +1,128 @@
+import json
+import logging
+from time import perf_counter
+from .checkpoint import Checkpoint
+from .elevatorSystem import ElevatorSystem
+from .dispatchers import get_dispatcher
+from .requestStream import ArrivalQueue, RequestStream
+from .simulationLog import NdjsonLog, DeltaLog, NullLog
+
+logger = logging.getLogger(__name__)
+
+
+def read_requests(input_file):
+    """Reads the passenger requests, one json object per line, skipping the malformed ones."""
+    # Took the approach of reading json per line because would more closely simulate a json request. 
+    # To stream them instead of reading them all, pass a RequestStream to run_simulation.
+    return list(RequestStream(input_file))
+
+
+def run_simulation(num_elevators, num_floors, elevator_capacity, input_requests, file_log = "elevator_time.log", engine = "tick", log_format = "json", backend = "object", dispatcher = "nearest", profiler = None, reorder_window = 1000, checkpoint = None, checkpoint_every = 10000, resume = None, subscribers = (), metrics = None):
+    """Runs the simulation until every request reaches its destination.
+
+    input_requests is any iterable of requests (dicts with id, source, dest and time),
+    e.g. a list or a `RequestStream`, and is consumed lazily. It only needs to be
+    roughly in time order: up to `reorder_window` requests are buffered to put them
+    back in order, and a request read after its time arrives late (see ArrivalQueue).
+
+    With engine="event" the time units where elevators only travel are skipped in one
+    step, so the log only has a snapshot for the time units where something happens.
+    The passenger times are the same as with the default engine="tick".
+
+    With log_format="ndjson" the snapshots are streamed to `file_log` as they are
+    taken instead of being kept in memory and written at the end. With log_format="delta"
+    only the passenger transitions and elevator moves are streamed (see DeltaLogReader).
+    With log_format="columnar" `file_log` is a directory of fixed width binary rows
+    that can be memory mapped (see `models.columnarLog`). With file_log=None nothing is logged.
+
+    backend="array" runs the same simulation on NumPy arrays (ArrayElevatorSystem).
+
+    dispatcher is the name of the algorithm that assigns requests to elevators,
+    see `models.dispatchers.DISPATCHERS`. The array backend only has "nearest".
+
+    With a `models.profiler.Profiler` the time spent in each phase and the
+    assignments, pickups, drop-offs and full car rejections are measured.
+
+    With a `checkpoint` file the state of the simulation is saved there every
+    `checkpoint_every` time units (see `models.checkpoint.Checkpoint`). `resume` is such
+    a file, or a Checkpoint, to go on from: the elevators, dispatcher and statistics
+    come from it, and input_requests is the same input, whose requests already read are
+    skipped. The log then starts at the checkpoint time, use a new file to keep the old one.
+
+    subscribers are (event class, callback) pairs subscribed to the ElevatorSystem
+    before it starts, see `models.events`. The array backend has no events.
+
+    A `models.metricsReporter.MetricsReporter` samples the system in the background
+    while it runs, and writes its last sample when the simulation is over.
+    """
+    start = perf_counter()
+    if file_log is None:
+        log = NullLog()
+    elif log_format == "columnar":
+        # NumPy is only loaded for the columnar log
+        from .columnarLog import ColumnarLog
+        log = ColumnarLog(file_log)
+    else:
+        log = {"ndjson": NdjsonLog, "delta": DeltaLog}[log_format](file_log) if log_format != "json" else None
+    if backend == "array":
+        if checkpoint is not None or resume is not None:
+            raise ValueError("The array backend does not support checkpoints.")
+        if dispatcher != "nearest":
+            raise ValueError("The array backend only supports the nearest dispatcher.")
+        if subscribers:
+            raise ValueError("The array backend does not emit events.")
+        if metrics is not None:
+            raise ValueError("The array backend does not support metrics.")
+        # NumPy is only loaded for the array backend
+        from .arrayElevatorSystem import ArrayElevatorSystem
+        elevator_system = ArrayElevatorSystem(num_elevators, num_floors, elevator_capacity, log=log, profiler=profiler)
+    elif resume is not None:
+        if not isinstance(resume, Checkpoint):
+            resume = Checkpoint.load(resume)
+        logger.info("Resuming from time %s.", resume.time)
+        elevator_system, arrivals = resume.restore(input_requests, log=log, profiler=profiler)
+    else:
+        elevator_system = ElevatorSystem(num_elevators, num_floors, elevator_capacity, log=log, dispatcher=get_dispatcher(dispatcher), profiler=profiler)
+    for event, callback in subscribers:
+        elevator_system.subscribe(event, callback)
+    input_requests = arrivals if resume is not None else ArrivalQueue(input_requests, reorder_window)
+    next_checkpoint = elevator_system.time + checkpoint_every
+    if metrics is not None:
+        metrics.start(elevator_system)
+    try:
+        # Will stop until all passangers have been proccessed and reached destination.
+        while input_requests or not elevator_system.all_requests_processed():
+            if checkpoint is not None and elevator_system.time >= next_checkpoint:
+                Checkpoint.take(elevator_system, input_requests).save(checkpoint)
+                next_checkpoint = elevator_system.time + checkpoint_every
+            # Add request up to the current system time.
+            elevator_system.add_requests(input_requests.pop_arrivals(elevator_system.time))
+            if engine == "event":
+                # Jump to the next arrival, assignment, pickup or drop-off
+                next_time = input_requests.next_time()
+                next_arrival = next_time - elevator_system.time if next_time is not None else None
+                # With an arrival at the next time unit there is nothing to skip: tick without looking ahead
+                ticks = elevator_system.idle_ticks(next_arrival) if next_arrival is None or next_arrival > 1 else 0
+                if ticks:
+                    elevator_system.skip_time(ticks)
+                    continue
+            elevator_system.move_time()
+
+        # Adding Extra time to show the empty elevators at the end of the log
+        elevator_system.move_time()
+    finally:
+        if metrics is not None:
+            metrics.stop()
+    if input_requests.late:
+        logger.warning("%s requests were read after their time and arrived late.", input_requests.late)
+
+    # Write log to file 
+    if log_format != "json" or file_log is None:
+        elevator_system.log.close()
+    else:
+        with open(file_log, "w") as f:
+            json.dump(elevator_system.log, f, indent=4)
+    if profiler is not None:
+        profiler.ticks = elevator_system.time
+        profiler.wall_time = perf_counter() - start
+    return elevator_system
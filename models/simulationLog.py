@@ -0,0 +1,343 @@
+import gzip
+import json
+import os
+from .events import Arrival, Assignment, Pickup, Dropoff, Snapshot
+
+
+class MemoryLog(list):
+    """Keeps every snapshot of the simulation in memory."""
+
+    def write(self, snapshot):
+        """Stores a snapshot."""
+        self.append(snapshot)
+
+    def close(self):
+        """Nothing to release, the snapshots stay available."""
+
+
+class NullLog:
+    """Discards the snapshots, for runs that only need the final statistics."""
+
+    def write(self, snapshot):
+        """Nothing is stored."""
+
+    def close(self):
+        """Nothing to release."""
+
+    def __len__(self):
+        return 0
+
+
+class NdjsonLog:
+    """Streams one compact json snapshot per line to a file.
+
+    Memory stays constant no matter how long the simulation runs.
+    The file is gzip compressed if `compress` is set or the path ends with `.gz`.
+    """
+
+    def __init__(self, log_file, compress=None):
+        self.log_file = str(log_file)
+        if compress is None:
+            compress = self.log_file.endswith(".gz")
+        self.file = gzip.open(self.log_file, "wt") if compress else open(self.log_file, "w")
+        self.snapshots = 0
+
+    def write(self, snapshot):
+        """Writes a snapshot as a single line."""
+        self.file.write(json.dumps(snapshot, separators=(",", ":")))
+        self.file.write("\n")
+        self.snapshots += 1
+
+    def close(self):
+        """Flushes and closes the log file."""
+        self.file.close()
+
+    def __len__(self):
+        return self.snapshots
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def open_log_file(log_file):
+    """Opens a log file as text, decompressing it if it is gzipped."""
+    with open(log_file, "rb") as f:
+        magic = f.read(2)
+    if magic == b"\x1f\x8b":
+        return gzip.open(log_file, "rt")
+    return open(log_file, "r")
+
+
+def read_log(log_file):
+    """Yields the snapshots of a log file.
+
+    Reads the json list written by the default log, the ndjson stream written
+    by `NdjsonLog` and the changes written by `DeltaLog` (optionally gzipped),
+    and the directories written by `ColumnarLog`.
+    """
+    if os.path.isdir(log_file):
+        from .columnarLog import ColumnarLogReader
+        yield from ColumnarLogReader(log_file).snapshots()
+        return
+    with open_log_file(log_file) as f:
+        first = f.read(1)
+        while first.isspace():
+            first = f.read(1)
+        if first == "[":
+            yield from json.loads(first + f.read())
+            return
+        line = first + f.readline()
+        if line.strip() and json.loads(line).get("format") == "delta":
+            yield from DeltaLogReader(log_file).snapshots()
+            return
+        while line:
+            if line.strip():
+                yield json.loads(line)
+            line = f.readline()
+
+
+class ChangeRecorder:
+    """Collects the passenger transitions of an ElevatorSystem between two snapshots.
+
+    `observe` subscribes to the events of a system. At each Snapshot, `record` is
+    called with the `changes` since the previous one: ["N", id, source, target, time]
+    arrivals, ["A", id, elevator] assignments, ["P", id, time] pickups and
+    ["D", id, time] drop-offs.
+    """
+
+    def observe(self, elevator_system):
+        """Subscribes to the events of `elevator_system`."""
+        self.changes = []
+        elevator_system.subscribe(Arrival, self.arrival)
+        elevator_system.subscribe(Assignment, self.assignment)
+        elevator_system.subscribe(Pickup, self.pickup)
+        elevator_system.subscribe(Dropoff, self.dropoff)
+        elevator_system.subscribe(Snapshot, self.snapshot)
+
+    def arrival(self, event):
+        passenger = event.passenger
+        self.changes.append(("N", passenger.id, passenger.source_floor, passenger.target_floor, passenger.request_time))
+
+    def assignment(self, event):
+        self.changes.append(("A", event.passenger.id, event.elevator.id))
+
+    def pickup(self, event):
+        self.changes.append(("P", event.passenger.id, event.time))
+
+    def dropoff(self, event):
+        self.changes.append(("D", event.passenger.id, event.time))
+
+    def snapshot(self, event):
+        self.record(event.system)
+        self.changes.clear()
+
+    def record(self, elevator_system):
+        """Handles the changes of a time unit."""
+        raise NotImplementedError
+
+
+class DeltaLog(ChangeRecorder):
+    """Streams only the changes of the simulation, plus periodic keyframes.
+
+    Each line is a compact json list:
+      ["t", time, {elevator: floor}, [changes]]  elevators that moved and passenger transitions
+      ["k", time, state]                         full state to start replaying from
+      ["s", time, first]                         the time units from `first` to time - 1 were skipped
+      ["e", time]                                last logged time unit
+    Changes are ["N", id, source, target, time] arrivals, ["A", id, elevator]
+    assignments (again when a passenger is reassigned), ["P", id, time] pickups and
+    ["D", id, time] drop-offs.
+
+    A keyframe is only written once at least as many changes as passengers in it
+    have been logged (and at least `keyframe_interval`), so the file stays linear
+    in the number of events. The log of a system restored from a checkpoint starts
+    with a keyframe. The event engine skips the time units where elevators only travel,
+    they are marked with an "s" line and have no snapshot, as in the other logs.
+    Read it back with `DeltaLogReader`.
+    """
+
+    def __init__(self, log_file, compress=None, keyframe_interval=1000):
+        self.log = NdjsonLog(log_file, compress)
+        self.keyframe_interval = keyframe_interval
+        self.log.write({"format": "delta", "version": 1})
+        self.positions = {}
+        self.passengers = 0
+        self.pending_changes = 0
+        self.time = None
+
+    def record(self, elevator_system):
+        """Writes what changed since the previous time unit."""
+        if self.time is None and len(elevator_system.all_passengers()) > sum(1 for change in self.changes if change[0] == "N"):
+            # A system restored from a checkpoint had passengers before this log: start from its full state
+            self.time = elevator_system.time
+            self.positions = {e.id: e.current_floor for e in elevator_system.elevators}
+            self.passengers = len(elevator_system.all_passengers())
+            self.log.write(["k", self.time, keyframe(elevator_system)])
+            return
+        if self.time is not None and elevator_system.time > self.time + 1:
+            self.log.write(["s", elevator_system.time, self.time + 1])
+        self.time = elevator_system.time
+        moves = {e.id: e.current_floor for e in elevator_system.elevators if self.positions.get(e.id) != e.current_floor}
+        self.positions.update(moves)
+        if moves or self.changes:
+            self.log.write(["t", self.time, moves, self.changes])
+        self.pending_changes += len(self.changes)
+        self.passengers += sum(1 for change in self.changes if change[0] == "N")
+        if self.pending_changes >= max(self.keyframe_interval, self.passengers):
+            self.log.write(["k", self.time, keyframe(elevator_system)])
+            self.pending_changes = 0
+
+    def close(self):
+        """Writes the last time unit and closes the log file."""
+        if self.time is not None:
+            self.log.write(["e", self.time])
+        self.log.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def keyframe(elevator_system):
+    """Full state of the system as stored in a DeltaLog keyframe."""
+    return {
+        "positions": {e.id: e.current_floor for e in elevator_system.elevators},
+        "passengers_assigned": {e.id: [p.id for p in e.passengers] for e in elevator_system.elevators},
+        "passengers": [[p.id, p.source_floor, p.target_floor, p.request_time, p.assigned_elevator, p.pickup_time, p.dropoff_time] for p in elevator_system.all_passengers()],
+    }
+
+
+class DeltaLogReader:
+    """Rebuilds the snapshots of a DeltaLog at any time unit.
+
+    The file is scanned once to index the keyframes; `state_at(t)` then replays
+    the changes from the closest keyframe before `t`. The time units skipped by
+    the event engine have no snapshot.
+    """
+
+    def __init__(self, log_file):
+        self.log_file = log_file
+        self.first_time = None
+        self.last_time = None
+        with self._open() as f:
+            header = json.loads(f.readline())
+            if header.get("format") != "delta":
+                raise ValueError(f"{log_file} is not a delta log.")
+            offset = f.tell()
+            # (time, offset) to replay from; the first one is the empty system
+            self.keyframes = [(None, offset)]
+            for line in iter(f.readline, b""):
+                if line.startswith(b'["k"'):
+                    self.keyframes.append((int(line[5:line.index(b",", 5)]), offset))
+                    if self.first_time is None:
+                        # The log starts from the state of a restored system
+                        self.first_time = self.keyframes[-1][0]
+                elif line.startswith(b'["e"'):
+                    self.last_time = json.loads(line)[1]
+                elif self.first_time is None and line.startswith(b'["t"'):
+                    self.first_time = json.loads(line)[1]
+                offset = f.tell()
+
+    def _open(self):
+        with open(self.log_file, "rb") as f:
+            magic = f.read(2)
+        return gzip.open(self.log_file, "rb") if magic == b"\x1f\x8b" else open(self.log_file, "rb")
+
+    @staticmethod
+    def _apply(record, positions, assigned, passengers):
+        """Applies the changes of a "t" line to the state."""
+        positions.update(record[2])
+        for change in record[3]:
+            kind, passenger_id = change[0], change[1]
+            if kind == "N":
+                passengers[passenger_id] = [change[2], change[3], change[4], None, None, None]
+            elif kind == "A":
+                # A passenger can be reassigned before it is picked up
+                if passengers[passenger_id][3] is not None:
+                    del assigned[passengers[passenger_id][3]][passenger_id]
+                passengers[passenger_id][3] = change[2]
+                assigned.setdefault(change[2], {})[passenger_id] = None
+            elif kind == "P":
+                passengers[passenger_id][4] = change[2]
+            elif kind == "D":
+                passengers[passenger_id][5] = change[2]
+                del assigned[passengers[passenger_id][3]][passenger_id]
+
+    def state_at(self, time):
+        """Returns the snapshot at `time`, as `ElevatorSystem.log_positions` logs it after a json round trip.
+
+        Raises a ValueError if the event engine skipped `time`.
+        """
+        start = max((k for k in self.keyframes[1:] if k[0] <= time), default=self.keyframes[0], key=lambda k: k[0])
+        positions, assigned, passengers = {}, {}, {}
+        with self._open() as f:
+            f.seek(start[1])
+            if start[0] is not None:
+                positions, assigned, passengers = self._load(json.loads(f.readline())[2])
+            for line in iter(f.readline, b""):
+                record = json.loads(line)
+                if record[0] == "s" and record[2] <= time < record[1]:
+                    raise ValueError(f"The time unit {time} was skipped by the event engine, it has no snapshot.")
+                if record[0] == "e" or record[1] > time:
+                    break
+                if record[0] == "t":
+                    self._apply(record, positions, assigned, passengers)
+        return self._snapshot(time, positions, assigned, passengers)
+
+    @staticmethod
+    def _load(state):
+        """The state of a keyframe."""
+        assigned = {e: dict.fromkeys(ids) for e, ids in state["passengers_assigned"].items()}
+        return dict(state["positions"]), assigned, {p[0]: p[1:] for p in state["passengers"]}
+
+    @staticmethod
+    def _snapshot(time, positions, assigned, passengers):
+        """Builds a snapshot from the replayed state."""
+        passenger_positions = {}
+        for passenger_id, (source, target, _, elevator, pickup, dropoff) in passengers.items():
+            if pickup is None:
+                position = {"floor": source, "status": "W"}
+            elif dropoff is None:
+                sign = 1 if source < target else -1
+                position = {"floor": source + sign*abs(time - pickup), "status": "T"}
+            else:
+                position = {"floor": target, "status": "D"}
+            if elevator is not None:
+                position["elevator"] = elevator
+            passenger_positions[str(passenger_id)] = position
+        return {
+            'time': time,
+            'positions': dict(positions),
+            'passengers_assigned': {e: list(assigned.get(e, {})) for e in positions},
+            'passengers_positions': passenger_positions,
+        }
+
+    def snapshots(self):
+        """Yields the snapshot of every time unit in the log, except the skipped ones, replaying it once."""
+        if self.first_time is None:
+            return
+        positions, assigned, passengers = {}, {}, {}
+        time = self.first_time
+        with self._open() as f:
+            f.seek(self.keyframes[0][1])
+            for line in iter(f.readline, b""):
+                record = json.loads(line)
+                # Only the elevators travel in the time units skipped by the event engine, their floors are not logged
+                end = record[2] if record[0] == "s" else record[1]
+                while time < end:
+                    yield self._snapshot(time, positions, assigned, passengers)
+                    time += 1
+                if record[0] == "s":
+                    time = record[1]
+                elif record[0] == "t":
+                    self._apply(record, positions, assigned, passengers)
+                elif record[0] == "k" and not positions:
+                    positions, assigned, passengers = self._load(record[2])
+            while time <= self.last_time:
+                yield self._snapshot(time, positions, assigned, passengers)
+                time += 1
@@ -0,0 +1,272 @@
+import asyncio
+import json
+import logging
+from itertools import count
+from .elevatorSystem import ElevatorSystem
+from .dispatchers import get_dispatcher
+from .events import Dropoff
+from .requestStream import validate_request
+from .simulationLog import ChangeRecorder
+
+logger = logging.getLogger(__name__)
+
+
+def encode(message):
+    """One compact json line."""
+    return (json.dumps(message, separators=(",", ":")) + "\n").encode()
+
+
+class BroadcastLog(ChangeRecorder):
+    """Sends the changes of each time unit to the subscribers of a `SimulationServer`.
+
+    The records are the "t" lines of a `DeltaLog`: ["t", time, {elevator: floor}, [changes]],
+    with the arrivals, assignments, pickups and drop-offs of the time unit.
+    """
+
+    def __init__(self, server):
+        self.server = server
+        self.positions = {}
+
+    def record(self, elevator_system):
+        """Broadcasts what changed since the previous time unit."""
+        moves = {e.id: e.current_floor for e in elevator_system.elevators if self.positions.get(e.id) != e.current_floor}
+        self.positions.update(moves)
+        if moves or self.changes:
+            self.server.broadcast(["t", elevator_system.time, moves, self.changes])
+
+    def close(self):
+        """Nothing to release, the server closes the connections."""
+
+
+class SimulationServer:
+    """Runs an elevator system in real time and takes passenger requests over a socket.
+
+    Clients send one json object per line:
+      {"id": 1, "source": 3, "dest": 7}  a passenger request, the id is optional
+      {"subscribe": true}                receive the changes of every time unit
+    A request is added at the next time unit, whatever its "time", and answered with
+    {"accepted": id, "time": time} or {"error": reason}. An id can be used again once its
+    passenger is dropped off. Subscribers get the `BroadcastLog` records, so they see the
+    assignment of each request.
+
+    The clock advances every `tick` seconds, or as fast as possible with tick=0. The
+    connections only append to an inbox that the clock drains, and a client that has
+    more than `max_buffer` bytes not yet sent, answers or records, is disconnected, so
+    slow clients never hold the clock back nor fill the memory.
+    """
+
+    def __init__(self, num_elevators, num_floors, elevator_capacity, dispatcher="nearest", tick=1.0, max_buffer=1 << 20):
+        self.elevator_system = ElevatorSystem(num_elevators, num_floors, elevator_capacity, log=BroadcastLog(self), dispatcher=get_dispatcher(dispatcher))
+        self.tick = tick
+        self.max_buffer = max_buffer
+        # Requests received since the last time unit
+        self.inbox = []
+        # Ids of the passengers not dropped off yet
+        self.ids = set()
+        self.elevator_system.subscribe(Dropoff, self.dropoff)
+        self.next_id = count(1)
+        self.subscribers = set()
+        # Writer -> handler task of every connected client
+        self.clients = {}
+        self.connections = 0
+        self.rejected = 0
+        # Time units that started later than their deadline
+        self.late_ticks = 0
+        self.server = None
+        self.stopped = False
+
+    async def start(self, host="127.0.0.1", port=8765, path=None, backlog=4096):
+        """Listens on a Unix socket if `path` is given, on TCP otherwise."""
+        if path is not None:
+            self.server = await asyncio.start_unix_server(self.handle, path, backlog=backlog)
+        else:
+            self.server = await asyncio.start_server(self.handle, host, port, backlog=backlog)
+        logger.info("Listening on %s", path if path is not None else self.server.sockets[0].getsockname())
+
+    async def handle(self, reader, writer):
+        """Reads the messages of one client until it disconnects."""
+        self.connections += 1
+        self.clients[writer] = asyncio.current_task()
+        try:
+            async for line in reader:
+                if line.strip():
+                    self.receive(line, writer)
+        except (ConnectionError, ValueError) as error:
+            # ValueError: a line longer than the reader limit
+            logger.debug("Client disconnected: %s", error)
+        finally:
+            self.connections -= 1
+            self.subscribers.discard(writer)
+            self.clients.pop(writer, None)
+            writer.close()
+
+    def receive(self, line, writer):
+        """Handles one message of a client."""
+        try:
+            message = json.loads(line)
+        except json.JSONDecodeError as error:
+            self.rejected += 1
+            return self.reply(writer, {"error": f"invalid json ({error.msg})"})
+        if isinstance(message, dict) and "subscribe" in message:
+            if message["subscribe"]:
+                self.subscribers.add(writer)
+            else:
+                self.subscribers.discard(writer)
+            return
+        if isinstance(message, dict):
+            message = dict(message, time=self.elevator_system.time)
+            if "id" not in message:
+                message["id"] = next(i for i in self.next_id if i not in self.ids)
+        reason = validate_request(message, self.elevator_system.num_floors)
+        if reason is None and message["id"] in self.ids:
+            reason = "duplicate id"
+        if reason is not None:
+            self.rejected += 1
+            return self.reply(writer, {"error": reason})
+        self.ids.add(message["id"])
+        self.inbox.append(message)
+        self.reply(writer, {"accepted": message["id"], "time": message["time"]})
+
+    def dropoff(self, event):
+        """Frees the id of a passenger dropped off."""
+        self.ids.discard(event.passenger.id)
+
+    def writable(self, writer):
+        """Whether `writer` can be written to, disconnects it if it is more than `max_buffer` bytes behind."""
+        if writer.transport.is_closing():
+            self.subscribers.discard(writer)
+            return False
+        if writer.transport.get_write_buffer_size() > self.max_buffer:
+            logger.warning("Disconnecting a client that is %s bytes behind", writer.transport.get_write_buffer_size())
+            self.subscribers.discard(writer)
+            writer.transport.abort()
+            return False
+        return True
+
+    def reply(self, writer, message):
+        if self.writable(writer):
+            writer.write(encode(message))
+
+    def broadcast(self, record):
+        """Writes a record to every subscriber, encoded once."""
+        if not self.subscribers:
+            return
+        data = encode(record)
+        for writer in list(self.subscribers):
+            if self.writable(writer):
+                writer.write(data)
+
+    def step(self):
+        """Adds the requests received so far and advances the elevator system one time unit."""
+        arrivals, self.inbox = self.inbox, []
+        for request in arrivals:
+            # Received after the previous time unit started
+            request["time"] = self.elevator_system.time
+        self.elevator_system.add_requests(arrivals)
+        self.elevator_system.move_time()
+
+    async def run(self, ticks=None):
+        """Advances the clock until `stop` is called, or for `ticks` time units."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time()
+        while not self.stopped and (ticks is None or ticks > 0):
+            self.step()
+            if ticks is not None:
+                ticks -= 1
+            if not self.tick:
+                # Let the connections run between time units
+                await asyncio.sleep(0)
+                continue
+            deadline += self.tick
+            delay = deadline - loop.time()
+            if delay < 0:
+                # Behind the clock: carry on from now instead of rushing through the missed ticks
+                self.late_ticks += 1
+                deadline = loop.time()
+            await asyncio.sleep(max(delay, 0))
+
+    def stop(self):
+        self.stopped = True
+
+    async def close(self):
+        """Stops listening and disconnects every client."""
+        if self.server is not None:
+            self.server.close()
+        # Every client, subscribed or not: wait_closed waits for all the connections
+        handlers = list(self.clients.values())
+        for writer in list(self.clients):
+            if writer.transport.get_write_buffer_size():
+                # A client that does not read would never let its data be flushed and its connection closed
+                writer.transport.abort()
+            else:
+                writer.close()
+        self.subscribers.clear()
+        # The handlers see the end of their connection and return
+        await asyncio.gather(*handlers, return_exceptions=True)
+        if self.server is not None:
+            await self.server.wait_closed()
+
+
+async def serve(server, host="127.0.0.1", port=8765, path=None, ticks=None):
+    """Starts `server`, runs its clock and closes it."""
+    await server.start(host, port, path)
+    try:
+        await server.run(ticks)
+    finally:
+        await server.close()
+
+
+async def replay(requests, host="127.0.0.1", port=8765, path=None, tick=1.0):
+    """A stand-in client: sends the requests at their times, `tick` seconds per time unit.
+
+    Subscribes on the same connection and returns, once every accepted passenger is
+    dropped off, {id: {"time", "elevator", "pickup_time", "dropoff_time"}} as seen by
+    the subscriber, and the records it received.
+    """
+    if path is not None:
+        reader, writer = await asyncio.open_unix_connection(path)
+    else:
+        reader, writer = await asyncio.open_connection(host, port)
+    writer.write(encode({"subscribe": True}))
+    passengers, records = {}, []
+    pending = len(requests)
+
+    async def send():
+        previous = requests[0]["time"] if requests else 0
+        for request in requests:
+            await asyncio.sleep((request["time"] - previous) * tick)
+            previous = request["time"]
+            writer.write(encode({key: request[key] for key in ("id", "source", "dest")}))
+            await writer.drain()
+
+    sender = asyncio.create_task(send())
+    try:
+        while pending:
+            line = await reader.readline()
+            if not line:
+                raise ConnectionError("The server closed the connection.")
+            message = json.loads(line)
+            records.append(message)
+            if isinstance(message, dict):
+                if "error" in message:
+                    logger.warning("Request rejected: %s", message["error"])
+                    pending -= 1
+                else:
+                    passengers[message["accepted"]] = {"time": message["time"], "elevator": None, "pickup_time": None, "dropoff_time": None}
+                continue
+            for change in message[3]:
+                passenger = passengers.get(change[1])
+                if passenger is None:
+                    continue
+                if change[0] == "A":
+                    passenger["elevator"] = change[2]
+                elif change[0] == "P":
+                    passenger["pickup_time"] = change[2]
+                elif change[0] == "D":
+                    passenger["dropoff_time"] = change[2]
+                    pending -= 1
+        await sender
+    finally:
+        sender.cancel()
+        writer.close()
+    return passengers, records
@@ -0,0 +1,153 @@
+import math
+
+# Quantiles reported with the min, max and mean
+PERCENTILES = [50, 95, 99]
+STATISTICS = ["min", "max", "mean"] + [f"p{q}" for q in PERCENTILES]
+
+
+class TimeHistogram:
+    """Count of each duration, in time units, to compute quantiles without keeping every value.
+
+    Durations are whole time units, so the quantiles are exact: the same as
+    `numpy.percentile` with linear interpolation over all the values. It is not a
+    bounded sketch: there is one counter per time unit up to the longest duration,
+    and reading a quantile goes over them, so both the memory and the reads are
+    linear in the longest duration (not in the number of values).
+    """
+
+    def __init__(self):
+        self.counts = []
+        self.count = 0
+
+    def add(self, value):
+        if value >= len(self.counts):
+            self.counts.extend([0] * (value + 1 - len(self.counts)))
+        self.counts[value] += 1
+        self.count += 1
+
+    def ranks(self, *ranks):
+        """Values at the given positions (ascending) of the sorted durations."""
+        values, seen = [], 0
+        ranks = iter(ranks)
+        rank = next(ranks, None)
+        for value, count in enumerate(self.counts):
+            seen += count
+            while rank is not None and rank < seen:
+                values.append(value)
+                rank = next(ranks, None)
+            if rank is None:
+                break
+        return values
+
+    def quantile(self, q):
+        """Value below which a fraction `q` of the durations lies."""
+        if not self.count:
+            return None
+        position = (self.count - 1) * q
+        low = math.floor(position)
+        below, above = self.ranks(low, min(low + 1, self.count - 1))
+        return below + (above - below) * (position - low)
+
+
+class TimeAccumulator:
+    """Min, max, mean and quantiles of durations, updated one value at a time."""
+
+    def __init__(self):
+        self.count = 0
+        self.sum = 0
+        self.min = None
+        self.max = None
+        self.histogram = TimeHistogram()
+        # Computed statistics, until the next value is added
+        self._summary = None
+
+    def add(self, value):
+        self.count += 1
+        self.sum += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+        self.histogram.add(value)
+        self._summary = None
+
+    @property
+    def mean(self):
+        return self.sum / self.count if self.count else None
+
+    def summary(self):
+        """Statistic name -> value, all None without values."""
+        if self._summary is None:
+            self._summary = {"min": self.min, "max": self.max, "mean": self.mean}
+            for q in PERCENTILES:
+                self._summary[f"p{q}"] = self.histogram.quantile(q / 100)
+        return self._summary
+
+
+class TripStatistics:
+    """Wait and total times of the done passengers, overall, per elevator and per time window.
+
+    The elevator system calls `record` when a passenger is dropped off, so reading
+    the statistics does not go over the passengers again. The time windows are
+    `window` time units long and a passenger counts in the window of its drop-off.
+    """
+    TIMES = ["wait_time", "total_time"]
+
+    def __init__(self, window=100):
+        self.window = window
+        self.overall = self._accumulators()
+        self.by_elevator = {}
+        self.by_window = {}
+
+    def _accumulators(self):
+        return {name: TimeAccumulator() for name in TripStatistics.TIMES}
+
+    def _group(self, groups, key):
+        if key not in groups:
+            groups[key] = self._accumulators()
+        return groups[key]
+
+    def record(self, elevator_id, request_time, pickup_time, dropoff_time):
+        """Adds a done passenger."""
+        start = dropoff_time - dropoff_time % self.window
+        for accumulators in (self.overall, self._group(self.by_elevator, elevator_id), self._group(self.by_window, start)):
+            accumulators["wait_time"].add(pickup_time - request_time)
+            accumulators["total_time"].add(dropoff_time - request_time)
+
+    def record_passenger(self, passenger):
+        self.record(passenger.assigned_elevator, passenger.request_time, passenger.pickup_time, passenger.dropoff_time)
+
+    def dropoff(self, event):
+        """Subscriber of the `models.events.Dropoff` of an ElevatorSystem."""
+        self.record_passenger(event.passenger)
+
+    @property
+    def count(self):
+        return self.overall["wait_time"].count
+
+    @staticmethod
+    def _flatten(accumulators):
+        return {f"{statistic}_{name}": value for name, accumulator in accumulators.items() for statistic, value in accumulator.summary().items()}
+
+    def summary(self):
+        """min_wait_time, p95_total_time... of all the done passengers."""
+        return self._flatten(self.overall)
+
+    def rows(self, by):
+        """One summary per elevator (by="elevator") or per time window (by="window")."""
+        groups = {"elevator": self.by_elevator, "window": self.by_window}[by]
+        return [dict({by: key, "passengers": accumulators["wait_time"].count}, **self._flatten(accumulators))
+                # E2 before E10, and window 50 before 100
+                for key, accumulators in sorted(groups.items(), key=lambda group: (len(str(group[0])), str(group[0])))]
+
+    def dataframe(self, by=None):
+        """The summary as a pandas DataFrame, one row, or one per elevator or time window."""
+        import pandas as pd
+        return pd.DataFrame([self.summary()] if by is None else self.rows(by))
+
+    def report(self):
+        """The overall summary as a table: Min Wait Time, Max Wait Time... one per line."""
+        lines = [(f"{statistic.capitalize()} {name.replace('_', ' ').title()}", accumulator.summary()[statistic])
+                 for name, accumulator in self.overall.items() for statistic in STATISTICS]
+        values = [f"{value:.2f}" if value is not None else "-" for _, value in lines]
+        label_width = max(len(label) for label, _ in lines)
+        value_width = max(len(value) for value in values)
+        return "\n".join(f"{label:>{label_width}} {value:>{value_width}}" for (label, _), value in zip(lines, values))
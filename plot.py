@@ -1,33 +1,34 @@
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
 import matplotlib.pyplot as plt
-from matplotlib.widgets import Slider, Button
-from matplotlib.animation import FuncAnimation, PillowWriter
+from matplotlib.animation import FuncAnimation
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
 from matplotlib.patches import Rectangle
-import json
-import pandas as pd
+from PIL import Image
 import logging
+from models.simulationLog import read_log
 
 # Remove anoying informatin from matplotlib
 logging.getLogger('matplotlib').setLevel(logging.WARNING)
 
-current_time = 0
-
 def parse_log_file(log_file):
-    with open(log_file, 'r') as file:
-        dat = json.load(file)
-
+    import pandas as pd
+    if os.path.isdir(log_file):
+        return parse_columnar_log(log_file)
     passenger_positions = []
     elevator_positions = []
-    for t in dat:
+    for t in read_log(log_file):
         current_time = t.get("time")
         for passenger, position in t.get("passengers_positions").items():
             passenger_positions.append({
-                "time": current_time, 
-                "passenger": passenger, 
+                "time": current_time,
+                "passenger": passenger,
                 "location": position["floor"],
                 "status": position["status"],
                 "elevator": position.get("elevator", None)
                 })
-            cur_time = t.get("time")
         for elevator, position in t.get("positions").items():
             elevator_positions.append({"time": current_time, "elevator": elevator, "location": position})
 
@@ -35,101 +36,248 @@ def parse_log_file(log_file):
     ep_df = pd.DataFrame(elevator_positions)
     return pp_df, ep_df
 
-def create_plot(num_floors= 20, num_elevators = 2, log_file="elevator_time.log", giff=True, ele_marker_size = 5, points_size = 2, min_floor = 1):
-    elevator_positions = [min_floor]*num_elevators
-    passenger_positions_df, elevator_positions_df = parse_log_file(log_file)
-    max_time = elevator_positions_df.time[-1:].values[0]
-    elevators = elevator_positions_df.elevator.unique()
-    #Create figure and axes
-    plt.rcParams['figure.figsize'] = [(num_elevators+3)*1.5,(num_floors//5)*1.5]
-    fig, ax = plt.subplots()
-
-    # Use square markers for elevators and increase size
-    #elevator_lines = [ax.plot(1 + i, elevator_positions[i], 's', markersize=ele_marker_size, color = "black")[0] for i in range(num_elevators)]
-
-    # Initialize time variable
-    def update_elevator_positions():
-        ax.cla()  # Clear the current axes
-        setup_plot(ax)  # Reset the plot settings
-
-        def horizontal_offset(i):
-            return 0.1 + 0.05*(i+1)
-
-        def add_elevator(ax, elevator_number, floor_number):
-            # Define the size and position of the rectangle
-            width = 0.2  # Width of the rectangle
-            height = 1  # Height of the rectangle
-            lower_left_x = elevator_number - width / 2
-            lower_left_y = floor_number - height / 2
-
-            # Create a rectangle and add it to the plot
-            rect = Rectangle((lower_left_x, lower_left_y), width, height, color='black')
-            ax.add_patch(rect)
-
-        for i in range(num_elevators):
-            elevator_positions[i] = elevator_positions_df.query(f'elevator=="E{i+1}" & time=={current_time}').location.values[0]
-            add_elevator(ax, 1 + i, elevator_positions[i])
-            
-            #waiting 
-            points_wating = passenger_positions_df.query(f'status=="W" & time == {current_time} & elevator=="E{i+1}"').location.values
-            ax.plot([i+1 - horizontal_offset(0)]*len(points_wating), points_wating , 'ro', markersize=points_size)
-            
-            #Traveling 
-            points_travel = passenger_positions_df.query(f'status=="T" & time == {current_time} & elevator=="E{i+1}"').location.values
-            for j, p in enumerate(points_travel):
-                ax.plot(i+1 - 0.02*(j+1), p , 'o', markersize=points_size, color = "white")
-
-            #Done
-            points_done = passenger_positions_df.query(f'status=="D" & time == {current_time} & elevator=="E{i+1}"').location.values
-            ax.plot([i+1 + horizontal_offset(0)]*len(points_done), points_done , 'o', markersize=points_size, color = "green")
-
-    # Auto update function
-    def auto_update(frame):
-        global current_time
-        if current_time > max_time:
-            return
-        update_elevator_positions()
-        current_time += 1
-
-    # Slider update function
-    def slider_update(val):
-        global current_time
-        current_time = int(val)
-        update_elevator_positions()
-
-    def setup_plot(ax):
-        global current_time
-        ax.set_xlim(0.5, num_elevators +.5)
+def parse_columnar_log(log_dir):
+    """`parse_log_file` for a columnar log, straight from the memory mapped columns."""
+    import numpy as np
+    import pandas as pd
+    from models.columnarLog import ColumnarLogReader
+    log = ColumnarLogReader(log_dir)
+    # Position -1 is no elevator
+    elevator_ids = np.array(log.elevator_ids + [None], dtype=object)
+    passengers, elevators = log.passengers, log.elevators
+    pp_df = pd.DataFrame({
+        "time": passengers["time"].astype(np.int64),
+        "passenger": np.array([str(passenger) for passenger in log.passenger_ids], dtype=object)[passengers["passenger"]],
+        "location": passengers["floor"].astype(np.int64),
+        "status": passengers["status"].astype(str).astype(object),
+        "elevator": elevator_ids[passengers["elevator"]],
+        })
+    ep_df = pd.DataFrame({
+        "time": elevators["time"].astype(np.int64),
+        "elevator": elevator_ids[elevators["elevator"]],
+        "location": elevators["floor"].astype(np.int64),
+        })
+    return pp_df, ep_df
+
+def read_frames(log_file, window=None):
+    """Groups the log by time unit once, one frame per snapshot (only the ones within the (start, end) `window` if given).
+
+    A frame is (time, elevator floors, passengers) where passengers has, per elevator,
+    the floors of its waiting, traveling and done passengers. The waiting and done
+    passengers of an elevator are drawn on top of each other, so only their distinct
+    floors are kept. The passengers not assigned to an elevator yet are not drawn.
+    """
+    frames = []
+    for snapshot in read_log(log_file):
+        if window is not None and not window[0] <= snapshot["time"] <= window[1]:
+            continue
+        elevators = {elevator: i for i, elevator in enumerate(snapshot["positions"])}
+        passengers = [{"W": set(), "T": [], "D": set()} for _ in elevators]
+        for position in snapshot["passengers_positions"].values():
+            elevator = position.get("elevator")
+            if elevator is None:
+                continue
+            group = passengers[elevators[elevator]][position["status"]]
+            if position["status"] == "T":
+                group.append(position["floor"])
+            else:
+                group.add(position["floor"])
+        for groups in passengers:
+            groups["W"], groups["D"] = sorted(groups["W"]), sorted(groups["D"])
+        frames.append((snapshot["time"], list(snapshot["positions"].values()), passengers))
+    return frames
+
+class BuildingPlot:
+    """The figure of the building: the floors and elevators are drawn once,
+    the elevator and passenger artists only get their data updated for each frame.
+
+    With on_screen=False the figure is only rendered off screen, see `render`.
+    """
+
+    def __init__(self, num_floors, num_elevators, points_size=2, min_floor=1, on_screen=False):
+        #Create figure and axes
+        figsize = [(num_elevators+3)*1.5,(num_floors//5)*1.5]
+        if on_screen:
+            self.fig, self.ax = plt.subplots(figsize=figsize)
+        else:
+            self.fig = Figure(figsize=figsize)
+            FigureCanvasAgg(self.fig)
+            self.ax = self.fig.subplots()
+        self.num_elevators = num_elevators
+        self.setup_plot(num_floors, min_floor)
+
+        # Elevators as rectangles one floor high
+        width, height = 0.2, 1
+        self.elevators = [Rectangle((i + 1 - width / 2, min_floor - height / 2), width, height, color='black', animated=True)
+                          for i in range(num_elevators)]
+        for rect in self.elevators:
+            self.ax.add_patch(rect)
+        # Waiting on the left, traveling inside and done on the right of each elevator
+        self.waiting = [self.ax.plot([], [], 'ro', markersize=points_size, animated=True)[0] for _ in range(num_elevators)]
+        self.traveling = [self.ax.plot([], [], 'o', markersize=points_size, color="white", animated=True)[0] for _ in range(num_elevators)]
+        self.done = [self.ax.plot([], [], 'o', markersize=points_size, color="green", animated=True)[0] for _ in range(num_elevators)]
+        self.title = self.ax.set_title("", animated=True)
+        self.artists = self.elevators + self.waiting + self.traveling + self.done + [self.title]
+        self.background = None
+
+    def setup_plot(self, num_floors, min_floor):
+        ax = self.ax
+        ax.set_xlim(0.5, self.num_elevators +.5)
         ax.set_ylim(min_floor-.5, num_floors +.5)
 
         ax.set_xlabel('Elevator')
-        #ax.set_ylabel('Floor')
-        ax.set_title(f"Elevator System at time: {current_time}")
         ax.grid(False)
 
-        ax.set_xticks(range(1, num_elevators+1))
+        ax.set_xticks(range(1, self.num_elevators+1))
         ax.set_yticks(range(min_floor, num_floors +1), [f"Floor {i}" for i in range(min_floor, num_floors +1)])
         ax.tick_params(length=0)
         for i in range(num_floors + 1):
             ax.axhline(y=i+.5, color='gray', linestyle='--', linewidth=0.9)
 
-        for i in range(num_elevators + 1):
+        for i in range(self.num_elevators + 1):
             ax.axvline(x=i+.5, color='black', linestyle='-', linewidth=0.9)
 
+    def update(self, frame):
+        """Moves the artists to a frame of `read_frames`, returns them."""
+        time, floors, passengers = frame
+        self.title.set_text(f"Elevator System at time: {time}")
+        offset = 0.15
+        for i, (floor, rect, groups) in enumerate(zip(floors, self.elevators, passengers)):
+            rect.set_y(floor - rect.get_height() / 2)
+            self.waiting[i].set_data([i + 1 - offset] * len(groups["W"]), groups["W"])
+            self.traveling[i].set_data([i + 1 - 0.02 * (j + 1) for j in range(len(groups["T"]))], groups["T"])
+            self.done[i].set_data([i + 1 + offset] * len(groups["D"]), groups["D"])
+        return self.artists
 
-    # Create slider for time control
-    #axslider = plt.axes([0.25, 0.02, 0.65, 0.03])
-    # slider = Slider(ax=axslider, label='Time', valmin=0, valmax=max_time, valinit=0, valstep=1)
-    # slider.on_changed(slider_update)
+    def render(self, frame):
+        """Draws a frame off screen and returns it as an image.
 
-    # Add animation
-    def init_func():
-        pass
-    if giff:
-        ani = FuncAnimation(fig, auto_update, init_func=init_func, frames = range(0,max_time+1)   )
-        writergif = PillowWriter(fps=3) 
-        ani.save('elevator_animation.gif', writer=writergif,)
+        The static part of the figure is drawn once and restored before drawing
+        only the artists of the frame (blitting).
+        """
+        canvas = self.fig.canvas
+        if self.background is None:
+            canvas.draw()
+            self.background = canvas.copy_from_bbox(self.fig.bbox)
+        canvas.restore_region(self.background)
+        for artist in self.update(frame):
+            self.fig.draw_artist(artist)
+        return Image.frombuffer("RGBA", canvas.get_width_height(), canvas.buffer_rgba(), "raw", "RGBA", 0, 1).convert("RGB")
+
+    def palette(self, frames):
+        """GIF palette with the colors of the given frames, e.g. the first and the last one."""
+        images = [self.render(frame) for frame in frames]
+        strip = Image.new("RGB", (sum(image.width for image in images), images[0].height))
+        for i, image in enumerate(images):
+            strip.paste(image, (i * image.width, 0))
+        # The plain colors of the figure are kept exact, the rest are the antialiased edges
+        colors = [(255, 255, 255), (0, 0, 0), (255, 0, 0), (0, 128, 0)]
+        palette = strip.quantize(colors=256 - len(colors))
+        edges = palette.getpalette()[:3 * (256 - len(colors))]
+        edges = [edges[i:i + 3] for i in range(0, len(edges), 3)]
+        # Without the shades close to them, which would take their pixels
+        edges = [edge for edge in edges if min(sum(abs(a - b) for a, b in zip(edge, color)) for color in colors) > 24]
+        palette.putpalette([c for color in colors + edges for c in color])
+        return palette
+
+    def render_gif_frame(self, frame, palette):
+        """`render` mapped to a fixed palette, much faster than computing a palette per frame."""
+        return self.render(frame).quantize(palette=palette, dither=Image.Dither.NONE)
+
+def save_gif(images, output_file, fps=3):
+    """Writes the images, with the same palette, as an animated GIF."""
+    images = iter(images)
+    first = next(images)
+    # Without optimizing, every GIF keeps the whole palette and they can be concatenated
+    first.save(output_file, save_all=True, append_images=images, duration=int(1000 / fps), loop=0, optimize=False)
+
+def split_gif(data):
+    """Splits a GIF into its header (with the palette and loop count) and its frames."""
+    position = 13
+    flags = data[10]
+    if flags & 0x80:
+        position += 3 * 2 ** ((flags & 7) + 1)
+    # Application extensions (the loop count) belong to the header
+    while data[position] == 0x21 and data[position + 1] == 0xFF:
+        position += 2
+        while data[position]:
+            position += data[position] + 1
+        position += 1
+    return data[:position], data[position:-1]
+
+def concat_gifs(gif_files, output_file):
+    """Joins GIFs with the same size and palette into one animation, in order."""
+    header = None
+    with open(output_file, "wb") as output:
+        for gif_file in gif_files:
+            with open(gif_file, "rb") as f:
+                gif_header, frames = split_gif(f.read())
+            if header is None:
+                header = gif_header
+                output.write(header)
+            elif gif_header != header:
+                raise ValueError(f"{gif_file} has a different size or palette.")
+            output.write(frames)
+        output.write(b";")
+
+# The figure of each worker process, created by its first chunk
+_buildings = {}
+
+def render_chunk(figure, frames, palette, output, first_number, fps=3):
+    """Renders frames headless, as a GIF file if `output` ends with .gif, or as numbered PNG files in the directory `output`."""
+    if figure not in _buildings:
+        _buildings[figure] = BuildingPlot(*figure)
+    building = _buildings[figure]
+    if output.endswith(".gif"):
+        palette_image = Image.new("P", (1, 1))
+        palette_image.putpalette(palette)
+        save_gif((building.render_gif_frame(frame, palette_image) for frame in frames), output, fps)
     else:
-        plt.show()
-     
-   
\ No newline at end of file
+        for number, frame in enumerate(frames, first_number):
+            building.render(frame).save(os.path.join(output, f"frame_{number:06d}.png"))
+    return len(frames)
+
+def export_animation(log_file, output_file="elevator_animation.gif", num_floors=20, num_elevators=2, stride=1, window=None,
+                     jobs=None, fps=3, points_size=2, min_floor=1, chunk_size=200):
+    """Renders the log as a GIF, or as a directory of lossless PNG frames if `output_file` does not end with .gif.
+
+    Only every `stride`-th snapshot within the (start, end) time `window` is drawn.
+    The frames are split in chunks of at most `chunk_size` rendered by `jobs` worker
+    processes (all the cores by default). Each chunk of a GIF is encoded by its worker
+    with a palette shared by all of them, so the chunks are only concatenated at the end.
+    Returns the number of frames.
+    """
+    frames = read_frames(log_file, window)[::stride]
+    if not frames:
+        raise ValueError("No snapshots to animate.")
+    figure = (num_floors, num_elevators, points_size, min_floor)
+    palette = BuildingPlot(*figure).palette([frames[0], frames[-1]]).getpalette()
+    gif = output_file.endswith(".gif")
+    if not gif:
+        os.makedirs(output_file, exist_ok=True)
+    jobs = jobs or os.cpu_count()
+    # At least one chunk per worker
+    chunk_size = max(1, min(chunk_size, -(-len(frames) // jobs)))
+    chunks = [frames[i:i + chunk_size] for i in range(0, len(frames), chunk_size)]
+    with tempfile.TemporaryDirectory() as chunk_dir:
+        outputs = [os.path.join(chunk_dir, f"{number:06d}.gif") if gif else output_file for number in range(len(chunks))]
+        arguments = [(figure, chunk, palette, output, number * chunk_size, fps) for number, (chunk, output) in enumerate(zip(chunks, outputs))]
+        if jobs == 1 or len(chunks) == 1:
+            for args in arguments:
+                render_chunk(*args)
+        else:
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                for result in [pool.submit(render_chunk, *args) for args in arguments]:
+                    result.result()
+        if gif:
+            concat_gifs(outputs, output_file)
+    return len(frames)
+
+def create_plot(num_floors= 20, num_elevators = 2, log_file="elevator_time.log", giff=True, points_size = 2, min_floor = 1,
+                output_file="elevator_animation.gif", stride=1, window=None, jobs=1):
+    if giff:
+        return export_animation(log_file, output_file, num_floors, num_elevators, stride, window, jobs, points_size=points_size, min_floor=min_floor)
+    frames = read_frames(log_file, window)[::stride]
+    building = BuildingPlot(num_floors, num_elevators, points_size, min_floor, on_screen=True)
+    ani = FuncAnimation(building.fig, building.update, frames=frames, blit=True, interval=1000 / 3)
+    plt.show()
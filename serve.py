@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+
+import argparse
+import asyncio
+import logging
+import sys
+from models.dispatchers import DISPATCHERS
+from models.simulation import read_requests
+from models.simulationServer import SimulationServer, encode, replay, serve
+
+########################################################
+# Real time simulation taking requests over a socket
+########################################################
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Elevator System Simulation served in real time over a socket.")
+    parser.add_argument('-ne', '--num-elevators', type=int, default=1, help='Number of elevators in the building.')
+    parser.add_argument('-nf', '--num-floors', type=int, default=20, help='Number of floors in the building.')
+    parser.add_argument('-c', '--capacity', type=int, default=2, help='Passenger capacity in each elevator.')
+    parser.add_argument('-d', '--dispatcher', choices=list(DISPATCHERS), default="nearest", help='Algorithm that assigns the requests to the elevators.')
+    parser.add_argument('-t', '--tick', type=float, default=1.0, help='Seconds per time unit. 0 runs as fast as possible.')
+    parser.add_argument('--host', type=str, default="127.0.0.1", help='TCP address to listen on.')
+    parser.add_argument('--port', type=int, default=8765, help='TCP port to listen on.')
+    parser.add_argument('-u', '--unix', type=str, default=None, help='Listen on this Unix socket instead of TCP.')
+    parser.add_argument('--ticks', type=int, default=None, help='Stop after this many time units. Runs until interrupted by default.')
+    parser.add_argument('--replay', type=str, default=None, help='Instead of serving, send the requests of this file to a running server at their times and print what it sends back.')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Enable debug mode.')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(stream=sys.stdout, level=logging.DEBUG if args.verbose else logging.INFO, format='%(message)s')
+
+    if args.replay is not None:
+        _, records = asyncio.run(replay(read_requests(args.replay), args.host, args.port, args.unix, args.tick))
+        for record in records:
+            sys.stdout.write(encode(record).decode())
+        return
+
+    server = SimulationServer(args.num_elevators, args.num_floors, args.capacity, dispatcher=args.dispatcher, tick=args.tick)
+    try:
+        asyncio.run(serve(server, args.host, args.port, args.unix, args.ticks))
+    except KeyboardInterrupt:
+        pass
+    print(f"Time {server.elevator_system.time}, {len(server.elevator_system.processed_requests)} passengers done, {server.rejected} requests rejected")
+    print(server.elevator_system.time_summary())
+
+
+if __name__ == "__main__":
+    main()
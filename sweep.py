@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+
+import argparse
+import csv
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from models.dispatchers import DISPATCHERS
+from models.resultCache import ResultCache
+from models.simulation import read_requests, run_simulation
+
+########################################################
+# Parameter sweep over elevators x capacity x floors
+########################################################
+
+PARAMETERS = ["input_file", "num_elevators", "num_floors", "elevator_capacity", "dispatcher"]
+RESULTS = ["passengers", "time", "min_wait_time", "max_wait_time", "mean_wait_time", "p50_wait_time", "p95_wait_time", "p99_wait_time",
+           "min_total_time", "max_total_time", "mean_total_time", "p50_total_time", "p95_total_time", "p99_total_time", "runtime"]
+
+# Requests per input file, read once per worker process
+_input_requests = {}
+
+
+def input_requests(input_file):
+    """Returns the requests of an input file, reading it only the first time."""
+    if input_file not in _input_requests:
+        _input_requests[input_file] = read_requests(input_file)
+    return _input_requests[input_file]
+
+
+def run_configuration(configuration, engine="tick", backend="object", log_dir=None, cache=None):
+    """Runs the simulation for one configuration and returns its row of the results table.
+
+    With a `models.resultCache.ResultCache` a configuration that already ran on the
+    same input is read from it instead.
+    """
+    file_log = None
+    if log_dir is not None:
+        name = "_".join(str(configuration[p]) for p in PARAMETERS[1:])
+        file_log = os.path.join(log_dir, f"{os.path.basename(configuration['input_file'])}_{name}.ndjson.gz")
+    start = time.perf_counter()
+    if cache is not None:
+        result = cache.run(configuration["input_file"], configuration["num_elevators"], configuration["num_floors"], configuration["elevator_capacity"],
+                           input_requests=lambda: input_requests(configuration["input_file"]), file_log=file_log, log_format="ndjson",
+                           engine=engine, backend=backend, dispatcher=configuration["dispatcher"])
+        passengers = result.passengers
+    else:
+        result = run_simulation(configuration["num_elevators"], configuration["num_floors"], configuration["elevator_capacity"],
+                                input_requests(configuration["input_file"]), file_log=file_log, engine=engine,
+                                log_format="ndjson", backend=backend, dispatcher=configuration["dispatcher"])
+        passengers = len(result.processed_requests)
+    row = dict(configuration)
+    row["passengers"] = passengers
+    row["time"] = result.time
+    row.update(result.summary_stats())
+    row["runtime"] = round(time.perf_counter() - start, 4)
+    return row
+
+
+def sweep(input_files, num_elevators, num_floors, capacities, dispatchers=("nearest",), engine="tick", backend="object", log_dir=None, jobs=None,
+          cache=None):
+    """Runs every combination of the parameters in a pool of `jobs` processes (all the cores by default).
+
+    The per time unit logs are only written if `log_dir` is given. The configurations
+    found in `cache`, a ResultCache, are not run again. Returns one row per
+    configuration, in the order of the grid.
+    """
+    configurations = [dict(zip(PARAMETERS, values)) for values in itertools.product(input_files, num_elevators, num_floors, capacities, dispatchers)]
+    if log_dir is not None:
+        os.makedirs(log_dir, exist_ok=True)
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        results = [pool.submit(run_configuration, c, engine, backend, log_dir, cache) for c in configurations]
+        return [result.result() for result in results]
+
+
+def write_results(rows, output_file):
+    """Writes the results table as csv, or as json if the file ends with .json."""
+    if output_file.endswith(".json"):
+        with open(output_file, "w") as f:
+            json.dump(rows, f, indent=4)
+        return
+    with open(output_file, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=PARAMETERS + RESULTS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Elevator System Simulation parameter sweep.")
+    parser.add_argument('input_files', type=str, nargs='*', default=["input.json"], help='The input file paths with passenger requests.')
+    parser.add_argument('-o', '--output-file', type=str, default="sweep.csv", help='The results table (csv, or json if it ends with .json).')
+    parser.add_argument('-ne', '--num-elevators', type=int, nargs='+', default=[1], help='Numbers of elevators in the building.')
+    parser.add_argument('-nf', '--num-floors', type=int, nargs='+', default=[20], help='Numbers of floors in the building.')
+    parser.add_argument('-c', '--capacity', type=int, nargs='+', default=[2], help='Passenger capacities of each elevator.')
+    parser.add_argument('-d', '--dispatcher', choices=list(DISPATCHERS), nargs='+', default=["nearest"], help='Algorithms that assign the requests to the elevators.')
+    parser.add_argument('-e', '--engine', choices=['tick', 'event'], default='tick', help='Simulation engine.')
+    parser.add_argument('-b', '--backend', choices=['object', 'array'], default='object', help='Simulation backend.')
+    parser.add_argument('-l', '--log-dir', type=str, default=None, help='Write the ndjson log of each configuration in this directory. No logs by default.')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='Number of worker processes. All the cores by default.')
+    parser.add_argument('--no-cache', action='store_true', help='Run every configuration, without reading or writing the result cache.')
+    parser.add_argument('--cache-dir', type=str, default=None, help='Directory of the result cache. $ELEVATOR_CACHE_DIR or ~/.cache/elevator by default.')
+    parser.add_argument('--cache-size', type=int, default=1024, metavar='MB', help='Size of the result cache, the least recently used results are removed beyond it.')
+    parser.add_argument('--cache-log', action='store_true', help='Also cache the logs of --log-dir. Logs larger than the cache size are not cached.')
+    args = parser.parse_args(argv)
+
+    cache = ResultCache(args.cache_dir, args.cache_size << 20, cache_logs=args.cache_log) if not args.no_cache else None
+    rows = sweep(args.input_files, args.num_elevators, args.num_floors, args.capacity, args.dispatcher,
+                 engine=args.engine, backend=args.backend, log_dir=args.log_dir, jobs=args.jobs, cache=cache)
+    write_results(rows, args.output_file)
+    print(f"{len(rows)} configurations written to {args.output_file}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+import pytest
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path_factory, monkeypatch):
+    """The command lines cache their results in a temporary directory, not in the user's cache."""
+    directory = tmp_path_factory.mktemp("cache")
+    monkeypatch.setenv("ELEVATOR_CACHE_DIR", str(directory))
+    return directory
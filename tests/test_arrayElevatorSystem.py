@@ -0,0 +1,75 @@
+import json
+import random
+import pytest
+from models.arrayElevatorSystem import ArrayElevatorSystem
+from models.passenger import Passenger
+from models.simulationLog import DeltaLog
+from models.simulation import run_simulation
+
+def load_requests(file_name):
+    with open(file_name) as f:
+        return [json.loads(line) for line in f]
+
+def random_requests(n, floors, horizon, seed):
+    rng = random.Random(seed)
+    requests = []
+    for i in range(n):
+        source, destination = rng.sample(range(1, floors + 1), 2)
+        requests.append({"time": rng.randint(0, horizon), "id": i, "source": source, "dest": destination})
+    return sorted(requests, key=lambda r: r["time"])
+
+def trips(elevator_system):
+    return [(p.id, p.assigned_elevator, p.request_time, p.pickup_time, p.dropoff_time, p.wait_time(), p.total_time()) for p in elevator_system.processed_requests]
+
+@pytest.mark.parametrize("num_elevators, elevator_capacity", [(1, 2), (2, 4), (3, 10)])
+@pytest.mark.parametrize("engine", ["tick", "event"])
+def test_array_backend_matches_object_backend(num_elevators, elevator_capacity, engine):
+    input_data = {
+        "num_elevators": num_elevators,
+        "num_floors": 20,
+        "elevator_capacity": elevator_capacity,
+        "input_requests": load_requests("long_sample.json"),
+        "file_log": None,
+        "engine": engine,
+    }
+    object_system = run_simulation(**input_data)
+    array_system = run_simulation(**input_data, backend="array")
+    assert trips(array_system) == trips(object_system)
+    assert array_system.time == object_system.time
+    assert array_system.time_summary() == object_system.time_summary()
+
+@pytest.mark.parametrize("seed", range(5))
+def test_array_backend_matches_object_backend_on_random_workloads(seed):
+    input_data = {
+        "num_elevators": 1 + seed,
+        "num_floors": 30,
+        "elevator_capacity": 3,
+        "input_requests": random_requests(300, 30, 200, seed),
+        "file_log": None,
+    }
+    object_system = run_simulation(**input_data)
+    array_system = run_simulation(**input_data, backend="array")
+    assert trips(array_system) == trips(object_system)
+
+def test_array_backend_logs_the_same_snapshots(tmp_path):
+    input_data = {
+        "num_elevators": 2,
+        "num_floors": 20,
+        "elevator_capacity": 4,
+        "input_requests": load_requests("long_sample.json"),
+    }
+    object_system = run_simulation(**input_data, file_log=tmp_path / "object.json")
+    array_system = run_simulation(**input_data, file_log=tmp_path / "array.json", backend="array")
+    assert array_system.log == object_system.log
+    assert (tmp_path / "array.json").read_text() == (tmp_path / "object.json").read_text()
+
+def test_array_backend_passenger_requests():
+    elevator_system = ArrayElevatorSystem(1, 10, 2)
+    elevator_system.add_passenger_request(Passenger(1, 3, 1, 0))
+    while not elevator_system.all_requests_processed():
+        elevator_system.move_time()
+    assert trips(elevator_system) == [(1, "E1", 0, 2, 4, 2, 4)]
+    with pytest.raises(TypeError):
+        elevator_system.add_passenger_request({'id': 1, 'source': 1, 'dest': 3, 'time': 0})
+    with pytest.raises(ValueError):
+        ArrayElevatorSystem(1, 10, 2, log=DeltaLog("/dev/null"))
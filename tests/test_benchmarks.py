@@ -0,0 +1,37 @@
+import json
+import os
+import pytest
+from benchmarks import bench_models, bench_simulator
+from benchmarks.bench_simulator import main, run_case, run_isolated
+
+def test_benchmark_case_reports_throughput():
+    case = {"passengers": 200, "num_elevators": 2, "num_floors": 10, "elevator_capacity": 5, "dispatcher": "nearest",
+            "engine": "tick", "backend": "object", "profile": "uniform", "rate": 2.0, "seed": 1, "phases": True}
+    result = run_case(case)
+    assert result["ticks"] > 100
+    assert result["ticks_per_second"] > 0 and result["passengers_per_second"] > 0 and result["peak_memory_mb"] > 0
+    assert list(result["phase_seconds"]) == ["add_requests", "schedule_elevators", "log_positions", "move_passengers", "move_elevators"]
+
+def test_benchmark_results_file(tmp_path, capsys):
+    output_file = str(tmp_path / "bench.json")
+    main(["-n", "100", "-b", "object", "array", "--no-phases", "-o", output_file])
+    main(["-n", "100", "--no-phases", "--compare", output_file])
+    with open(output_file) as f:
+        report = json.load(f)
+    assert [r["backend"] for r in report["results"]] == ["object", "array"]
+    assert "Compared with" in capsys.readouterr().out
+
+def test_model_benchmark(tmp_path):
+    report = bench_models.main(["-n", "1000", "-c", "100", "1000", "-o", str(tmp_path / "models.json")])
+    assert 0 < report["bytes_per_passenger"] < 200
+    assert set(report["unload_microseconds"]) == {100, 1000}
+
+def test_failed_benchmark_processes_are_reported(monkeypatch):
+    case = {"passengers": 10, "num_elevators": 1, "num_floors": 10, "elevator_capacity": 5, "dispatcher": "unknown",
+            "engine": "tick", "backend": "object", "profile": "uniform", "rate": 2.0, "seed": 1, "phases": False}
+    with pytest.raises(RuntimeError, match="The benchmark failed"):
+        run_isolated(case)
+    # A process that dies without a result, e.g. killed when out of memory
+    monkeypatch.setattr(bench_simulator, "run_case", lambda case: os._exit(3))
+    with pytest.raises(RuntimeError, match="exit code 3"):
+        run_isolated(case)
@@ -0,0 +1,66 @@
+import pytest
+from building import main
+from generate_data import generate_requests
+from models.building import Bank, Building, BuildingSimulation
+from models.simulation import read_requests, run_simulation
+from models.simulationLog import read_log
+
+def test_routes_go_through_the_sky_lobbies():
+    building = Building([Bank("low", 2, 5, 1, 10), Bank("mid", 2, 5, 10, 20), Bank("high", 2, 5, 20, 30)])
+    assert building.route(3, 8) == [(0, 3, 8)]
+    assert building.route(3, 25) == [(0, 3, 10), (1, 10, 20), (2, 20, 25)]
+    assert building.route(25, 3) == [(2, 25, 20), (1, 20, 10), (0, 10, 3)]
+    assert building.route(10, 15) == [(1, 10, 15)]
+    assert building.route(15, 10) == [(1, 15, 10)]
+    assert building.route(10, 1) == [(0, 10, 1)]
+    assert building.route(1, 30) == [(0, 1, 10), (1, 10, 20), (2, 20, 30)]
+
+def test_banks_must_be_stacked():
+    with pytest.raises(ValueError):
+        Building([Bank("low", 2, 5, 1, 10), Bank("high", 2, 5, 12, 20)])
+    with pytest.raises(ValueError):
+        Bank("flat", 2, 5, 3, 3)
+    tower = Building.tower(100, 30, 3, 10)
+    assert [(b.low, b.high, b.num_elevators) for b in tower.banks] == [(1, 34, 10), (34, 67, 10), (67, 100, 10)]
+
+@pytest.mark.parametrize("engine", ["tick", "event"])
+def test_one_bank_is_the_elevator_system(engine):
+    requests = read_requests("long_sample.json")
+    simulation = BuildingSimulation(Building([Bank("all", 3, 5, 1, 20)]), engine=engine, jobs=1).run(requests)
+    elevator_system = run_simulation(3, 20, 5, requests, file_log=None, engine=engine)
+    assert simulation.summary_stats() == elevator_system.summary_stats()
+    assert simulation.passengers == 100
+
+def test_transfers_take_the_transfer_time():
+    building = Building([Bank("low", 1, 5, 1, 10), Bank("high", 1, 5, 10, 20)], transfer_time=3)
+    simulation = BuildingSimulation(building, jobs=1).run([{"id": 1, "source": 1, "dest": 20, "time": 0}])
+    # 9 floors, the transfer, then 10 floors from the sky lobby
+    assert simulation.summary_stats()["max_total_time"] == 9 + 3 + 10
+    assert [stats.count for stats in simulation.bank_stats] == [1, 1]
+
+def test_parallel_banks_give_the_same_results():
+    requests = list(generate_requests(2000, 60, 300, "uniform", 5))
+    tower = Building.tower(60, 9, 3, 8, transfer_time=4)
+    serial = BuildingSimulation(tower, jobs=1).run(requests)
+    parallel = BuildingSimulation(tower, jobs=3).run(requests)
+    assert serial.passengers == parallel.passengers == 2000
+    assert serial.summary_stats() == parallel.summary_stats()
+    assert [s.summary() for s in serial.bank_stats] == [s.summary() for s in parallel.bank_stats]
+    assert serial.time == parallel.time and serial.epochs == parallel.epochs
+
+def test_bank_logs_are_merged(tmp_path):
+    building = Building.tower(20, 3, 2, 5, transfer_time=3)
+    simulation = BuildingSimulation(building, jobs=2, file_log=str(tmp_path / "building.ndjson.gz")).run(read_requests("long_sample.json"))
+    snapshots = list(read_log(tmp_path / "building.ndjson.gz"))
+    assert len(snapshots) == simulation.time
+    assert all(set(s["positions"]) == {"E1", "E2", "E3"} for s in snapshots)
+    assert sum(len(list(read_log(tmp_path / f"building.{bank.name}.ndjson.gz"))) for bank in building.banks) == 2 * simulation.time
+    last = snapshots[-1]["passengers_positions"]
+    assert {p["status"] for p in last.values()} == {"D"}
+    assert any("/" in passenger for passenger in last)
+
+def test_building_command_line(tmp_path, capsys):
+    simulation = main(["long_sample.json", "-k", "low", "2", "5", "1", "12", "-k", "high", "1", "5", "12", "20", "-j", "1"])
+    assert simulation.passengers == 100
+    out = capsys.readouterr().out
+    assert "low: floors 1-12, 2 elevators" in out and "Mean Wait Time" in out
@@ -0,0 +1,76 @@
+import pytest
+from generate_data import generate_requests
+from models.checkpoint import Checkpoint
+from models.profiler import Profiler
+from models.simulation import run_simulation
+from models.simulationLog import read_log
+
+def trips(elevator_system):
+    return [(p.id, p.assigned_elevator, p.request_time, p.pickup_time, p.dropoff_time) for p in elevator_system.processed_requests]
+
+def workload():
+    return list(generate_requests(300, 20, 300, "uniform", 7))
+
+def crash_after(requests, count):
+    """The input of a run that crashes after reading `count` requests."""
+    yield from requests[:count]
+    raise RuntimeError("crash")
+
+@pytest.mark.parametrize("engine", ["tick", "event"])
+@pytest.mark.parametrize("dispatcher", ["nearest", "batch"])
+def test_resume_after_a_crash(engine, dispatcher, tmp_path):
+    requests = workload()
+    expected = run_simulation(3, 20, 5, requests, file_log=None, engine=engine, dispatcher=dispatcher, reorder_window=5)
+    with pytest.raises(RuntimeError):
+        run_simulation(3, 20, 5, crash_after(requests, 150), file_log=None, engine=engine, dispatcher=dispatcher, reorder_window=5,
+                       checkpoint=tmp_path / "run.ckpt", checkpoint_every=40)
+    checkpoint = Checkpoint.load(tmp_path / "run.ckpt")
+    assert 0 < checkpoint.time < expected.time
+    elevator_system = run_simulation(3, 20, 5, requests, file_log=None, engine=engine, resume=tmp_path / "run.ckpt", profiler=Profiler())
+    assert trips(elevator_system) == trips(expected)
+    assert elevator_system.summary_stats() == expected.summary_stats()
+    assert elevator_system.time == expected.time
+    assert elevator_system.dispatcher.name == dispatcher
+
+@pytest.mark.parametrize("log_format", ["json", "ndjson", "delta"])
+def test_resumed_log_goes_on_from_the_checkpoint(log_format, tmp_path):
+    requests = workload()
+    run_simulation(3, 20, 5, requests, file_log=str(tmp_path / "full.json"))
+    with pytest.raises(RuntimeError):
+        run_simulation(3, 20, 5, crash_after(requests, 200), file_log=str(tmp_path / "crashed.json"), reorder_window=5,
+                       checkpoint=tmp_path / "run.ckpt.gz", checkpoint_every=50)
+    checkpoint = Checkpoint.load(tmp_path / "run.ckpt.gz")
+    run_simulation(3, 20, 5, requests, file_log=str(tmp_path / "resumed.log"), log_format=log_format, resume=checkpoint)
+    snapshots = list(read_log(tmp_path / "resumed.log"))
+    assert snapshots[0]["time"] == checkpoint.time
+    assert snapshots == list(read_log(tmp_path / "full.json"))[checkpoint.time:]
+
+def test_checkpoint_forks_independent_branches(tmp_path):
+    requests = workload()
+    with pytest.raises(RuntimeError):
+        run_simulation(3, 20, 5, crash_after(requests, 120), file_log=None, reorder_window=5, checkpoint=tmp_path / "run.ckpt", checkpoint_every=30)
+    checkpoint = Checkpoint.load(tmp_path / "run.ckpt")
+    first, _ = checkpoint.restore(requests)
+    second, _ = checkpoint.restore(requests)
+    assert first is not second and first.elevators[0] is not second.elevators[0]
+    # Same state, then each branch goes on with its own requests
+    assert trips(first) == trips(second) and first.time == second.time == checkpoint.time
+    # The requests already read come before the rush
+    rush = [{"id": f"extra{i}", "source": 1, "dest": 20, "time": checkpoint.time + 50} for i in range(10)]
+    expected = run_simulation(3, 20, 5, requests, file_log=None)
+    same = run_simulation(3, 20, 5, requests, file_log=None, resume=checkpoint)
+    busier = run_simulation(3, 20, 5, sorted(requests + rush, key=lambda r: r["time"]), file_log=None, resume=checkpoint)
+    assert trips(same) == trips(expected)
+    assert len(busier.processed_requests) == len(expected.processed_requests) + 10
+    assert busier.summary_stats() != expected.summary_stats()
+    assert {p.request_time for p in busier.processed_requests if str(p.id).startswith("extra")} == {checkpoint.time + 50}
+
+def test_checkpoint_files_are_checked(tmp_path):
+    (tmp_path / "other").write_bytes(b"not a checkpoint\n")
+    with pytest.raises(ValueError, match="not a checkpoint"):
+        Checkpoint.load(tmp_path / "other")
+    (tmp_path / "old").write_bytes(b"elevator-checkpoint 0 10\n")
+    with pytest.raises(ValueError, match="version 0"):
+        Checkpoint.load(tmp_path / "old")
+    with pytest.raises(ValueError):
+        run_simulation(1, 10, 5, [], file_log=None, backend="array", checkpoint=tmp_path / "run.ckpt")
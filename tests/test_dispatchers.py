@@ -0,0 +1,124 @@
+import itertools
+import json
+import numpy as np
+import pytest
+from models.batchAssignment import pickup_costs, transportation
+from models.dispatchers import DISPATCHERS, BatchAssignment, CollectiveControl, DestinationDispatch, NearestCar, get_dispatcher, stops
+from models.elevatorSystem import ElevatorSystem
+from models.simulationLog import read_log
+from models.elevator import Elevator
+from models.passenger import Passenger
+from models.simulation import run_simulation
+
+def load_requests(file_name):
+    with open(file_name) as f:
+        return [json.loads(line) for line in f]
+
+@pytest.mark.parametrize("dispatcher", list(DISPATCHERS))
+@pytest.mark.parametrize("num_elevators, elevator_capacity", [(1, 2), (3, 10)])
+def test_dispatcher_serves_every_request(dispatcher, num_elevators, elevator_capacity):
+    input_requests = load_requests("long_sample.json")
+    elevator_system = run_simulation(num_elevators, 20, elevator_capacity, input_requests, file_log=None, dispatcher=dispatcher)
+    assert elevator_system.all_requests_processed()
+    assert sorted(p.id for p in elevator_system.processed_requests) == sorted(r["id"] for r in input_requests)
+    assert all(p.wait_time() >= 0 and p.total_time() > p.wait_time() for p in elevator_system.processed_requests)
+
+def test_nearest_car_is_the_default():
+    input_requests = load_requests("long_sample.json")
+    default_system = run_simulation(3, 20, 10, input_requests, file_log=None)
+    nearest_system = run_simulation(3, 20, 10, input_requests, file_log=None, dispatcher="nearest")
+    assert isinstance(default_system.dispatcher, NearestCar)
+    assert default_system.time_summary() == nearest_system.time_summary()
+
+def test_collective_control_prefers_elevators_coming_this_way():
+    going_up, going_down = Elevator(1, 5), Elevator(2, 5)
+    going_up.current_floor, going_down.current_floor = 4, 6
+    going_up.load_passenger(Passenger(1, 4, 12, 0))
+    going_up.passengers[0].pickup_time = 0
+    going_up.direction = "up"
+    going_down.load_passenger(Passenger(2, 6, 1, 0))
+    going_down.passengers[0].pickup_time = 0
+    going_down.direction = "down"
+    request = Passenger(3, 7, 10, 0)
+    dispatcher = CollectiveControl()
+    assert dispatcher.cost(going_up, request) == 3
+    # Has to go down to floor 1 and come back up to 7
+    assert dispatcher.cost(going_down, request) == 11
+    assert dispatcher.cost(Elevator(3, 5), request) == 6
+
+def test_destination_dispatch_groups_destinations():
+    shared, other = Elevator(1, 5), Elevator(2, 5)
+    for elevator in (shared, other):
+        elevator.current_floor = 3
+    shared.load_passenger(Passenger(1, 3, 15, 0))
+    other.load_passenger(Passenger(2, 3, 9, 0))
+    request = Passenger(3, 3, 15, 0)
+    dispatcher = DestinationDispatch()
+    assert dispatcher.cost(shared, request) < dispatcher.cost(other, request)
+
+def test_unknown_dispatcher():
+    with pytest.raises(ValueError):
+        get_dispatcher("fastest")
+    with pytest.raises(ValueError):
+        run_simulation(1, 10, 2, [], file_log=None, backend="array", dispatcher="collective")
+
+def brute_force_transportation(cost, supply, capacity):
+    units = [row for row, count in enumerate(supply) for _ in range(count)]
+    return min(sum(cost[u][k] for u, k in zip(units, choice))
+               for choice in itertools.product(range(len(capacity)), repeat=len(units))
+               if all(choice.count(k) <= capacity[k] for k in range(len(capacity))))
+
+@pytest.mark.parametrize("seed", range(30))
+def test_transportation_is_minimum_cost(seed):
+    rng = np.random.default_rng(seed)
+    rows, columns = rng.integers(1, 4, 2)
+    cost = rng.integers(0, 10, (rows, columns))
+    capacity = rng.integers(0, 4, columns)
+    supply = rng.multinomial(min(capacity.sum(), 5), [1 / rows] * rows)
+    flow = transportation(cost, supply, capacity)
+    assert (flow.sum(1) == supply).all() and (flow.sum(0) <= capacity).all() and (flow >= 0).all()
+    assert (flow * cost).sum() == brute_force_transportation(cost.tolist(), supply.tolist(), capacity.tolist())
+
+def test_pickup_costs_are_the_collective_control_costs():
+    rng = np.random.default_rng(0)
+    elevators = [Elevator(i, 10) for i in range(6)]
+    for elevator in elevators:
+        elevator.current_floor = int(rng.integers(1, 21))
+        for i in range(int(rng.integers(0, 3))):
+            passenger = Passenger(i, int(rng.integers(1, 21)), int(rng.integers(1, 21)), 0)
+            passenger.pickup_time = 0 if rng.random() < 0.5 else None
+            elevator.load_passenger(passenger)
+        elevator.direction = None if elevator.is_empty() else rng.choice(["up", "down"])
+    requests = [Passenger(i, source, target, 0) for i, (source, target) in enumerate([(3, 9), (9, 3), (12, 20), (20, 1), (1, 2)])]
+    signs = [{"up": 1, "down": -1}.get(e.direction, 0) for e in elevators]
+    turns = [max(stops(e) + [e.current_floor], key=lambda f: (f - e.current_floor) * sign) for e, sign in zip(elevators, signs)]
+    costs = pickup_costs([e.current_floor for e in elevators], signs, turns, [r.source_floor for r in requests], [1 if r.direction == "up" else -1 for r in requests])
+    assert costs.tolist() == [[CollectiveControl().cost(e, r) for e in elevators] for r in requests]
+
+def test_batch_assignment_cuts_the_wait():
+    input_requests = load_requests("long_sample.json")
+    nearest = run_simulation(3, 20, 10, input_requests, file_log=None).summary_stats()
+    batch_system = run_simulation(3, 20, 10, input_requests, file_log=None, dispatcher="batch")
+    batch = batch_system.summary_stats()
+    assert batch["max_wait_time"] < nearest["max_wait_time"] and batch["mean_wait_time"] < nearest["mean_wait_time"]
+    assert batch_system.dispatcher.reassignments > 0
+    event = run_simulation(3, 20, 10, input_requests, file_log=None, dispatcher="batch", engine="event")
+    assert event.summary_stats() == batch
+
+def test_reassignments_are_logged(tmp_path):
+    input_requests = load_requests("long_sample.json")
+    run_simulation(3, 20, 10, input_requests, file_log=tmp_path / "out.json", dispatcher="batch")
+    run_simulation(3, 20, 10, input_requests, file_log=tmp_path / "out.delta", dispatcher="batch", log_format="delta")
+    assert list(read_log(tmp_path / "out.delta")) == list(read_log(tmp_path / "out.json"))
+
+def test_batch_assignment_without_reassignment():
+    input_requests = load_requests("long_sample.json")
+    elevator_system = ElevatorSystem(2, 20, 3, dispatcher=BatchAssignment(reassign=False))
+    for request in input_requests:
+        while elevator_system.time < request["time"]:
+            elevator_system.move_time()
+        elevator_system.add_requests([request])
+    while not elevator_system.all_requests_processed():
+        elevator_system.move_time()
+    assert len(elevator_system.processed_requests) == 100
+    assert elevator_system.dispatcher.reassignments == 0
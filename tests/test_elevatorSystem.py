@@ -1,8 +1,12 @@
+import json
+import random
 import pytest
 from models.passenger import Passenger
 from models.elevator import Elevator
 from models.elevatorSystem import ElevatorSystem
-from elevatorSystemSimulator import run_simulation
+from models.simulationLog import read_log, DeltaLog, DeltaLogReader
+from models.profiler import Profiler, PHASES
+from models.simulation import run_simulation
 
 def test_single_passenger():
     input_data = {
@@ -101,6 +105,262 @@ def test_request_not_as_passenger():
     with pytest.raises(TypeError):
         elevator_system.add_passenger_request({'id': 1, 'source': 1, 'dest': 3, 'time': 0})
 
+def load_requests(file_name):
+    with open(file_name) as f:
+        return [json.loads(line) for line in f]
 
+def trips(elevator_system):
+    return [(p.id, p.assigned_elevator, p.request_time, p.pickup_time, p.dropoff_time) for p in elevator_system.processed_requests]
 
-        
\ No newline at end of file
+@pytest.mark.parametrize("num_elevators", [1, 2, 3])
+def test_event_engine_matches_tick_engine(num_elevators, tmp_path):
+    input_data = {
+        "num_elevators": num_elevators,
+        "num_floors": 20,
+        "elevator_capacity": 10,
+        "input_requests": load_requests("long_sample.json"),
+    }
+    tick_system = run_simulation(**input_data, file_log=tmp_path / "tick.log")
+    event_system = run_simulation(**input_data, file_log=tmp_path / "event.log", engine="event")
+    assert trips(event_system) == trips(tick_system)
+    assert event_system.time == tick_system.time
+    assert event_system.time_summary() == tick_system.time_summary()
+    # The event engine only logs the time units where something happens
+    tick_log = {snapshot["time"]: snapshot for snapshot in tick_system.log}
+    assert all(snapshot == tick_log[snapshot["time"]] for snapshot in event_system.log)
+
+def test_event_engine_skips_idle_time(tmp_path):
+    input_data = {
+        "num_elevators": 2,
+        "num_floors": 20,
+        "elevator_capacity": 2,
+        "input_requests": [
+            {"id": 1, "source": 1, "dest": 20, "time": 0},
+            {"id": 2, "source": 2, "dest": 3, "time": 0},
+            {"id": 3, "source": 5, "dest": 1, "time": 0},
+            {"id": 4, "source": 19, "dest": 1, "time": 100000},
+        ]
+    }
+    tick_system = run_simulation(**input_data, file_log=None)
+    event_system = run_simulation(**input_data, file_log=tmp_path / "event.log", engine="event")
+    assert trips(event_system) == trips(tick_system)
+    assert len(event_system.log) < 20
+
+@pytest.mark.parametrize("file_name", ["out.ndjson", "out.ndjson.gz"])
+def test_ndjson_log_matches_json_log(file_name, tmp_path):
+    input_data = {
+        "num_elevators": 2,
+        "num_floors": 10,
+        "elevator_capacity": 3,
+        "input_requests": load_requests("input.json"),
+    }
+    json_system = run_simulation(**input_data, file_log=tmp_path / "out.json")
+    ndjson_system = run_simulation(**input_data, file_log=tmp_path / file_name, log_format="ndjson")
+    assert trips(ndjson_system) == trips(json_system)
+    assert len(ndjson_system.log) == len(json_system.log)
+    assert list(read_log(tmp_path / file_name)) == list(read_log(tmp_path / "out.json"))
+
+def test_parse_log_file_reads_ndjson(tmp_path):
+    from plot import parse_log_file
+    input_data = {
+        "num_elevators": 2,
+        "num_floors": 10,
+        "elevator_capacity": 3,
+        "input_requests": load_requests("input.json"),
+    }
+    run_simulation(**input_data, file_log=tmp_path / "out.json")
+    run_simulation(**input_data, file_log=tmp_path / "out.ndjson.gz", log_format="ndjson")
+    run_simulation(**input_data, file_log=tmp_path / "columnar", log_format="columnar")
+    for json_df, ndjson_df, columnar_df in zip(parse_log_file(tmp_path / "out.json"), parse_log_file(tmp_path / "out.ndjson.gz"), parse_log_file(tmp_path / "columnar")):
+        assert json_df.equals(ndjson_df)
+        assert json_df.equals(columnar_df)
+
+@pytest.mark.parametrize("file_name", ["out.delta", "out.delta.gz"])
+def test_delta_log_rebuilds_every_snapshot(file_name, tmp_path):
+    requests = load_requests("long_sample.json")
+    json_system = run_simulation(3, 20, 10, requests, file_log=tmp_path / "out.json")
+    with DeltaLog(tmp_path / file_name, keyframe_interval=50) as log:
+        delta_system = ElevatorSystem(3, 20, 10, log=log)
+        while delta_system.time < json_system.time:
+            for request in requests:
+                if request['time'] == delta_system.time:
+                    delta_system.add_passenger_request(Passenger(request['id'], request['source'], request['dest'], request['time']))
+            delta_system.move_time()
+    json_log = list(read_log(tmp_path / "out.json"))
+    reader = DeltaLogReader(tmp_path / file_name)
+    assert len(reader.keyframes) > 1
+    assert reader.state_at(57) == json_log[57]
+    assert list(reader.snapshots()) == json_log
+
+def test_delta_log_is_smaller(tmp_path):
+    input_data = {
+        "num_elevators": 3,
+        "num_floors": 20,
+        "elevator_capacity": 10,
+        "input_requests": load_requests("long_sample.json"),
+    }
+    json_system = run_simulation(**input_data, file_log=tmp_path / "out.json")
+    delta_system = run_simulation(**input_data, file_log=tmp_path / "out.delta", log_format="delta")
+    assert trips(delta_system) == trips(json_system)
+    assert list(read_log(tmp_path / "out.delta")) == list(read_log(tmp_path / "out.json"))
+    assert (tmp_path / "out.delta").stat().st_size * 20 < (tmp_path / "out.json").stat().st_size
+
+def test_event_engine_delta_log_only_has_the_logged_time_units(tmp_path):
+    input_data = {
+        "num_elevators": 2,
+        "num_floors": 20,
+        "elevator_capacity": 10,
+        "input_requests": [{"id": 1, "source": 1, "dest": 20, "time": 0}, {"id": 2, "source": 18, "dest": 3, "time": 50}],
+    }
+    tick_system = run_simulation(**input_data, file_log=tmp_path / "tick.json")
+    event_system = run_simulation(**input_data, file_log=tmp_path / "event.json", engine="event")
+    run_simulation(**input_data, file_log=tmp_path / "event.delta", log_format="delta", engine="event")
+    tick_log = {snapshot["time"]: snapshot for snapshot in read_log(tmp_path / "tick.json")}
+    replay = list(read_log(tmp_path / "event.delta"))
+    assert replay == list(read_log(tmp_path / "event.json"))
+    assert len(replay) < event_system.time == tick_system.time
+    assert all(snapshot == tick_log[snapshot["time"]] for snapshot in replay)
+    reader = DeltaLogReader(tmp_path / "event.delta")
+    assert reader.state_at(replay[1]["time"]) == replay[1]
+    with pytest.raises(ValueError):
+        reader.state_at(replay[1]["time"] - 1)
+
+def greedy_schedule(elevators, requests):
+    """The original scheduling loop: each request takes the closest elevator that is not full."""
+    for request in requests[:]:
+        closest_elevator = min(elevators, key=lambda e: abs(e.current_floor - request.source_floor) if not e.is_full() else float('inf'))
+        if not closest_elevator.is_full():
+            closest_elevator.load_passenger(request)
+            requests.remove(request)
+
+@pytest.mark.parametrize("seed", range(20))
+def test_indexed_scheduling_matches_greedy_scheduling(seed):
+    rng = random.Random(seed)
+    num_elevators, capacity = rng.randint(1, 6), rng.randint(1, 8)
+    elevator_system = ElevatorSystem(num_elevators, 30, capacity)
+    elevators = [Elevator(i+1, capacity) for i in range(num_elevators)]
+    for system_elevator, elevator in zip(elevator_system.elevators, elevators):
+        system_elevator.current_floor = elevator.current_floor = rng.randint(1, 30)
+        for i in range(rng.randint(0, capacity)):
+            system_elevator.load_passenger(f"busy{i}")
+            elevator.load_passenger(f"busy{i}")
+    requests = []
+    for i in range(rng.randint(0, 60)):
+        source, target = rng.sample(range(1, 31), 2)
+        elevator_system.add_passenger_request(Passenger(i, source, target, 0))
+        requests.append(Passenger(i, source, target, 0))
+    elevator_system.schedule_elevators()
+    greedy_schedule(elevators, requests)
+    assert [[getattr(p, "id", p) for p in e.passengers] for e in elevator_system.elevators] == [[getattr(p, "id", p) for p in e.passengers] for e in elevators]
+    assert [p.id for p in elevator_system.requests] == [p.id for p in requests]
+
+def test_waiting_for_full_elevators_is_counted():
+    elevator_system = ElevatorSystem(1, 10, 1)
+    first, second = Passenger(1, 1, 5, 0), Passenger(2, 1, 3, 0)
+    elevator_system.add_passenger_request(first)
+    elevator_system.add_passenger_request(second)
+    while not elevator_system.all_requests_processed():
+        elevator_system.move_time()
+    assert first.assignation_wait_time == 0
+    assert second.assignation_wait_time == 5
+    assert second.assigned_elevator == "E1"
+
+def test_elevator_passengers_keep_loading_order():
+    elevator = Elevator(1, 200)
+    passengers = [Passenger(i, 1, 2 + i % 5, 0) for i in range(200)]
+    for passenger in passengers:
+        elevator.load_passenger(passenger)
+    elevator.load_passenger(Passenger(200, 1, 3, 0))
+    assert elevator.is_full() and len(elevator.passengers) == 200
+    for passenger in passengers[::2]:
+        elevator.unload_passenger(passenger)
+    elevator.unload_passenger(passengers[0])
+    assert list(elevator.passengers) == passengers[1::2]
+    assert elevator.passengers[0] is passengers[1] and passengers[0] not in elevator.passengers
+    with pytest.raises(AttributeError):
+        passengers[0].floor = 3
+
+def test_large_car_drops_everyone_off():
+    requests = [{"id": i, "source": 1 + i % 3, "dest": 10 - i % 4, "time": i // 50} for i in range(300)]
+    elevator_system = run_simulation(1, 10, 300, requests, file_log=None)
+    assert len(elevator_system.processed_requests) == 300
+    assert elevator_system.elevators[0].direction is None
+    assert all(p.dropoff_time > p.pickup_time for p in elevator_system.processed_requests)
+
+@pytest.mark.parametrize("engine, backend", [("tick", "object"), ("event", "object"), ("tick", "array"), ("event", "array")])
+def test_profiler_counts_phases_and_events(engine, backend, tmp_path):
+    profiler = Profiler()
+    elevator_system = run_simulation(3, 20, 10, load_requests("long_sample.json"), file_log=None, engine=engine, backend=backend, profiler=profiler)
+    assert profiler.counters == {"assignments": 100, "pickups": 100, "dropoffs": 100, "full_car_rejections": 2163}
+    assert profiler.ticks == elevator_system.time
+    assert profiler.calls["schedule_elevators"] + profiler.calls["skip_time"] <= elevator_system.time
+    assert (profiler.calls["skip_time"] > 0) == (engine == "event")
+    profiler.write(tmp_path / "profile.json")
+    with open(tmp_path / "profile.json") as f:
+        assert json.load(f) == profiler.to_dict()
+    assert "Full car rejections      2163" in profiler.report()
+
+def test_no_profiler_leaves_phases_untouched():
+    elevator_system = ElevatorSystem(1, 10, 1)
+    assert not any(name in vars(elevator_system) for name in PHASES)
+
+@pytest.mark.parametrize("engine, backend", [("tick", "object"), ("event", "object"), ("tick", "array")])
+def test_columnar_log_matches_json_log(engine, backend, tmp_path):
+    from models.columnarLog import ColumnarLogReader
+    input_data = {"num_elevators": 3, "num_floors": 20, "elevator_capacity": 10, "input_requests": load_requests("long_sample.json"), "engine": engine, "backend": backend}
+    run_simulation(**input_data, file_log=tmp_path / "out.json")
+    run_simulation(**input_data, file_log=tmp_path / "columnar", log_format="columnar")
+    assert list(read_log(tmp_path / "columnar")) == list(read_log(tmp_path / "out.json"))
+    reader = ColumnarLogReader(tmp_path / "columnar")
+    assert len(reader) == len(list(read_log(tmp_path / "out.json")))
+    assert reader.elevator_ids == ["E1", "E2", "E3"]
+
+def test_columnar_log_time_window(tmp_path):
+    from models.columnarLog import ColumnarLogReader
+    run_simulation(3, 20, 10, load_requests("long_sample.json"), file_log=tmp_path / "columnar", log_format="columnar")
+    snapshots = {snapshot["time"]: snapshot for snapshot in read_log(tmp_path / "columnar")}
+    reader = ColumnarLogReader(tmp_path / "columnar")
+    passengers, elevators = reader.window(40, 59)
+    # Views of the memory mapped files
+    assert passengers.base is not None and elevators.base is not None
+    assert set(passengers["time"].tolist()) == set(elevators["time"].tolist()) == set(range(40, 60))
+    assert len(passengers) == sum(len(snapshots[t]["passengers_positions"]) for t in range(40, 60))
+    at_50 = elevators[elevators["time"] == 50]
+    assert {reader.elevator_ids[e]: f for e, f in zip(at_50["elevator"].tolist(), at_50["floor"].tolist())} == snapshots[50]["positions"]
+    done = passengers[(passengers["time"] == 59) & (passengers["status"] == b"D")]
+    assert sorted(reader.passenger_ids[p] for p in done["passenger"].tolist()) == sorted(int(p) for p, position in snapshots[59]["passengers_positions"].items() if position["status"] == "D")
+    assert len(reader.window(1000, 2000)[0]) == 0
+
+@pytest.mark.parametrize("engine", ["tick", "event"])
+def test_events_match_the_passenger_times(engine):
+    from models.events import Arrival, Assignment, Pickup, Dropoff, ElevatorMove, TickEnd
+    events = []
+    subscribers = [(event, events.append) for event in (Arrival, Assignment, Pickup, Dropoff, ElevatorMove, TickEnd)]
+    elevator_system = run_simulation(3, 20, 5, load_requests("long_sample.json"), file_log=None, engine=engine, subscribers=subscribers)
+    def times(kind):
+        return {event.passenger.id: event.time for event in events if type(event) is kind}
+    passengers = elevator_system.processed_requests
+    assert times(Arrival) == {p.id: p.request_time for p in passengers}
+    assert times(Pickup) == {p.id: p.pickup_time for p in passengers}
+    assert times(Dropoff) == {p.id: p.dropoff_time for p in passengers}
+    assert {event.passenger.id: event.elevator.id for event in events if type(event) is Assignment} == {p.id: p.assigned_elevator for p in passengers}
+    for elevator in elevator_system.elevators:
+        assert 1 + sum(event.floors for event in events if type(event) is ElevatorMove and event.elevator is elevator) == elevator.current_floor
+    ticks = [event.time for event in events if type(event) is TickEnd]
+    assert ticks == sorted(set(ticks)) and ticks[-1] == elevator_system.time
+
+def test_headless_run_only_has_the_statistics_subscriber(monkeypatch):
+    from models.events import Dropoff
+    from models.simulationLog import NullLog
+    monkeypatch.setattr(ElevatorSystem, "write_snapshot", lambda self, event: pytest.fail("Snapshot taken"))
+    elevator_system = run_simulation(3, 20, 5, load_requests("long_sample.json"), file_log=None)
+    assert list(elevator_system.subscribers) == [Dropoff]
+    assert elevator_system.stats.count == 100
+    # Without the statistics subscriber nothing is recorded
+    elevator_system = ElevatorSystem(1, 5, 4, log=NullLog())
+    elevator_system.unsubscribe(Dropoff, elevator_system.stats.dropoff)
+    assert elevator_system.subscribers == {}
+    elevator_system.add_passenger_request(Passenger(1, 1, 3, 0))
+    while not elevator_system.all_requests_processed():
+        elevator_system.move_time()
+    assert elevator_system.stats.count == 0 and len(elevator_system.processed_requests) == 1
@@ -0,0 +1,25 @@
+import json
+import subprocess
+import sys
+from elevatorSystemSimulator import main
+
+def test_import_does_not_load_heavy_modules():
+    code = "import sys, elevatorSystemSimulator; print([m for m in ('numpy', 'pandas', 'matplotlib', 'http.server', 'models.metricsReporter') if m in sys.modules])"
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    assert output.strip() == "[]"
+
+def test_main_runs_the_simulation(tmp_path, capsys):
+    elevator_system = main(["input.json", str(tmp_path / "out.log"), "-ne", "2", "-p", str(tmp_path / "profile.json")])
+    output = capsys.readouterr().out
+    assert elevator_system.time_summary() in output
+    assert "Assignments" in output
+    with open(tmp_path / "profile.json") as f:
+        assert json.load(f)["counters"]["dropoffs"] == 4
+    with open(tmp_path / "out.log") as f:
+        assert len(json.load(f)) == elevator_system.time
+
+def test_main_resumes_from_a_checkpoint(tmp_path):
+    first = main(["long_sample.json", str(tmp_path / "out.log"), "-ne", "3", "-c", "5", "-cp", str(tmp_path / "run.ckpt"), "-ce", "10"])
+    resumed = main(["long_sample.json", str(tmp_path / "resumed.log"), "-lf", "ndjson", "-rs", str(tmp_path / "run.ckpt")])
+    assert resumed.summary_stats() == first.summary_stats()
+    assert len(resumed.elevators) == 3
@@ -0,0 +1,63 @@
+import json
+import pytest
+import generate_data
+from generate_data import PROFILES, LOBBY, generate_requests, main, request_batches
+from models.simulation import read_requests, run_simulation
+
+@pytest.mark.parametrize("profile", [p for p in PROFILES if p != "poisson"])
+def test_profiles_generate_valid_requests(profile):
+    requests = list(generate_requests(2000, 15, 300, profile, seed=7))
+    assert len(requests) == 2000
+    assert [r["id"] for r in requests] == list(range(2000))
+    assert all(a["time"] <= b["time"] for a, b in zip(requests, requests[1:]))
+    assert all(0 <= r["time"] <= 300 for r in requests)
+    assert all(r["source"] != r["dest"] and 1 <= r["source"] <= 15 and 1 <= r["dest"] <= 15 for r in requests)
+
+def test_traffic_mix():
+    up_peak = list(generate_requests(5000, 20, 100, "up-peak", seed=1))
+    assert sum(r["source"] == LOBBY for r in up_peak) > 0.8 * len(up_peak)
+    down_peak = list(generate_requests(5000, 20, 100, "down-peak", seed=1))
+    assert sum(r["dest"] == LOBBY for r in down_peak) > 0.8 * len(down_peak)
+    interfloor = list(generate_requests(5000, 20, 100, "interfloor", seed=1))
+    assert not any(LOBBY in (r["source"], r["dest"]) for r in interfloor)
+
+def test_poisson_arrivals():
+    requests = list(generate_requests(0, 20, 999, "uniform", seed=3, rate=5))
+    assert 4500 < len(requests) < 5500
+    requests = list(generate_requests(10000, 20, 999, "poisson", seed=3))
+    assert 9500 < len(requests) < 10500
+
+def test_same_seed_same_requests(tmp_path):
+    main([str(tmp_path / "a.json"), "-n", "500", "-t", "50", "-p", "lunch", "-s", "11"])
+    main([str(tmp_path / "b.json"), "-n", "500", "-t", "50", "-p", "lunch", "-s", "11"])
+    assert (tmp_path / "a.json").read_text() == (tmp_path / "b.json").read_text()
+    requests = read_requests(tmp_path / "a.json")
+    assert requests == list(generate_requests(500, 20, 50, "lunch", seed=11))
+    elevator_system = run_simulation(3, 20, 10, requests, file_log=None)
+    assert len(elevator_system.processed_requests) == 500
+
+@pytest.mark.parametrize("profile", ["up-peak", "lunch"])
+def test_time_units_are_drawn_in_chunks(profile, monkeypatch):
+    monkeypatch.setattr(generate_data, "CHUNK", 7)
+    requests = list(generate_requests(3000, 15, 200, profile, seed=5))
+    assert len(requests) == 3000
+    assert all(a["time"] <= b["time"] for a, b in zip(requests, requests[1:]))
+    assert requests[-1]["time"] <= 200
+    # The arrivals follow the intensity of the profile across the chunks
+    weights = generate_data.intensities(profile, 0, 201, 201)
+    expected = weights[50:151].sum() / weights.sum()
+    assert abs(sum(50 <= r["time"] <= 150 for r in requests) / len(requests) - expected) < 0.03
+    # Batches never mix the time units out of order
+    batches = list(request_batches(3000, 15, 200, profile, seed=5, batch_size=100))
+    assert all(len(times) <= 100 for times, _, _ in batches)
+    assert sum(len(times) for times, _, _ in batches) == 3000
+
+def test_too_few_floors_are_rejected(capsys):
+    with pytest.raises(SystemExit):
+        main(["-", "-nf", "2", "-p", "interfloor"])
+    assert "needs at least 3 floors" in capsys.readouterr().err
+    with pytest.raises(SystemExit):
+        main(["-", "-nf", "1"])
+    with pytest.raises(ValueError):
+        list(generate_requests(10, 2, 10, "up-peak"))
+    assert all(r["source"] != r["dest"] for r in generate_requests(100, 2, 10, "uniform", seed=1))
@@ -0,0 +1,69 @@
+import pytest
+from urllib.error import HTTPError
+from urllib.request import urlopen
+from elevatorSystemSimulator import main
+from generate_data import generate_requests
+from models.events import TickEnd
+from models.metricsReporter import MetricsReporter
+from models.simulation import run_simulation
+from models.tripStatistics import TimeHistogram
+
+def parse(text):
+    """Metric (with its labels) -> value of a Prometheus text."""
+    metrics = {}
+    for line in text.splitlines():
+        if not line.startswith("#"):
+            name, value = line.rsplit(" ", 1)
+            metrics[name] = float(value)
+    return metrics
+
+def test_samples_the_running_simulation(tmp_path):
+    reporter = MetricsReporter(tmp_path / "metrics.prom", interval=0.01, window=50)
+    samples = []
+    def sample(event):
+        if event.time == 150:
+            samples.append((parse(reporter.sample()), len(event.system.requests), list(event.system.processed_requests)))
+    requests = list(generate_requests(300, 20, 300, "uniform", 7))
+    elevator_system = run_simulation(3, 20, 5, requests, file_log=None, subscribers=[(TickEnd, sample)], metrics=reporter)
+    (metrics, pending, done), = samples
+    assert metrics["elevator_time"] == 150
+    assert metrics["elevator_pending_requests"] == pending
+    assert metrics["elevator_passengers_done_total"] == len(done)
+    waits = TimeHistogram()
+    for passenger in done[-50:]:
+        waits.add(passenger.pickup_time - passenger.request_time)
+    assert metrics['elevator_wait_time{quantile="0.95"}'] == round(waits.quantile(0.95), 3)
+    assert metrics["elevator_wait_time_count"] == 50
+    # The last sample is written when the simulation is over
+    final = parse((tmp_path / "metrics.prom").read_text())
+    assert final["elevator_time"] == elevator_system.time
+    assert final["elevator_passengers_done_total"] == 300
+    assert final["elevator_pending_requests"] == final["elevator_waiting_passengers"] == 0
+    assert [final[f'elevator_riding_passengers{{elevator="E{i}"}}'] for i in (1, 2, 3)] == [0, 0, 0]
+    assert final['elevator_capacity{elevator="E1"}'] == 5
+    assert final["process_resident_memory_bytes"] > 0
+    assert reporter._thread is None
+
+def test_serves_the_metrics_over_http():
+    reporter = MetricsReporter(port=0, interval=60)
+    reporter.start(run_simulation(2, 10, 4, [{"id": 1, "source": 1, "dest": 5, "time": 0}], file_log=None))
+    try:
+        with urlopen(f"http://127.0.0.1:{reporter.port}/metrics") as response:
+            assert response.headers["Content-Type"].startswith("text/plain")
+            metrics = parse(response.read().decode())
+        assert metrics["elevator_passengers_done_total"] == 1
+        assert 'elevator_riding_passengers{elevator="E2"}' in metrics
+        with pytest.raises(HTTPError):
+            urlopen(f"http://127.0.0.1:{reporter.port}/other")
+    finally:
+        reporter.stop()
+    with pytest.raises(OSError):
+        urlopen(f"http://127.0.0.1:{reporter.port}/metrics", timeout=1)
+
+def test_command_line_writes_the_metrics(tmp_path):
+    elevator_system = main(["long_sample.json", str(tmp_path / "out.log"), "-ne", "3", "-c", "5", "--metrics", str(tmp_path / "metrics.prom")])
+    metrics = parse((tmp_path / "metrics.prom").read_text())
+    assert metrics["elevator_time"] == elevator_system.time
+    assert metrics["elevator_passengers_done_total"] == 100
+    with pytest.raises(ValueError):
+        run_simulation(1, 10, 5, [], file_log=None, backend="array", metrics=MetricsReporter())
@@ -0,0 +1,59 @@
+import pytest
+from PIL import Image
+from models.simulation import read_requests, run_simulation
+from plot import BuildingPlot, concat_gifs, create_plot, export_animation, read_frames
+
+def test_read_frames_groups_passengers_by_elevator(tmp_path):
+    elevator_system = run_simulation(2, 20, 2, read_requests("input.json"), file_log=tmp_path / "out.json")
+    frames = read_frames(tmp_path / "out.json")
+    assert [time for time, _, _ in frames] == list(range(elevator_system.time))
+    time, floors, passengers = frames[-1]
+    assert floors == [e.current_floor for e in elevator_system.elevators]
+    for elevator, groups in zip(elevator_system.elevators, passengers):
+        assert groups["D"] == sorted({p.target_floor for p in elevator_system.processed_requests if p.assigned_elevator == elevator.id})
+        assert groups["W"] == groups["T"] == []
+
+def test_create_plot_writes_one_gif_frame_per_snapshot(tmp_path, monkeypatch):
+    # The event engine only logs some of the time units
+    run_simulation(3, 20, 10, read_requests("long_sample.json"), file_log=tmp_path / "out.ndjson", engine="event", log_format="ndjson")
+    frames = read_frames(tmp_path / "out.ndjson")
+    monkeypatch.chdir(tmp_path)
+    create_plot(num_floors=20, num_elevators=3, log_file=tmp_path / "out.ndjson")
+    with Image.open(tmp_path / "elevator_animation.gif") as gif:
+        assert gif.n_frames == len(frames)
+        assert gif.convert("RGB").getpixel((5, 5)) == (255, 255, 255)
+
+def test_render_blits_the_same_image_as_a_full_draw(tmp_path):
+    run_simulation(2, 20, 2, read_requests("input.json"), file_log=tmp_path / "out.json")
+    frames = read_frames(tmp_path / "out.json")
+    building = BuildingPlot(20, 2)
+    building.render(frames[0])
+    blitted = building.render(frames[5])
+    fresh = BuildingPlot(20, 2).render(frames[5])
+    assert blitted.tobytes() == fresh.tobytes()
+
+def test_parallel_gif_matches_serial_gif(tmp_path):
+    run_simulation(3, 20, 10, read_requests("long_sample.json"), file_log=tmp_path / "out.json")
+    serial = export_animation(tmp_path / "out.json", str(tmp_path / "serial.gif"), 20, 3, jobs=1)
+    parallel = export_animation(tmp_path / "out.json", str(tmp_path / "parallel.gif"), 20, 3, jobs=3, chunk_size=25)
+    assert serial == parallel == len(read_frames(tmp_path / "out.json"))
+    with Image.open(tmp_path / "serial.gif") as serial_gif, Image.open(tmp_path / "parallel.gif") as parallel_gif:
+        assert serial_gif.n_frames == parallel_gif.n_frames
+        for number in range(0, serial_gif.n_frames, 10):
+            serial_gif.seek(number)
+            parallel_gif.seek(number)
+            assert serial_gif.convert("RGB").tobytes() == parallel_gif.convert("RGB").tobytes()
+
+def test_png_frames_with_stride_and_window(tmp_path):
+    run_simulation(3, 20, 10, read_requests("long_sample.json"), file_log=tmp_path / "out.json")
+    frames = export_animation(tmp_path / "out.json", str(tmp_path / "frames"), 20, 3, stride=10, window=(20, 100), jobs=2)
+    assert frames == 9
+    assert sorted(p.name for p in (tmp_path / "frames").iterdir()) == [f"frame_{i:06d}.png" for i in range(9)]
+    with Image.open(tmp_path / "frames" / "frame_000008.png") as png:
+        assert png.mode == "RGB"
+
+def test_concat_gifs_rejects_different_palettes(tmp_path):
+    Image.new("RGB", (10, 10), "red").save(tmp_path / "red.gif")
+    Image.new("RGB", (10, 10), "blue").save(tmp_path / "blue.gif")
+    with pytest.raises(ValueError):
+        concat_gifs([tmp_path / "red.gif", tmp_path / "blue.gif"], tmp_path / "out.gif")
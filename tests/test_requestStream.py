@@ -0,0 +1,92 @@
+import io
+import json
+import random
+import logging
+from models.requestStream import ArrivalQueue, RequestStream, validate_request
+from models.simulation import read_requests, run_simulation
+
+def trips(elevator_system):
+    return [(p.id, p.assigned_elevator, p.request_time, p.pickup_time, p.dropoff_time) for p in elevator_system.processed_requests]
+
+def test_out_of_order_requests_within_the_window():
+    requests = read_requests("long_sample.json")
+    # Requests of different times mixed up, the ones with the same time keep their order
+    groups = {}
+    for request in requests:
+        groups.setdefault(request["time"], []).append(request)
+    rng = random.Random(1)
+    shuffled = []
+    while groups:
+        time = rng.choice(list(groups))
+        shuffled.append(groups[time].pop(0))
+        if not groups[time]:
+            del groups[time]
+    assert shuffled != requests
+    for engine in ("tick", "event"):
+        expected = run_simulation(3, 20, 10, requests, file_log=None, engine=engine)
+        elevator_system = run_simulation(3, 20, 10, iter(shuffled), file_log=None, engine=engine, reorder_window=len(shuffled))
+        assert trips(elevator_system) == trips(expected)
+
+def test_late_requests_arrive_at_the_current_time(caplog):
+    requests = [{"id": i, "source": 1, "dest": 5, "time": t} for i, t in enumerate([0, 3, 8, 2, 9])]
+    queue = ArrivalQueue(requests, window=2)
+    assert [[r["id"] for r in queue.pop_arrivals(t)] for t in range(10)] == [[0], [], [], [1, 3], [], [], [], [], [2], [4]]
+    assert queue.late == 1
+    assert not queue
+    with caplog.at_level(logging.WARNING):
+        elevator_system = run_simulation(1, 10, 5, requests, file_log=None, reorder_window=2)
+    assert len(elevator_system.processed_requests) == 5
+    # Admitted at time 3, but the wait counts from its own time
+    late = {p.id: p for p in elevator_system.processed_requests}[3]
+    assert late.request_time == 2 and late.pickup_time >= 3
+    assert elevator_system.stats.overall["wait_time"].max >= late.pickup_time - 2
+    assert "1 requests were read after their time" in caplog.text
+
+def test_arrival_queue_buffers_at_most_the_window():
+    requests = ({"id": i, "source": 1, "dest": 2, "time": i // 10} for i in range(10000))
+    queue = ArrivalQueue(requests, window=50)
+    arrived, time = 0, 0
+    while queue:
+        arrived += len(queue.pop_arrivals(time))
+        assert len(queue.heap) <= 50
+        time += 1
+    assert arrived == 10000
+
+def test_malformed_lines_are_skipped(tmp_path, caplog):
+    lines = ['{"id": 1, "source": 1, "dest": 3, "time": 0}', '{"id": 2, "source": 1', '', '[1, 2]',
+             '{"id": 3, "source": 1, "time": 0}', '{"id": 4, "source": "2", "dest": 3, "time": 0}',
+             '{"id": 5, "source": 0, "dest": 3, "time": 0}', '{"id": 6, "source": 4, "dest": 3, "time": 1}']
+    (tmp_path / "input.json").write_text("\n".join(lines) + "\n")
+    stream = RequestStream(tmp_path / "input.json")
+    with caplog.at_level(logging.WARNING):
+        assert [r["id"] for r in stream] == [1, 6]
+    assert stream.malformed == 5
+    assert "line 2" in caplog.text and "missing dest" in caplog.text and "source is not an integer" in caplog.text
+
+def test_validate_request():
+    assert validate_request({"id": "a", "source": 1, "dest": 3, "time": 0}) is None
+    assert validate_request({"id": 1, "source": 1, "dest": 3, "time": -1}) == "negative time"
+    assert validate_request({"id": 1, "source": True, "dest": 3, "time": 0}) == "source is not an integer"
+    assert validate_request({"id": 1, "source": 3, "dest": 3, "time": 0}) == "source and dest are the same floor, there is no trip to simulate"
+    request = {"id": 1, "source": 1.0, "dest": 3, "time": 2.0}
+    assert validate_request(request) is None
+    assert request == {"id": 1, "source": 1, "dest": 3, "time": 2} and type(request["time"]) is int
+    assert validate_request({"id": 1, "source": 1, "dest": 3, "time": 2.5}) == "time is not an integer"
+    assert validate_request({"id": 1, "source": 1, "dest": 21, "time": 0}) is None
+    assert validate_request({"id": 1, "source": 1, "dest": 21, "time": 0}, num_floors=20) == "floor above the top floor"
+    assert validate_request({"id": 1, "source": 1, "dest": 20, "time": 0}, num_floors=20) is None
+
+def test_requests_above_the_top_floor_are_skipped(tmp_path):
+    lines = ['{"id": 1, "source": 1, "dest": 10, "time": 0}', '{"id": 2, "source": 1, "dest": 11, "time": 0}', '{"id": 3, "source": 4, "dest": 4, "time": 0}']
+    (tmp_path / "input.json").write_text("\n".join(lines) + "\n")
+    stream = RequestStream(tmp_path / "input.json", num_floors=10)
+    assert [r["id"] for r in stream] == [1]
+    assert stream.malformed == 2
+
+def test_requests_from_standard_input(monkeypatch, capsys, tmp_path):
+    from elevatorSystemSimulator import main
+    with open("input.json") as f:
+        monkeypatch.setattr("sys.stdin", io.StringIO(f.read()))
+    elevator_system = main(["-", str(tmp_path / "out.log"), "-ne", "2"])
+    assert trips(elevator_system) == trips(run_simulation(2, 20, 2, read_requests("input.json"), file_log=None))
+    assert elevator_system.time_summary() in capsys.readouterr().out
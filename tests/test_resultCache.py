@@ -0,0 +1,91 @@
+import os
+import pytest
+import models.resultCache
+from elevatorSystemSimulator import main
+from models.resultCache import ResultCache, SimulationResult
+from models.simulation import read_requests, run_simulation
+from sweep import run_configuration
+
+def forbid_simulation(monkeypatch):
+    def run_simulation(*args, **kwargs):
+        raise AssertionError("The simulation ran again")
+    monkeypatch.setattr(models.resultCache, "run_simulation", run_simulation)
+
+def test_repeated_runs_come_from_the_cache(tmp_path, monkeypatch):
+    cache = ResultCache(tmp_path / "cache")
+    first = cache.run("long_sample.json", 3, 20, 5, engine="event", dispatcher="batch")
+    expected = run_simulation(3, 20, 5, read_requests("long_sample.json"), file_log=None, engine="event", dispatcher="batch")
+    assert first.summary_stats() == expected.summary_stats()
+    assert (first.time, first.passengers, first.time_summary()) == (expected.time, 100, expected.time_summary())
+    forbid_simulation(monkeypatch)
+    again = ResultCache(tmp_path / "cache").run("long_sample.json", 3, 20, 5, engine="event", dispatcher="batch")
+    assert vars(again) == vars(first)
+
+def test_keys_change_with_the_input_parameters_and_code(tmp_path, monkeypatch):
+    cache = ResultCache(tmp_path / "cache")
+    key = cache.key("input.json", num_elevators=2, dispatcher="nearest")
+    assert cache.key("input.json", dispatcher="nearest", num_elevators=2) == key
+    assert cache.key("input.json", num_elevators=3, dispatcher="nearest") != key
+    assert cache.key("input.json", num_elevators=2, dispatcher="batch") != key
+    (tmp_path / "copy.json").write_bytes(open("input.json", "rb").read())
+    assert cache.key(tmp_path / "copy.json", num_elevators=2, dispatcher="nearest") == key
+    (tmp_path / "copy.json").write_bytes(open("input.json", "rb").read() + b"\n")
+    assert cache.key(tmp_path / "copy.json", num_elevators=2, dispatcher="nearest") != key
+    monkeypatch.setattr(models.resultCache, "_code_version", "other code")
+    assert cache.key("input.json", num_elevators=2, dispatcher="nearest") != key
+    with pytest.raises(ValueError):
+        cache.run("input.json", 2, 20, 2, checkpoint=tmp_path / "run.ckpt")
+
+@pytest.mark.parametrize("log_format", ["json", "delta", "columnar"])
+def test_logs_are_cached(log_format, tmp_path, monkeypatch):
+    cache = ResultCache(tmp_path / "cache", cache_logs=True)
+    cache.run("long_sample.json", 3, 20, 5)
+    # Cached without a log, runs again to get it
+    cache.run("long_sample.json", 3, 20, 5, file_log=str(tmp_path / "first.log"), log_format=log_format)
+    forbid_simulation(monkeypatch)
+    cache.run("long_sample.json", 3, 20, 5, file_log=str(tmp_path / "second.log"), log_format=log_format)
+    if log_format == "columnar":
+        assert sorted(os.listdir(tmp_path / "second.log")) == sorted(os.listdir(tmp_path / "first.log"))
+    else:
+        assert (tmp_path / "second.log").read_bytes() == (tmp_path / "first.log").read_bytes()
+
+def test_logs_are_only_cached_on_request(tmp_path):
+    cache = ResultCache(tmp_path / "cache")
+    first = cache.run("long_sample.json", 3, 20, 5, file_log=str(tmp_path / "first.log"))
+    entry, = os.listdir(tmp_path / "cache")
+    assert os.listdir(tmp_path / "cache" / entry) == ["result.json"]
+    # Runs again to write the log, the summary is the same
+    again = cache.run("long_sample.json", 3, 20, 5, file_log=str(tmp_path / "second.log"))
+    assert (tmp_path / "second.log").read_bytes() == (tmp_path / "first.log").read_bytes()
+    assert vars(again) == vars(first)
+    # A log larger than the whole cache is never copied
+    small = ResultCache(tmp_path / "small", max_bytes=1000, cache_logs=True)
+    small.run("long_sample.json", 3, 20, 5, file_log=str(tmp_path / "third.log"))
+    entry, = os.listdir(tmp_path / "small")
+    assert os.listdir(tmp_path / "small" / entry) == ["result.json"]
+
+def test_least_recently_used_results_are_evicted(tmp_path):
+    cache = ResultCache(tmp_path / "cache", max_bytes=10000)
+    result = SimulationResult(10, 1, {"mean_wait_time": 1.0}, "x" * 2000)
+    for i, key in enumerate("abcd"):
+        cache.put(key, result)
+        os.utime(tmp_path / "cache" / key / "result.json", (i, i))
+    assert cache.get("a") is not None
+    cache.put("e", result)
+    assert sorted(os.listdir(tmp_path / "cache")) == ["a", "c", "d", "e"]
+    assert cache.size <= 10000
+
+def test_command_lines_use_the_cache(tmp_path, capsys, monkeypatch, cache_dir):
+    # Without --cache-log nothing is written that a run writing its log could read back
+    uncached = main(["long_sample.json", str(tmp_path / "uncached.log"), "-ne", "3", "-c", "5"])
+    assert os.listdir(cache_dir) == []
+    first = main(["long_sample.json", str(tmp_path / "first.log"), "-ne", "3", "-c", "5", "--cache-log"])
+    assert len(os.listdir(cache_dir)) == 1
+    assert first.summary_stats() == uncached.summary_stats() and len(uncached.elevators) == 3
+    forbid_simulation(monkeypatch)
+    second = main(["long_sample.json", str(tmp_path / "second.log"), "-ne", "3", "-c", "5", "--cache-log"])
+    assert second.time_summary() in capsys.readouterr().out
+    assert (tmp_path / "second.log").read_bytes() == (tmp_path / "first.log").read_bytes()
+    configuration = {"input_file": "long_sample.json", "num_elevators": 3, "num_floors": 20, "elevator_capacity": 5, "dispatcher": "nearest"}
+    row = run_configuration(configuration, cache=ResultCache(cache_dir))
+    assert row["passengers"] == 100 and row["mean_wait_time"] == first.summary_stats()["mean_wait_time"]
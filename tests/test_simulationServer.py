@@ -0,0 +1,164 @@
+import asyncio
+import json
+import time
+from models.simulation import read_requests
+from models.simulationServer import SimulationServer, replay, serve
+
+async def replay_against(server, requests, **address):
+    task = asyncio.create_task(serve(server, **address))
+    while server.server is None:
+        await asyncio.sleep(0)
+    if "path" not in address:
+        address = {"port": server.server.sockets[0].getsockname()[1]}
+    try:
+        return await replay(requests, tick=server.tick, **address)
+    finally:
+        server.stop()
+        await task
+
+def test_replay_over_a_unix_socket(tmp_path):
+    requests = read_requests("long_sample.json")[:50]
+    server = SimulationServer(3, 20, 5, tick=0)
+    passengers, records = asyncio.run(replay_against(server, requests, path=str(tmp_path / "elevator.sock")))
+    assert set(passengers) == {r["id"] for r in requests}
+    done = {p.id: p for p in server.elevator_system.processed_requests}
+    assert set(done) == set(passengers)
+    for passenger_id, passenger in passengers.items():
+        assert passenger["time"] == done[passenger_id].request_time
+        assert passenger["elevator"] == done[passenger_id].assigned_elevator
+        assert passenger["dropoff_time"] == done[passenger_id].dropoff_time
+    assert any(isinstance(r, list) and r[0] == "t" for r in records)
+
+def test_replay_over_tcp_in_real_time():
+    requests = [dict(r, time=r["time"] - 106) for r in read_requests("input.json")]
+    server = SimulationServer(2, 20, 2, tick=0.005)
+    start = time.perf_counter()
+    passengers, _ = asyncio.run(replay_against(server, requests, port=0))
+    assert time.perf_counter() - start >= server.elevator_system.time * server.tick * 0.5
+    assert all(p["dropoff_time"] is not None for p in passengers.values())
+    assert server.late_ticks < server.elevator_system.time
+
+def test_many_clients_at_once(tmp_path):
+    path = str(tmp_path / "elevator.sock")
+    server = SimulationServer(4, 20, 10, tick=0)
+
+    async def client(i):
+        reader, writer = await asyncio.open_unix_connection(path)
+        writer.write(json.dumps({"source": 1 + i % 20, "dest": 1 + (i + 7) % 20}).encode() + b"\n")
+        answer = json.loads(await reader.readline())
+        writer.close()
+        return answer
+
+    async def clients():
+        task = asyncio.create_task(serve(server, path=path))
+        while server.server is None:
+            await asyncio.sleep(0)
+        answers = await asyncio.gather(*(client(i) for i in range(1000)))
+        server.stop()
+        await task
+        return answers
+
+    answers = asyncio.run(clients())
+    assert sorted(a["accepted"] for a in answers) == list(range(1, 1001))
+    assert server.elevator_system.time > 0
+    assert len(server.elevator_system.all_passengers()) == 1000
+
+def test_invalid_requests_are_answered_with_an_error(tmp_path):
+    path = str(tmp_path / "elevator.sock")
+    server = SimulationServer(1, 10, 2, tick=0)
+    messages = [b"not json", b'{"source": 1}', b'{"id": 1, "source": 1, "dest": 11}', b'{"id": 1, "source": 1, "dest": 5}', b'{"id": 1, "source": 2, "dest": 5}']
+
+    async def client():
+        task = asyncio.create_task(serve(server, path=path))
+        while server.server is None:
+            await asyncio.sleep(0)
+        reader, writer = await asyncio.open_unix_connection(path)
+        writer.write(b"\n".join(messages) + b"\n")
+        answers = [json.loads(await reader.readline()) for _ in messages]
+        writer.close()
+        server.stop()
+        await task
+        return answers
+
+    answers = asyncio.run(client())
+    assert [a.get("error") for a in answers] == ["invalid json (Expecting value)", "missing dest", "floor above the top floor", None, "duplicate id"]
+    assert server.rejected == 4
+
+class SlowTransport:
+    def is_closing(self):
+        return False
+
+    def get_write_buffer_size(self):
+        return 10 << 20
+
+    def abort(self):
+        self.aborted = True
+
+class SlowWriter:
+    def __init__(self):
+        self.transport = SlowTransport()
+
+    def write(self, data):
+        raise AssertionError("nothing is written to a subscriber that is behind")
+
+def test_slow_subscribers_are_disconnected():
+    server = SimulationServer(1, 10, 2, tick=0)
+    writer = SlowWriter()
+    server.subscribers.add(writer)
+    server.broadcast(["t", 0, {}, []])
+    assert writer not in server.subscribers
+    assert writer.transport.aborted
+
+def test_clients_that_do_not_read_their_answers_are_disconnected():
+    server = SimulationServer(1, 10, 2, tick=0)
+    writer = SlowWriter()
+    server.subscribers.add(writer)
+    server.receive(b'{"id": 1, "source": 1, "dest": 5}', writer)
+    assert writer.transport.aborted
+    assert writer not in server.subscribers
+
+class Writer:
+    def __init__(self):
+        self.transport = self
+        self.lines = []
+
+    def is_closing(self):
+        return False
+
+    def get_write_buffer_size(self):
+        return 0
+
+    def write(self, data):
+        self.lines.append(json.loads(data))
+
+def test_ids_are_freed_at_drop_off():
+    server = SimulationServer(1, 10, 2, tick=0)
+    writer = Writer()
+    server.receive(b'{"id": 1, "source": 1, "dest": 3}', writer)
+    server.receive(b'{"id": 1, "source": 1, "dest": 3}', writer)
+    assert writer.lines[-1] == {"error": "duplicate id"}
+    while not server.elevator_system.processed_requests:
+        server.step()
+    assert server.ids == set()
+    server.receive(b'{"id": 1, "source": 2, "dest": 3}', writer)
+    assert writer.lines[-1] == {"accepted": 1, "time": server.elevator_system.time}
+
+def test_shutdown_with_a_client_that_never_subscribes(tmp_path):
+    path = str(tmp_path / "elevator.sock")
+    server = SimulationServer(1, 10, 2, tick=0.001)
+
+    async def idle_client():
+        task = asyncio.create_task(serve(server, path=path, ticks=20))
+        while server.server is None:
+            await asyncio.sleep(0)
+        reader, writer = await asyncio.open_unix_connection(path)
+        while not server.clients:
+            await asyncio.sleep(0)
+        await asyncio.wait_for(task, 5)
+        # The server closed the connection
+        assert await asyncio.wait_for(reader.read(), 5) == b""
+        writer.close()
+
+    asyncio.run(idle_client())
+    assert server.elevator_system.time == 20
+    assert server.clients == {} and server.connections == 0
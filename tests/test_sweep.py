@@ -0,0 +1,24 @@
+import csv
+import json
+from models.simulation import read_requests, run_simulation
+from sweep import main, sweep, write_results
+
+def test_sweep_runs_every_configuration(tmp_path):
+    rows = sweep(["input.json"], [1, 2], [20], [2, 4], jobs=2, log_dir=tmp_path)
+    assert [(r["num_elevators"], r["elevator_capacity"]) for r in rows] == [(1, 2), (1, 4), (2, 2), (2, 4)]
+    for row in rows:
+        elevator_system = run_simulation(row["num_elevators"], row["num_floors"], row["elevator_capacity"], read_requests("input.json"), file_log=None)
+        assert row["passengers"] == 4
+        assert row["time"] == elevator_system.time
+        assert {k: row[k] for k in elevator_system.summary_stats()} == elevator_system.summary_stats()
+    assert len(list(tmp_path.glob("*.ndjson.gz"))) == 4
+
+def test_sweep_results_table(tmp_path):
+    main(["input.json", "long_sample.json", "-ne", "1", "3", "-c", "10", "-d", "nearest", "collective", "-j", "2", "-o", str(tmp_path / "sweep.csv")])
+    with open(tmp_path / "sweep.csv") as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == 8
+    assert {r["input_file"] for r in rows} == {"input.json", "long_sample.json"}
+    write_results(rows, str(tmp_path / "sweep.json"))
+    with open(tmp_path / "sweep.json") as f:
+        assert json.load(f) == rows
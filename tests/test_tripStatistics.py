@@ -0,0 +1,49 @@
+import random
+import numpy as np
+import pytest
+from models.tripStatistics import TimeAccumulator, TripStatistics
+from models.simulation import read_requests, run_simulation
+
+@pytest.mark.parametrize("seed", range(5))
+def test_percentiles_match_numpy(seed):
+    rng = random.Random(seed)
+    values = [rng.randint(0, rng.choice([3, 50, 1000])) for _ in range(rng.randint(1, 500))]
+    accumulator = TimeAccumulator()
+    for value in values:
+        accumulator.add(value)
+    summary = accumulator.summary()
+    assert (summary["min"], summary["max"]) == (min(values), max(values))
+    assert summary["mean"] == pytest.approx(np.mean(values))
+    for q in (50, 95, 99):
+        assert summary[f"p{q}"] == pytest.approx(np.percentile(values, q))
+
+def test_empty_statistics():
+    stats = TripStatistics()
+    assert all(value is None for value in stats.summary().values())
+    assert stats.rows("elevator") == []
+    assert "Min Wait Time -" in stats.report()
+
+@pytest.mark.parametrize("backend", ["object", "array"])
+def test_statistics_per_elevator_and_window(backend):
+    elevator_system = run_simulation(3, 20, 10, read_requests("long_sample.json"), file_log=None, backend=backend)
+    passengers = elevator_system.processed_requests
+    wait_times = [p.wait_time() for p in passengers]
+    assert elevator_system.summary_stats()["max_wait_time"] == max(wait_times)
+    assert elevator_system.summary_stats()["p95_wait_time"] == pytest.approx(np.percentile(wait_times, 95))
+    by_elevator = elevator_system.stats.rows("elevator")
+    assert [row["elevator"] for row in by_elevator] == ["E1", "E2", "E3"]
+    for row in by_elevator:
+        total_times = [p.total_time() for p in passengers if p.assigned_elevator == row["elevator"]]
+        assert row["passengers"] == len(total_times)
+        assert row["mean_total_time"] == pytest.approx(np.mean(total_times))
+        assert row["p50_total_time"] == pytest.approx(np.median(total_times))
+    by_window = elevator_system.stats.rows("window")
+    assert [row["window"] for row in by_window] == [0, 100]
+    assert sum(row["passengers"] for row in by_window) == len(passengers)
+    assert by_window[1]["passengers"] == sum(p.dropoff_time >= 100 for p in passengers)
+
+def test_statistics_dataframe():
+    elevator_system = run_simulation(2, 20, 2, read_requests("input.json"), file_log=None)
+    df = elevator_system.stats.dataframe()
+    assert df.iloc[0].to_dict() == elevator_system.summary_stats()
+    assert list(elevator_system.stats.dataframe("elevator")["elevator"]) == ["E1", "E2"]